@@ -248,7 +248,9 @@ export default async function handler(req, res) {
         return;
       }
 
-      const maxTotalChars = 25_000; // allow some buffer over frontend limit
+      // The client sends its whole history; this proxy doesn't summarize older
+      // turns like the Python backend does, so it keeps the most recent ones
+      const maxTotalChars = 25_000;
       const maxMessageChars = 5_000;
       let totalChars = 0;
 
@@ -282,15 +284,23 @@ export default async function handler(req, res) {
         }
 
         totalChars += c.length;
-        if (totalChars > maxTotalChars) {
-          sseEvent(res, { type: 'error', message: `conversation_context total content too large (max ${maxTotalChars} chars)` });
-          res.end();
-          return;
-        }
 
         // Normalize shape to avoid passing unexpected keys downstream
         conversationContext.push({ role, content: c });
       }
+
+      let dropped = 0;
+      while (totalChars > maxTotalChars && dropped < conversationContext.length) {
+        totalChars -= conversationContext[dropped].content.length;
+        dropped++;
+      }
+      if (dropped > 0) {
+        conversationContext = conversationContext.slice(dropped);
+        sseEvent(res, {
+          type: 'context_compacted',
+          data: { summarized_messages: 0, reused_messages: 0, dropped_messages: dropped },
+        });
+      }
     }
 
     const isFirstMessage = !!body.is_first_message;
@@ -0,0 +1,376 @@
+"""Compressed, content-addressed storage for large stage payloads."""
+
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set
+from .config import BLOB_DIR, BLOB_GC_GRACE_SEC, BLOB_MIN_BYTES
+
+# Preset dictionaries prime the compressor with phrases common to council output,
+# which matters most for short responses. Every blob records which dictionary it
+# was written with, so new ones can be added without rewriting old blobs.
+# Version 1 is a hand-picked seed for a store with no conversations yet; once
+# there are some, train a dictionary from them (python -m backend.blobs), which
+# is saved next to the blobs as the next version.
+ZDICTS = {
+    1: (
+        "Response A Response B Response C Response D Response E "
+        "FINAL RANKING:\n1. Response A\n2. Response B\n3. Response C\n4. Response D\n"
+        "Here is my evaluation of each response:\n\n"
+        "**Strengths:** **Weaknesses:** **Accuracy:** **Completeness:** **Clarity:** "
+        "The response provides a clear and accurate explanation of the "
+        "However, it does not mention that the main point of the question is "
+        "In summary, the council agrees that the best answer is\n\n"
+        "## Overview\n\n### Key Points\n\n- **Example:**\n\n```python\ndef main():\n    return\n```\n\n"
+        "for example, such as, in addition, on the other hand, this means that, it is important to note that "
+        "I think the answer is because the user asked about how to what is why does "
+    ).encode("utf-8"),
+}
+ZDICT_VERSION = 1
+
+# Stage fields whose text is moved into blobs: stage -> text key
+STAGE_TEXT_FIELDS = {"stage1": "response", "stage2": "ranking", "stage3": "response"}
+
+BLOB_REF = "$blob"
+
+
+# zlib only looks back 32 KiB, and short texts benefit from the end of the
+# dictionary most, so a trained dictionary is kept well under the window
+ZDICT_SIZE = 16 * 1024
+# Versions are stored in one byte
+MAX_ZDICT_VERSION = 255
+
+_TOKEN_RE = re.compile(r"\s*\S+")
+
+
+def _compress(data: bytes, zdict: bytes, version: int) -> bytes:
+    compressor = zlib.compressobj(level=6, zdict=zdict)
+    return bytes([version]) + compressor.compress(data) + compressor.flush()
+
+
+def _decompress(blob: bytes, zdict: bytes) -> bytes:
+    decompressor = zlib.decompressobj(zdict=zdict)
+    return decompressor.decompress(blob[1:]) + decompressor.flush()
+
+
+def train_zdict(
+    samples: Iterable[str],
+    size: int = ZDICT_SIZE,
+    max_words: int = 6,
+    max_sample_bytes: int = 2_000_000,
+) -> bytes:
+    """
+    Build a zlib preset dictionary from sample texts.
+
+    zlib has no trainer of its own, so this follows the usual recipe: count in
+    how many samples each run of 2..max_words words appears, score runs by
+    (samples - 1) * length (the bytes a back-reference would save across the
+    corpus), and greedily keep the best runs not already covered. The best runs
+    go last, where zlib reaches them with the shortest distances.
+
+    Args:
+        samples: Texts like the ones that will be compressed
+        size: Maximum dictionary size in bytes
+        max_words: Longest run of words considered
+        max_sample_bytes: Stop reading samples after this many bytes
+
+    Returns:
+        The dictionary, or b"" if no run occurs in more than one sample
+    """
+    counts: Counter = Counter()
+    total = 0
+    for text in samples:
+        if total >= max_sample_bytes:
+            break
+        total += len(text)
+        tokens = _TOKEN_RE.findall(text)
+        runs = set()
+        for n in range(2, max_words + 1):
+            for i in range(len(tokens) - n + 1):
+                runs.add("".join(tokens[i:i + n]).lstrip())
+        counts.update(runs)
+
+    scored = sorted(
+        ((count - 1) * len(run.encode("utf-8")), run)
+        for run, count in counts.items()
+        if count > 1
+    )
+    picked = []
+    used = 0
+    covered = ""
+    for _, run in reversed(scored):
+        if used >= size:
+            break
+        if run in covered:
+            continue
+        picked.append(run)
+        covered += "\n" + run
+        used += len(run.encode("utf-8")) + 1
+
+    # Least valuable first, so truncating to size drops those
+    zdict = "\n".join(reversed(picked)).encode("utf-8")
+    return zdict[-size:] if size else b""
+
+
+class BlobStore:
+    """
+    Immutable text blobs keyed by the SHA-256 of their content.
+
+    Each blob is zlib-compressed with a preset dictionary and written once to
+    `<directory>/<first two hex chars>/<hash>` with an atomic rename, so storing
+    a response that already exists (a repeated question, a cached upstream
+    answer) costs a hash and an `exists` check. Recently read blobs are kept
+    decompressed in a small LRU.
+
+    Trained dictionaries live in `<directory>/zdicts/<version>`; new blobs use
+    the newest one, and older blobs keep decoding with the version they name.
+
+    Blobs are never deleted on write. `sweep` removes the ones no stored message
+    references any more (see BlobStorage.collect_garbage); storing a blob that
+    already exists refreshes its mtime, so a sweep's grace period also protects
+    blobs reused while the sweep was marking.
+    """
+
+    def __init__(self, directory: str = BLOB_DIR, cache_items: int = 256):
+        self.directory = directory
+        self.cache_items = cache_items
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.zdicts: Dict[int, bytes] = dict(ZDICTS)
+        for name in self._zdict_names():
+            self._load_zdict(int(name))
+        self.zdict_version = max(self.zdicts)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def _zdict_path(self, version: int) -> str:
+        return os.path.join(self.directory, "zdicts", str(version))
+
+    def _zdict_names(self):
+        try:
+            return [name for name in os.listdir(os.path.join(self.directory, "zdicts")) if name.isdigit()]
+        except OSError:
+            return []
+
+    def _load_zdict(self, version: int) -> Optional[bytes]:
+        zdict = self.zdicts.get(version)
+        if zdict is None:
+            try:
+                with open(self._zdict_path(version), 'rb') as f:
+                    zdict = f.read()
+            except OSError:
+                return None
+            self.zdicts[version] = zdict
+        return zdict
+
+    def install_zdict(self, zdict: bytes) -> int:
+        """Save a trained dictionary as the next version and compress new blobs with it."""
+        version = max(max(self.zdicts), *(int(name) for name in self._zdict_names() or ["0"])) + 1
+        if version > MAX_ZDICT_VERSION:
+            raise ValueError(f"No dictionary versions left (max {MAX_ZDICT_VERSION})")
+        path = self._zdict_path(version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(zdict)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        self.zdicts[version] = zdict
+        self.zdict_version = version
+        return version
+
+    def put(self, text: str) -> str:
+        """Store text (if not already present) and return its content hash."""
+        data = text.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        try:
+            os.utime(path)
+            return digest
+        except FileNotFoundError:
+            pass
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_compress(data, self.zdicts[self.zdict_version], self.zdict_version))
+            f.flush()
+            # Must be durable before any message referencing it is
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return digest
+
+    def get(self, digest: str) -> Optional[str]:
+        """Return the text for a hash, or None if the blob is missing."""
+        with self._lock:
+            text = self._cache.get(digest)
+            if text is not None:
+                self._cache.move_to_end(digest)
+                return text
+
+        try:
+            with open(self._path(digest), 'rb') as f:
+                blob = f.read()
+            # Another process may have installed a newer dictionary since we loaded ours
+            zdict = self._load_zdict(blob[0])
+            if zdict is None:
+                raise KeyError(f"unknown dictionary version {blob[0]}")
+            text = _decompress(blob, zdict).decode("utf-8")
+        except (OSError, zlib.error, KeyError, IndexError) as e:
+            print(f"Error reading blob {digest}: {e}")
+            return None
+
+        with self._lock:
+            self._cache[digest] = text
+            while len(self._cache) > self.cache_items:
+                self._cache.popitem(last=False)
+        return text
+
+    def sweep(self, referenced: Set[str], grace_seconds: float = BLOB_GC_GRACE_SEC) -> Dict[str, int]:
+        """
+        Delete blobs not in `referenced`, plus temp files left behind by crashed writes.
+
+        Anything modified within the last `grace_seconds` is kept: it may belong
+        to a message that is being written right now.
+
+        Returns:
+            Dict with 'kept', 'removed' and 'removed_bytes'
+        """
+        cutoff = time.time() - grace_seconds
+        stats = {"kept": 0, "removed": 0, "removed_bytes": 0}
+        try:
+            shards = [entry.path for entry in os.scandir(self.directory) if len(entry.name) == 2 and entry.is_dir()]
+        except FileNotFoundError:
+            return stats
+
+        for shard in shards:
+            for entry in os.scandir(shard):
+                st = entry.stat()
+                if entry.name in referenced or st.st_mtime > cutoff:
+                    stats["kept"] += 1
+                    continue
+                try:
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                stats["removed"] += 1
+                stats["removed_bytes"] += st.st_size
+                with self._lock:
+                    self._cache.pop(entry.name, None)
+        return stats
+
+
+def _map_stage_texts(message: Dict[str, Any], transform) -> Dict[str, Any]:
+    """Copy of an assistant message with `transform` applied to every stage text value."""
+    if message.get("role") != "assistant":
+        return message
+
+    mapped = dict(message)
+    for stage, field in STAGE_TEXT_FIELDS.items():
+        value = message.get(stage)
+        if isinstance(value, list):
+            mapped[stage] = [
+                {**item, field: transform(item[field])} if isinstance(item, dict) and field in item else item
+                for item in value
+            ]
+        elif isinstance(value, dict) and field in value:
+            mapped[stage] = {**value, field: transform(value[field])}
+    return mapped
+
+
+def _is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and BLOB_REF in value
+
+
+def pack_message(message: Dict[str, Any], blobs: BlobStore, min_bytes: int = BLOB_MIN_BYTES) -> Dict[str, Any]:
+    """Copy of a message with large stage texts replaced by blob references."""
+    def pack(text):
+        if isinstance(text, str) and len(text) >= min_bytes:
+            return {BLOB_REF: blobs.put(text)}
+        return text
+
+    return _map_stage_texts(message, pack)
+
+
+def unpack_message(message: Dict[str, Any], blobs: BlobStore) -> Dict[str, Any]:
+    """Copy of a message with blob references replaced by their text ('' if a blob is missing)."""
+    def unpack(value):
+        if _is_ref(value):
+            text = blobs.get(value[BLOB_REF])
+            return text if text is not None else ""
+        return value
+
+    return _map_stage_texts(message, unpack)
+
+
+def blob_refs(message: Dict[str, Any]) -> List[str]:
+    """Digests of the blobs a stored message references."""
+    digests = []
+
+    def collect(value):
+        if _is_ref(value):
+            digests.append(value[BLOB_REF])
+        return value
+
+    _map_stage_texts(message, collect)
+    return digests
+
+
+def _stage_texts(message: Dict[str, Any]):
+    texts = []
+    _map_stage_texts(message, lambda text: texts.append(text) or text)
+    return [text for text in texts if isinstance(text, str)]
+
+
+def _train(size: int):
+    from .storage import get_storage
+
+    storage = get_storage()
+
+    def samples():
+        for meta in storage.list_conversations():
+            conversation = storage.get_conversation(meta["id"]) or {}
+            for message in conversation.get("messages", []):
+                yield from _stage_texts(message)
+
+    texts = list(samples())
+    zdict = train_zdict(texts, size)
+    if not zdict:
+        sys.exit(f"Not enough repeated text in {len(texts)} stage texts to train a dictionary")
+
+    store = BlobStore()
+    before = sum(len(_compress(t.encode("utf-8"), store.zdicts[store.zdict_version], 0)) for t in texts)
+    after = sum(len(_compress(t.encode("utf-8"), zdict, 0)) for t in texts)
+    version = store.install_zdict(zdict)
+    print(f"Trained a {len(zdict)} byte dictionary from {len(texts)} stage texts as version {version} in {store.directory}")
+    print(f"Compressed size of those texts: {before} bytes before, {after} bytes with the new dictionary")
+
+
+def _collect_garbage(grace_seconds: float):
+    from .storage import BlobStorage, get_storage
+
+    storage = get_storage()
+    if not isinstance(storage, BlobStorage):
+        sys.exit("Blob storage is disabled (STORAGE_BLOBS_ENABLED); nothing to collect")
+    stats = storage.collect_garbage(grace_seconds)
+    print(
+        f"Removed {stats['removed']} unreferenced blobs ({stats['removed_bytes']} bytes), "
+        f"kept {stats['kept']} in {storage.blobs.directory}"
+    )
+
+
+if __name__ == "__main__":
+    # Usage:
+    #   python -m backend.blobs [dictionary_bytes]   train a dictionary from the stage texts of stored conversations
+    #   python -m backend.blobs gc [grace_seconds]   delete blobs no stored message references
+    if len(sys.argv) > 1 and sys.argv[1] == "gc":
+        _collect_garbage(float(sys.argv[2]) if len(sys.argv) > 2 else BLOB_GC_GRACE_SEC)
+    else:
+        _train(int(sys.argv[1]) if len(sys.argv) > 1 else ZDICT_SIZE)
@@ -0,0 +1,229 @@
+"""Content-addressed cache for OpenRouter completions."""
+
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, Any, Optional
+from .config import (
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_DIR,
+    RESPONSE_CACHE_TTL_SEC,
+    RESPONSE_CACHE_MAX_ITEMS,
+    RESPONSE_CACHE_MAX_MEMORY_MB,
+    RESPONSE_CACHE_MAX_DISK_MB,
+)
+
+if TYPE_CHECKING:
+    import sqlite3
+
+
+def cache_key(payload: Dict[str, Any]) -> str:
+    """
+    Stable hash of a completion request (model + messages + parameters).
+
+    Transport-only fields such as `stream` are ignored, so streamed and
+    non-streamed calls share entries.
+    """
+    canonical = {k: v for k, v in payload.items() if k != "stream"}
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache: a bounded in-memory LRU in front of an SQLite store.
+
+    Both tiers honour the same TTL. The memory tier is bounded by entry count and
+    bytes; the disk tier is trimmed to `max_disk_bytes` by evicting the least
+    recently used entries. Disk access runs in a worker thread so it never
+    blocks the event loop.
+    """
+
+    def __init__(
+        self,
+        directory: str = RESPONSE_CACHE_DIR,
+        ttl: float = RESPONSE_CACHE_TTL_SEC,
+        max_items: int = RESPONSE_CACHE_MAX_ITEMS,
+        max_memory_bytes: int = RESPONSE_CACHE_MAX_MEMORY_MB * 1024 * 1024,
+        max_disk_bytes: int = RESPONSE_CACHE_MAX_DISK_MB * 1024 * 1024,
+    ):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_items = max_items
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+
+        # key -> (expires_at, size, value)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+
+        self._db: Optional["sqlite3.Connection"] = None
+        self._db_lock = threading.Lock()
+        self._writes_since_trim = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    # Memory tier
+
+    def _memory_get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, size, value = entry
+        if expires_at <= time.time():
+            del self._memory[key]
+            self._memory_bytes -= size
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def _memory_put(self, key: str, value: Dict[str, Any], size: int, expires_at: float):
+        if size > self.max_memory_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= old[1]
+        self._memory[key] = (expires_at, size, value)
+        self._memory_bytes += size
+        while self._memory and (len(self._memory) > self.max_items or self._memory_bytes > self.max_memory_bytes):
+            _, (_, evicted_size, _) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+
+    # Disk tier
+
+    def _connect(self) -> "sqlite3.Connection":
+        if self._db is None:
+            # Imported on first disk access, keeping sqlite3 out of cold-start imports
+            import sqlite3
+
+            os.makedirs(self.directory, exist_ok=True)
+            db = sqlite3.connect(os.path.join(self.directory, "responses.sqlite3"), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+            """)
+            db.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses(accessed_at)")
+            self._db = db
+        return self._db
+
+    def _disk_get(self, key: str) -> Optional[tuple]:
+        with self._db_lock:
+            db = self._connect()
+            row = db.execute("SELECT value, size, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            value, size, expires_at = row
+            now = time.time()
+            if expires_at <= now:
+                db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                db.commit()
+                return None
+            db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            db.commit()
+            return json.loads(value), size, expires_at
+
+    def _disk_put(self, key: str, encoded: str, size: int, expires_at: float):
+        with self._db_lock:
+            db = self._connect()
+            db.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, size, expires_at, time.time()),
+            )
+            self._writes_since_trim += 1
+            if self._writes_since_trim >= 100:
+                self._trim_disk(db)
+            db.commit()
+
+    def _trim_disk(self, db: "sqlite3.Connection"):
+        """Drop expired rows, then least recently used rows until under the size budget."""
+        self._writes_since_trim = 0
+        db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+        excess = total - self.max_disk_bytes
+        freed = 0
+        stale_keys = []
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            stale_keys.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+        db.executemany("DELETE FROM responses WHERE key = ?", stale_keys)
+
+    # Public API
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a cached response, promoting disk hits into memory."""
+        value = self._memory_get(key)
+        if value is not None:
+            self.memory_hits += 1
+            return value
+
+        import sqlite3
+
+        try:
+            found = await asyncio.to_thread(self._disk_get, key)
+        except sqlite3.Error as e:
+            print(f"Error reading response cache: {e}")
+            found = None
+
+        if found is None:
+            self.misses += 1
+            return None
+
+        value, size, expires_at = found
+        self._memory_put(key, value, size, expires_at)
+        self.disk_hits += 1
+        return value
+
+    async def put(self, key: str, value: Dict[str, Any]):
+        """Store a response in both tiers."""
+        encoded = json.dumps(value)
+        size = len(encoded)
+        expires_at = time.time() + self.ttl
+        self._memory_put(key, value, size, expires_at)
+        self.stores += 1
+        import sqlite3
+
+        try:
+            await asyncio.to_thread(self._disk_put, key, encoded, size, expires_at)
+        except sqlite3.Error as e:
+            print(f"Error writing response cache: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and memory usage."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "memory_bytes": self._memory_bytes,
+        }
+
+    def close(self):
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+# Shared response cache; None unless RESPONSE_CACHE_ENABLED is set
+response_cache: Optional[ResponseCache] = ResponseCache() if RESPONSE_CACHE_ENABLED else None
@@ -0,0 +1,120 @@
+"""Coalescing of identical concurrent council runs into one upstream execution."""
+
+import asyncio
+import hashlib
+import json
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+
+def run_key(*parts: Any) -> str:
+    """Stable hash of the JSON-serializable inputs that determine a run's output."""
+    encoded = json.dumps(parts, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def key_fingerprint(api_key: str) -> str:
+    """
+    Hash of an API key, for scoping run keys to one caller.
+
+    Runs are billed to the key that started them, so only requests with the same
+    key may join one; the raw key is never part of a run key.
+    """
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+class SharedRun:
+    """
+    A single in-flight event pipeline that any number of subscribers can follow.
+
+    Every event is recorded, so a subscriber that joins late first replays what
+    it missed and then follows the live stream. All subscribers see the same
+    sequence of events. When the last subscriber goes away before the run has
+    finished, the pipeline is cancelled so nobody pays for abandoned work.
+    """
+
+    def __init__(self, source: AsyncIterator[Dict[str, Any]]):
+        self.events: List[Dict[str, Any]] = []
+        self.done = False
+        self.cancelled = False
+        self.subscribers = 0
+        self._changed = asyncio.Event()
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator[Dict[str, Any]]):
+        try:
+            async for event in source:
+                self.events.append(event)
+                self._notify()
+        except asyncio.CancelledError:
+            # Tell anyone who joined just as the run was abandoned
+            self.events.append({'type': 'error', 'message': 'Council run was cancelled'})
+            raise
+        except Exception as e:
+            self.events.append({'type': 'error', 'message': str(e)})
+        finally:
+            self.done = True
+            self._notify()
+
+    def _notify(self):
+        # Wake everyone waiting on the current event, then start a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield every event of the run, from the beginning, until it finishes."""
+        self.subscribers += 1
+        try:
+            index = 0
+            while True:
+                while index < len(self.events):
+                    yield self.events[index]
+                    index += 1
+                if self.done:
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.done:
+                self.cancel()
+
+    def cancel(self):
+        """Stop the pipeline, cancelling all of its outstanding upstream work."""
+        self.cancelled = True
+        self.task.cancel()
+
+
+class RunCoalescer:
+    """Maps run keys to the SharedRun currently executing for that key."""
+
+    def __init__(self):
+        self._runs: Dict[str, SharedRun] = {}
+
+    def get(self, key: str) -> Optional[SharedRun]:
+        """Return the in-flight run for `key`, or None if there isn't one."""
+        run = self._runs.get(key)
+        if run is None or run.done or run.cancelled:
+            return None
+        return run
+
+    def join(self, key: str, start: Callable[[], AsyncIterator[Dict[str, Any]]]) -> SharedRun:
+        """
+        Return the in-flight run for `key`, starting a new one with `start()` if there is none.
+
+        Finished runs are forgotten immediately, so this never serves stale results.
+        """
+        run = self.get(key)
+        if run is not None:
+            return run
+
+        run = SharedRun(start())
+        self._runs[key] = run
+
+        def forget(_):
+            if self._runs.get(key) is run:
+                del self._runs[key]
+
+        run.task.add_done_callback(forget)
+        return run
+
+    def __len__(self) -> int:
+        return len(self._runs)
@@ -1,44 +1,124 @@
 """Configuration for the LLM Council."""
 
+import copy
 import os
 import json
-from typing import List, Dict, Any, Optional
+import threading
+from typing import List, Dict, Any, Optional, Callable, Tuple
 from dotenv import load_dotenv
+from .ranking import AGGREGATION_METHODS
 
 load_dotenv()
 
+
+class ConfigFile:
+    """
+    A JSON config file parsed once and cached until it changes on disk.
+
+    Every `get()` costs one stat(): the file is re-parsed only when its
+    (mtime, size, inode) changes, so all workers sharing the file pick up an
+    edit on their next read without parsing JSON on every request. `write()`
+    goes through a temp file and an atomic rename, so readers never see a
+    half-written file. Subscribers are called with the new config whenever it
+    is reloaded or written.
+    """
+
+    def __init__(self, path: str, default: Callable[[], Dict[str, Any]] = dict):
+        self.path = path
+        self.default = default
+        self._lock = threading.RLock()
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._data: Optional[Dict[str, Any]] = None
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def get(self) -> Dict[str, Any]:
+        """Return a copy of the current config, re-reading the file only if it changed."""
+        with self._lock:
+            signature = self._stat()
+            if self._data is None or signature != self._signature:
+                self._reload(signature)
+            return copy.deepcopy(self._data)
+
+    def _reload(self, signature: Optional[Tuple[int, int, int]]):
+        if signature is None:
+            data = self.default()
+        else:
+            try:
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"Error reading config {self.path}: {e}")
+                # Keep serving the last good config rather than falling back to defaults
+                data = self._data if self._data is not None else self.default()
+        self._signature = signature
+        self._set(data)
+
+    def write(self, data: Dict[str, Any]):
+        """Atomically replace the file's contents (raises OSError on failure)."""
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+            self._signature = self._stat()
+            self._set(copy.deepcopy(data))
+
+    def _set(self, data: Dict[str, Any]):
+        self._data = data
+        for callback in list(self._subscribers):
+            try:
+                callback(copy.deepcopy(data))
+            except Exception as e:
+                print(f"Error in config subscriber for {self.path}: {e}")
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call `callback(config)` whenever the config is reloaded or written."""
+        with self._lock:
+            self._subscribers.append(callback)
+
+
 # API keys config file path
 API_KEYS_CONFIG_FILE = "config/api_keys.json"
 
-# OpenRouter API key - load from config file or environment variable
-OPENROUTER_API_KEY = None
+# OpenRouter API key (OPENROUTER_API_KEY) is loaded from the config file or
+# environment variable on first access; see __getattr__ below
 
+api_keys_config = ConfigFile(API_KEYS_CONFIG_FILE)
 
-def load_api_keys() -> Dict[str, Any]:
-    """
-    Load API keys from file.
 
-    Returns:
-        Dict with API key configurations
-    """
+def _apply_api_keys(config: Dict[str, Any]):
     global OPENROUTER_API_KEY
+    # If no API key in config file, fall back to environment variable
+    OPENROUTER_API_KEY = config.get('openrouter_api_key') or os.getenv("OPENROUTER_API_KEY")
 
-    try:
-        with open(API_KEYS_CONFIG_FILE, 'r') as f:
-            config = json.load(f)
 
-        # Set the OpenRouter API key
-        OPENROUTER_API_KEY = config.get('openrouter_api_key')
+api_keys_config.subscribe(_apply_api_keys)
 
-        # If no API key in config file, fall back to environment variable
-        if not OPENROUTER_API_KEY:
-            OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 
-        return config
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Fall back to environment variable if config file doesn't exist
-        OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-        return {}
+def load_api_keys() -> Dict[str, Any]:
+    """
+    Load API keys from file (cached until the file changes).
+
+    Returns:
+        Dict with API key configurations
+    """
+    return api_keys_config.get()
 
 
 def save_api_keys(api_keys: Dict[str, Any]) -> bool:
@@ -51,18 +131,8 @@ def save_api_keys(api_keys: Dict[str, Any]) -> bool:
     Returns:
         True if successful, False otherwise
     """
-    global OPENROUTER_API_KEY
-
     try:
-        # Ensure config directory exists
-        os.makedirs(os.path.dirname(API_KEYS_CONFIG_FILE), exist_ok=True)
-
-        with open(API_KEYS_CONFIG_FILE, 'w') as f:
-            json.dump(api_keys, f, indent=2)
-
-        # Update global variable
-        OPENROUTER_API_KEY = api_keys.get('openrouter_api_key') or os.getenv("OPENROUTER_API_KEY")
-
+        api_keys_config.write(api_keys)
         return True
     except Exception as e:
         print(f"Error saving API keys: {e}")
@@ -76,9 +146,7 @@ def get_api_keys() -> Dict[str, Any]:
     Returns:
         Dict with current API key configuration
     """
-    # Always reload from file to ensure we have the latest state
-    config = load_api_keys()
-    return config
+    return api_keys_config.get()
 
 
 def set_openrouter_api_key(api_key: str) -> bool:
@@ -106,48 +174,170 @@ DEFAULT_COUNCIL_MODELS = [
 # Default chairman model - synthesizes final response
 DEFAULT_CHAIRMAN_MODEL = "google/gemini-3-pro-preview"
 
-# OpenRouter API endpoint
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+# OpenRouter API endpoints (base URL can be overridden, e.g. to point at a local stub)
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1").rstrip("/")
+OPENROUTER_API_URL = f"{OPENROUTER_BASE_URL}/chat/completions"
+OPENROUTER_MODELS_URL = f"{OPENROUTER_BASE_URL}/models"
+
+# Shared HTTP client pool settings for OpenRouter calls
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", "50"))
+# Open a connection to OpenRouter at startup / on the first request, before it's needed
+HTTP_PREWARM = os.getenv("HTTP_PREWARM", "true").lower() in ("1", "true", "yes")
+# HTTP/2 is only used when the optional `h2` package is installed
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Retries for 429/5xx and connection errors (jittered exponential backoff, in seconds)
+OPENROUTER_MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "2"))
+OPENROUTER_RETRY_BACKOFF_BASE = float(os.getenv("OPENROUTER_RETRY_BACKOFF_BASE", "0.5"))
+OPENROUTER_RETRY_BACKOFF_MAX = float(os.getenv("OPENROUTER_RETRY_BACKOFF_MAX", "8"))
+
+# Hedging: send a duplicate request when a call runs past the model's observed p95 latency
+OPENROUTER_HEDGING_ENABLED = os.getenv("OPENROUTER_HEDGING_ENABLED", "false").lower() in ("1", "true", "yes")
+OPENROUTER_HEDGE_MIN_SAMPLES = int(os.getenv("OPENROUTER_HEDGE_MIN_SAMPLES", "20"))
+
+# Per-model circuit breaker: open after N consecutive failures, probe again after the cooldown
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SEC = float(os.getenv("CIRCUIT_RESET_SEC", "30"))
+
+# Model catalog cache: serve from memory for TTL seconds, then keep serving the
+# stale copy for up to STALE seconds more while revalidating in the background
+MODEL_CATALOG_TTL_SEC = float(os.getenv("MODEL_CATALOG_TTL_SEC", "300"))
+MODEL_CATALOG_STALE_SEC = float(os.getenv("MODEL_CATALOG_STALE_SEC", "3600"))
+
+# Opt-in cache of model responses keyed on model + messages + parameters
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", "data/cache")
+RESPONSE_CACHE_TTL_SEC = float(os.getenv("RESPONSE_CACHE_TTL_SEC", "86400"))
+RESPONSE_CACHE_MAX_ITEMS = int(os.getenv("RESPONSE_CACHE_MAX_ITEMS", "512"))
+RESPONSE_CACHE_MAX_MEMORY_MB = int(os.getenv("RESPONSE_CACHE_MAX_MEMORY_MB", "64"))
+RESPONSE_CACHE_MAX_DISK_MB = int(os.getenv("RESPONSE_CACHE_MAX_DISK_MB", "512"))
+
+# Admission control: council runs executing at once, and how many may wait (overall / per API key)
+MAX_CONCURRENT_COUNCILS = int(os.getenv("MAX_CONCURRENT_COUNCILS", "8"))
+COUNCIL_QUEUE_SIZE = int(os.getenv("COUNCIL_QUEUE_SIZE", "32"))
+COUNCIL_QUEUE_PER_KEY = int(os.getenv("COUNCIL_QUEUE_PER_KEY", "4"))
+# Concurrent upstream OpenRouter calls, overall and per model
+UPSTREAM_MAX_CONCURRENCY = int(os.getenv("UPSTREAM_MAX_CONCURRENCY", "64"))
+UPSTREAM_MAX_PER_MODEL = int(os.getenv("UPSTREAM_MAX_PER_MODEL", "16"))
+
+# Stage 1 quorum policy: move on to stage 2 once STAGE1_QUORUM models have answered
+# or STAGE1_DEADLINE_SEC seconds have passed (with at least one answer).
+# Unset means wait for every council model.
+STAGE1_QUORUM = int(os.getenv("STAGE1_QUORUM")) if os.getenv("STAGE1_QUORUM") else None
+STAGE1_DEADLINE_SEC = float(os.getenv("STAGE1_DEADLINE_SEC")) if os.getenv("STAGE1_DEADLINE_SEC") else None
+# What to do with models that answer after the quorum/deadline: "drop" or "report"
+STAGE1_STRAGGLER_POLICY = os.getenv("STAGE1_STRAGGLER_POLICY", "drop")
+
+# How stage 2 peer rankings are combined: "mean" (average position), "borda",
+# "copeland" or "schulze"
+RANKING_METHOD = os.getenv("RANKING_METHOD", "mean")
+if RANKING_METHOD not in AGGREGATION_METHODS:
+    # Fail at startup rather than at the end of every council's stage 2
+    raise ValueError(
+        f"Unknown RANKING_METHOD {RANKING_METHOD!r}; expected one of: {', '.join(AGGREGATION_METHODS)}"
+    )
+# Stage 2 output: "text" (free-form critiques + FINAL RANKING) or "json"
+# (schema-constrained ranking with short per-response notes)
+STAGE2_RANKING_MODE = os.getenv("STAGE2_RANKING_MODE", "text")
+# Critique budget per response in "json" mode, in words
+STAGE2_CRITIQUE_MAX_WORDS = int(os.getenv("STAGE2_CRITIQUE_MAX_WORDS", "60"))
+# Responses each stage 2 judge ranks (0 = all). Judges get balanced, overlapping
+# subsets, so prompt size stays ~k responses instead of growing with the council.
+STAGE2_REVIEWS_PER_JUDGE = int(os.getenv("STAGE2_REVIEWS_PER_JUDGE", "0"))
+
+# Stage 2/3 prompts are fitted to the target model's context_length (from the
+# cached model catalog; models not in it impose no limit) minus
+# PROMPT_OUTPUT_RESERVE, and to PROMPT_MAX_TOKENS if set (0 = context limit only).
+# Oversized responses are cut by PROMPT_TRUNCATION: "headtail" or "extractive".
+PROMPT_BUDGET_ENABLED = os.getenv("PROMPT_BUDGET_ENABLED", "true").lower() in ("1", "true", "yes")
+PROMPT_MAX_TOKENS = int(os.getenv("PROMPT_MAX_TOKENS", "0"))
+PROMPT_OUTPUT_RESERVE = int(os.getenv("PROMPT_OUTPUT_RESERVE", "4096"))
+PROMPT_TRUNCATION = os.getenv("PROMPT_TRUNCATION", "headtail")
+
+# Long conversation_context is compacted to a rolling summary of older turns
+# plus the last CONTEXT_RECENT_MESSAGES verbatim, once it exceeds
+# CONTEXT_COMPACT_THRESHOLD_CHARS. Summaries are cached by context prefix, so
+# each turn only summarizes the new messages. The summary model defaults to
+# the chairman.
+CONTEXT_COMPACTION_ENABLED = os.getenv("CONTEXT_COMPACTION_ENABLED", "true").lower() in ("1", "true", "yes")
+CONTEXT_COMPACT_THRESHOLD_CHARS = int(os.getenv("CONTEXT_COMPACT_THRESHOLD_CHARS", "20000"))
+CONTEXT_RECENT_MESSAGES = int(os.getenv("CONTEXT_RECENT_MESSAGES", "4"))
+CONTEXT_SUMMARY_MAX_CHARS = int(os.getenv("CONTEXT_SUMMARY_MAX_CHARS", "4000"))
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "")
+CONTEXT_SUMMARY_CACHE_SIZE = int(os.getenv("CONTEXT_SUMMARY_CACHE_SIZE", "1024"))
 
 # Data directory for conversation storage
 DATA_DIR = "data/conversations"
 
+# Conversation storage engine: "log" (append-only JSONL per conversation),
+# "json" (one JSON file per conversation, rewritten on every change), "sqlite",
+# or "postgres" (async only, needs asyncpg and DATABASE_URL)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "log")
+SQLITE_DB_PATH = os.getenv("SQLITE_DB_PATH", "data/conversations.sqlite3")
+DATABASE_URL = os.getenv("DATABASE_URL", "")
+POSTGRES_POOL_MIN_SIZE = int(os.getenv("POSTGRES_POOL_MIN_SIZE", "1"))
+POSTGRES_POOL_MAX_SIZE = int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10"))
+# Rewrite a conversation log as a single snapshot after this many appended records
+LOG_COMPACT_EVERY = int(os.getenv("LOG_COMPACT_EVERY", "64"))
+
+# In-memory LRU of hot conversations in front of the storage engine
+STORAGE_CACHE_ENABLED = os.getenv("STORAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+STORAGE_CACHE_MAX_MB = int(os.getenv("STORAGE_CACHE_MAX_MB", "64"))
+# Write-behind: buffered changes are flushed this often (0 = write through immediately)
+STORAGE_FLUSH_INTERVAL_SEC = float(os.getenv("STORAGE_FLUSH_INTERVAL_SEC", "1.0"))
+
+# Stage texts at least BLOB_MIN_BYTES long are stored compressed and deduplicated in BLOB_DIR
+STORAGE_BLOBS_ENABLED = os.getenv("STORAGE_BLOBS_ENABLED", "true").lower() in ("1", "true", "yes")
+BLOB_DIR = os.getenv("BLOB_DIR", "data/blobs")
+BLOB_MIN_BYTES = int(os.getenv("BLOB_MIN_BYTES", "256"))
+# Garbage collection (python -m backend.blobs gc) never removes blobs written or reused more recently than this
+BLOB_GC_GRACE_SEC = int(os.getenv("BLOB_GC_GRACE_SEC", "3600"))
+
+# Full-text search index over user prompts and stage1/stage3 texts (SQLite FTS5)
+SEARCH_ENABLED = os.getenv("SEARCH_ENABLED", "true").lower() in ("1", "true", "yes")
+SEARCH_DB_PATH = os.getenv("SEARCH_DB_PATH", "data/search.sqlite3")
+
 # Model configuration file path
 MODELS_CONFIG_FILE = "config/models.json"
 
-# Current model configuration (loaded from file or defaults)
-COUNCIL_MODELS = DEFAULT_COUNCIL_MODELS
-CHAIRMAN_MODEL = DEFAULT_CHAIRMAN_MODEL
+# Current model configuration (COUNCIL_MODELS, CHAIRMAN_MODEL) is loaded from
+# file or defaults on first access; see __getattr__ below
+
+
+def _default_model_config() -> Dict[str, Any]:
+    return {
+        'council_models': DEFAULT_COUNCIL_MODELS,
+        'chairman_model': DEFAULT_CHAIRMAN_MODEL,
+        'presets': {}
+    }
+
+
+models_config = ConfigFile(MODELS_CONFIG_FILE, _default_model_config)
+
+
+def _apply_model_config(config: Dict[str, Any]):
+    global COUNCIL_MODELS, CHAIRMAN_MODEL
+    COUNCIL_MODELS = config.get('council_models', DEFAULT_COUNCIL_MODELS)
+    CHAIRMAN_MODEL = config.get('chairman_model', DEFAULT_CHAIRMAN_MODEL)
+
+
+models_config.subscribe(_apply_model_config)
 
 
 def load_model_config() -> Dict[str, Any]:
     """
-    Load model configuration from file.
+    Load model configuration from file (cached until the file changes).
 
     Returns:
         Dict with 'council_models', 'chairman_model', and 'presets' keys
     """
-    global COUNCIL_MODELS, CHAIRMAN_MODEL
-
-    try:
-        with open(MODELS_CONFIG_FILE, 'r') as f:
-            config = json.load(f)
-            # Update globals
-            COUNCIL_MODELS = config.get('council_models', DEFAULT_COUNCIL_MODELS)
-            CHAIRMAN_MODEL = config.get('chairman_model', DEFAULT_CHAIRMAN_MODEL)
-            
-            # Ensure 'presets' key exists in the returned config
-            if 'presets' not in config:
-                config['presets'] = {}
-                
-            return config
-    except (FileNotFoundError, json.JSONDecodeError):
-        # Return defaults if file doesn't exist or is invalid
-        return {
-            'council_models': DEFAULT_COUNCIL_MODELS,
-            'chairman_model': DEFAULT_CHAIRMAN_MODEL,
-            'presets': {}
-        }
+    config = models_config.get()
+    # Ensure 'presets' key exists in the returned config
+    config.setdefault('presets', {})
+    return config
 
 
 def save_model_config(council_models: List[str], chairman_model: str, presets: Optional[Dict[str, Any]] = None) -> bool:
@@ -162,13 +352,10 @@ def save_model_config(council_models: List[str], chairman_model: str, presets: O
     Returns:
         True if successful, False otherwise
     """
-    global COUNCIL_MODELS, CHAIRMAN_MODEL
-
-    # If presets is None, try to preserve existing presets from file
+    # If presets is None, preserve the existing presets
     if presets is None:
-        existing_config = load_model_config()
-        presets = existing_config.get('presets', {})
-    
+        presets = load_model_config().get('presets', {})
+
     config = {
         'council_models': council_models,
         'chairman_model': chairman_model,
@@ -176,16 +363,7 @@ def save_model_config(council_models: List[str], chairman_model: str, presets: O
     }
 
     try:
-        # Ensure config directory exists
-        os.makedirs(os.path.dirname(MODELS_CONFIG_FILE), exist_ok=True)
-
-        with open(MODELS_CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
-
-        # Update global variables for the current running process
-        COUNCIL_MODELS = council_models
-        CHAIRMAN_MODEL = chairman_model
-
+        models_config.write(config)
         return True
     except Exception as e:
         print(f"Error saving model config: {e}")
@@ -199,7 +377,6 @@ def get_current_config() -> Dict[str, Any]:
     Returns:
         Dict with current config and system defaults
     """
-    # Always reload from file to ensure we have the latest state (especially presets)
     config = load_model_config()
     return {
         'council_models': COUNCIL_MODELS,
@@ -212,6 +389,19 @@ def get_current_config() -> Dict[str, Any]:
     }
 
 
-# Load configurations on module import
-load_api_keys()
-load_model_config()
+# Config files are read lazily, so importing this module does no file I/O
+# beyond .env. The globals below appear on first access (and are kept current
+# by the ConfigFile subscribers afterwards).
+_LAZY_GLOBALS = {
+    'OPENROUTER_API_KEY': load_api_keys,
+    'COUNCIL_MODELS': load_model_config,
+    'CHAIRMAN_MODEL': load_model_config,
+}
+
+
+def __getattr__(name: str) -> Any:
+    loader = _LAZY_GLOBALS.get(name)
+    if loader is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    loader()
+    return globals()[name]
@@ -0,0 +1,216 @@
+"""Compaction of long conversation context into a cached rolling summary."""
+
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+from .config import (
+    CONTEXT_COMPACTION_ENABLED,
+    CONTEXT_COMPACT_THRESHOLD_CHARS,
+    CONTEXT_RECENT_MESSAGES,
+    CONTEXT_SUMMARY_MAX_CHARS,
+    CONTEXT_SUMMARY_CACHE_SIZE,
+)
+from .openrouter import query_model
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+
+
+def prefix_hashes(messages: List[Dict[str, Any]], seed: str = "") -> List[str]:
+    """
+    Chained hashes of every prefix: hashes[i] identifies messages[:i + 1].
+
+    Each hash covers the previous one, so a conversation that grows by a turn
+    keeps all its earlier prefix hashes and cached summaries stay reachable.
+    """
+    hashes = []
+    digest = hashlib.sha256(seed.encode("utf-8")).hexdigest()
+    for message in messages:
+        h = hashlib.sha256(digest.encode("ascii"))
+        h.update(b"\0" + message.get("role", "").encode("utf-8") + b"\0")
+        h.update((message.get("content") or "").encode("utf-8"))
+        digest = h.hexdigest()
+        hashes.append(digest)
+    return hashes
+
+
+def _context_chars(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(message.get("content") or "") for message in messages)
+
+
+def _cap_summary(text: str, max_chars: int) -> str:
+    """Cut an over-long summary at the last sentence end that fits."""
+    text = text.strip()
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    end = max(cut.rfind(". "), cut.rfind(".\n"), cut.rfind("\n"))
+    return cut[:end + 1].rstrip() if end > max_chars // 2 else cut.rstrip()
+
+
+def _summary_prompt(summary: str, messages: List[Dict[str, Any]], max_chars: int) -> str:
+    transcript = "\n\n".join(
+        f"{message['role'].upper()}: {message.get('content') or ''}" for message in messages
+    )
+    previous = summary or "(none yet)"
+    return f"""You maintain a running summary of a conversation between a user and an AI council.
+
+Current summary:
+{previous}
+
+New messages since that summary:
+{transcript}
+
+Rewrite the summary so it also covers the new messages. Keep the facts, decisions, constraints, open questions and anything the user asked to remember; drop pleasantries and repetition. Write plain prose in at most {max_chars} characters.
+
+Updated summary:"""
+
+
+class ContextCompactor:
+    """
+    Rolling summaries of older conversation turns, cached by context prefix.
+
+    A long context is replaced by one system message summarizing everything but
+    the last few messages, followed by those messages verbatim. Summaries are
+    kept in an LRU keyed by the chained hash of the summarized prefix; a new
+    turn finds the longest prefix already summarized and only asks the model to
+    fold the messages after it into that summary. Concurrent requests for the
+    same prefix share one summarization call.
+    """
+
+    def __init__(self, max_entries: int = CONTEXT_SUMMARY_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key: str) -> Optional[str]:
+        summary = self._summaries.get(key)
+        if summary is not None:
+            self._summaries.move_to_end(key)
+        return summary
+
+    def _put(self, key: str, summary: str):
+        self._summaries[key] = summary
+        self._summaries.move_to_end(key)
+        while len(self._summaries) > self.max_entries:
+            self._summaries.popitem(last=False)
+
+    async def _summarize(
+        self,
+        key: str,
+        summary: str,
+        messages: List[Dict[str, Any]],
+        model: str,
+        api_key: str,
+        max_chars: int,
+    ) -> Optional[str]:
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run_summary(key, summary, messages, model, api_key, max_chars))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        # A cancelled request must not cancel a summary other requests are waiting for
+        return await asyncio.shield(task)
+
+    async def _run_summary(
+        self,
+        key: str,
+        summary: str,
+        messages: List[Dict[str, Any]],
+        model: str,
+        api_key: str,
+        max_chars: int,
+    ) -> Optional[str]:
+        prompt = _summary_prompt(summary, messages, max_chars)
+        response = await query_model(model, [{"role": "user", "content": prompt}], api_key=api_key)
+        if response is None or not (response.get('content') or '').strip():
+            return None
+        updated = _cap_summary(response['content'], max_chars)
+        self._put(key, updated)
+        return updated
+
+    async def compact(
+        self,
+        messages: List[Dict[str, Any]],
+        model: str,
+        api_key: str,
+        max_total_chars: int,
+        threshold_chars: int = CONTEXT_COMPACT_THRESHOLD_CHARS,
+        recent_messages: int = CONTEXT_RECENT_MESSAGES,
+        summary_max_chars: int = CONTEXT_SUMMARY_MAX_CHARS,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Compact a conversation context if it is long.
+
+        Args:
+            messages: The conversation context (oldest first)
+            model: Model that writes the summary
+            max_total_chars: Hard cap on the compacted context; the summary is
+                sized to fit next to the verbatim messages, and if summarizing
+                fails the oldest messages are dropped instead
+            threshold_chars: Contexts up to this size are returned unchanged
+            recent_messages: Messages kept verbatim at the end
+            summary_max_chars: Upper bound on the summary size
+
+        Returns:
+            Tuple of (context to send, compaction info or None if unchanged)
+        """
+        original_chars = _context_chars(messages)
+        if original_chars <= min(threshold_chars, max_total_chars):
+            return messages, None
+
+        cut = max(len(messages) - recent_messages, 0)
+        recent_chars = _context_chars(messages[cut:])
+        max_chars = max(min(summary_max_chars, max_total_chars - recent_chars - len(SUMMARY_PREFIX)), 0)
+
+        start, summary = 0, ""
+        if cut and max_chars:
+            hashes = prefix_hashes(messages[:cut], seed=f"{model}\0{max_chars}")
+            # Longest prefix that already has a summary
+            for i in range(cut, 0, -1):
+                cached = self._get(hashes[i - 1])
+                if cached is not None:
+                    start, summary = i, cached
+                    break
+            if start == cut:
+                self.hits += 1
+            else:
+                self.misses += 1
+                updated = await self._summarize(hashes[cut - 1], summary, messages[start:cut], model, api_key, max_chars)
+                if updated is None:
+                    # Keep the last good summary and the rest verbatim
+                    cut = start
+                else:
+                    summary = updated
+
+        compacted = ([{"role": "system", "content": SUMMARY_PREFIX + summary}] if summary else []) + messages[cut:]
+        dropped = 0
+        while len(compacted) > 1 and _context_chars(compacted) > max_total_chars:
+            compacted.pop(1 if summary else 0)
+            dropped += 1
+
+        return compacted, {
+            "summarized_messages": cut,
+            "reused_messages": start,
+            "dropped_messages": dropped,
+            "summary_chars": len(summary),
+            "original_chars": original_chars,
+            "compacted_chars": _context_chars(compacted),
+        }
+
+
+context_compactor = ContextCompactor()
+
+
+async def compact_context(
+    messages: Optional[List[Dict[str, Any]]],
+    model: str,
+    api_key: str,
+    max_total_chars: int,
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[Dict[str, Any]]]:
+    """Compact `messages` with the shared compactor (unchanged if compaction is disabled)."""
+    if not messages or not CONTEXT_COMPACTION_ENABLED:
+        return messages, None
+    return await context_compactor.compact(messages, model, api_key, max_total_chars)
@@ -1,7 +1,35 @@
 """3-stage LLM Council orchestration."""
 
-from typing import List, Dict, Any, Tuple, Optional
-from .openrouter import query_models_parallel, query_model
+import asyncio
+from typing import List, Dict, Any, Tuple, Optional, Callable, Set
+from .config import (
+    STAGE1_QUORUM,
+    STAGE1_DEADLINE_SEC,
+    RANKING_METHOD,
+    STAGE2_RANKING_MODE,
+    STAGE2_CRITIQUE_MAX_WORDS,
+    STAGE2_REVIEWS_PER_JUDGE,
+)
+from .ranking import (
+    aggregate_rankings,
+    assign_reviews,
+    parse_ranking,
+    parse_structured_ranking,
+    ranking_response_format,
+    render_structured_ranking,
+    response_labels,
+)
+from .prompt_budget import fit_sections, prompt_budget
+from .openrouter import (
+    model_catalog,
+    query_models_as_completed,
+    query_model,
+    query_model_stream,
+    start_model_queries,
+)
+
+# Keeps straggler watchers alive until they finish (the event loop only holds weak references)
+_background_tasks = set()
 
 
 async def stage1_collect_responses(
@@ -9,31 +37,97 @@ async def stage1_collect_responses(
     council_models: List[str],
     api_key: str,
     conversation_context: Optional[List[Dict[str, Any]]] = None,
+    on_delta: Optional[Callable[[str, str], None]] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    quorum: Optional[int] = STAGE1_QUORUM,
+    deadline: Optional[float] = STAGE1_DEADLINE_SEC,
+    on_late_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    straggler_tasks: Optional[Set[asyncio.Task]] = None,
 ) -> List[Dict[str, Any]]:
     """
     Stage 1: Collect individual responses from all council models.
 
+    By default every model is awaited. With a quorum and/or deadline, the stage
+    returns as soon as `quorum` models have answered, or once `deadline` seconds
+    have passed and at least one model has answered. Models still running at
+    that point (stragglers) are cancelled, unless `on_late_result` is given, in
+    which case they keep running and their results are reported through it.
+
     Args:
         user_query: The user's question
         conversation_context: Optional list of prior conversation messages
+        on_delta: Optional callback (model, text) to stream tokens as they arrive
+        on_result: Optional callback invoked with each result as soon as its model finishes
+        quorum: Number of successful responses to wait for (None means all models)
+        deadline: Seconds after which to proceed with the responses in hand
+        on_late_result: Optional callback for straggler results arriving after the stage returns
+        straggler_tasks: Optional set that receives the task watching stragglers, so the
+            caller can cancel it (and the requests it waits on) when the run ends
 
     Returns:
-        List of dicts with 'model' and 'response' keys
+        List of dicts with 'model' and 'response' keys, in council order
     """
     # Build messages with conversation context + current user query
     messages = (conversation_context or []) + [{"role": "user", "content": user_query}]
 
-    # Query all models in parallel
-    responses = await query_models_parallel(council_models, messages, api_key=api_key)
+    def format_result(model: str, response: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "model": model,
+            "response": response.get('content', '')
+        }
+
+    # Query all models in parallel, handling each response as it arrives
+    loop = asyncio.get_running_loop()
+    deadline_at = loop.time() + deadline if deadline is not None else None
+    needed = min(quorum, len(council_models)) if quorum else len(council_models)
 
-    # Format results
     stage1_results = []
-    for model, response in responses.items():
-        if response is not None:  # Only include successful responses
-            stage1_results.append({
-                "model": model,
-                "response": response.get('content', '')
-            })
+    pending = set(start_model_queries(council_models, messages, api_key=api_key, on_delta=on_delta))
+    try:
+        while pending and len(stage1_results) < needed:
+            # The deadline only applies once there is something to move on with
+            timeout = None
+            if deadline_at is not None and stage1_results:
+                timeout = max(0.0, deadline_at - loop.time())
+
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                break
+
+            for task in done:
+                model, response = task.result()
+                if response is not None:  # Only include successful responses
+                    result = format_result(model, response)
+                    stage1_results.append(result)
+                    if on_result:
+                        on_result(result)
+    except BaseException:
+        for task in pending:
+            task.cancel()
+        raise
+
+    if pending:
+        if on_late_result is None:
+            for task in pending:
+                task.cancel()
+        else:
+            async def report_stragglers():
+                try:
+                    for next_done in asyncio.as_completed(pending):
+                        model, response = await next_done
+                        if response is not None:
+                            on_late_result(format_result(model, response))
+                finally:
+                    for task in pending:
+                        task.cancel()
+
+            watcher = asyncio.create_task(report_stragglers())
+            owner = straggler_tasks if straggler_tasks is not None else _background_tasks
+            owner.add(watcher)
+            watcher.add_done_callback(owner.discard)
+
+    # Keep council order so anonymized labels are stable between runs
+    stage1_results.sort(key=lambda r: council_models.index(r['model']))
 
     return stage1_results
 
@@ -44,6 +138,10 @@ async def stage2_collect_rankings(
     council_models: List[str],
     api_key: str,
     conversation_context: Optional[List[Dict[str, Any]]] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ranking_mode: str = STAGE2_RANKING_MODE,
+    critique_words: int = STAGE2_CRITIQUE_MAX_WORDS,
+    reviews_per_judge: Optional[int] = STAGE2_REVIEWS_PER_JUDGE,
 ) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
     """
     Stage 2: Each model ranks the anonymized responses.
@@ -52,12 +150,19 @@ async def stage2_collect_rankings(
         user_query: The original user query
         stage1_results: Results from Stage 1
         conversation_context: Optional list of prior conversation messages
+        on_result: Optional callback invoked with each ranking as soon as its model finishes
+        ranking_mode: "text" for a free-form critique ending in FINAL RANKING, or
+            "json" for a short structured ranking (see _collect_json_rankings)
+        critique_words: Per-response critique budget in "json" mode
+        reviews_per_judge: If set (and below the number of responses), each judge
+            ranks only a balanced subset of this many responses (see assign_reviews),
+            recorded in each result's 'reviewed' list
 
     Returns:
         Tuple of (rankings list, label_to_model mapping)
     """
-    # Create anonymized labels for responses (Response A, Response B, etc.)
-    labels = [chr(65 + i) for i in range(len(stage1_results))]  # A, B, C, ...
+    # Create anonymized labels for responses (Response A, Response B, ..., Response AA, ...)
+    labels = response_labels(len(stage1_results))
 
     # Create mapping from label to model name
     label_to_model = {
@@ -65,13 +170,74 @@ async def stage2_collect_rankings(
         for label, result in zip(labels, stage1_results)
     }
 
-    # Build the ranking prompt
-    responses_text = "\n\n".join([
-        f"Response {label}:\n{result['response']}"
+    label_to_response = {
+        f"Response {label}": result['response']
         for label, result in zip(labels, stage1_results)
+    }
+    # Sparse judges never get their own response
+    model_to_label = {model: label for label, model in label_to_model.items()}
+    assignments = assign_reviews(
+        list(label_to_model),
+        len(council_models),
+        reviews_per_judge,
+        [model_to_label.get(model) for model in council_models],
+    )
+
+    if ranking_mode == "json" or any(len(a) < len(label_to_model) for a in assignments):
+        stage2_results = await _collect_judge_rankings(
+            user_query,
+            label_to_response,
+            dict(zip(council_models, assignments)),
+            api_key,
+            conversation_context,
+            on_result,
+            ranking_mode,
+            critique_words,
+        )
+        stage2_results.sort(key=lambda r: council_models.index(r['model']))
+        return stage2_results, label_to_model
+
+    # Build the ranking prompt, fitting the responses into the smallest judge's context
+    budget = prompt_budget(council_models, _text_ranking_prompt(user_query, ""), conversation_context)
+    fitted, trimmed = fit_sections(label_to_response, budget)
+    responses_text = _responses_text(fitted, list(fitted))
+
+    ranking_prompt = _text_ranking_prompt(user_query, responses_text)
+
+    # Build messages with conversation context + ranking prompt
+    messages = (conversation_context or []) + [{"role": "user", "content": ranking_prompt}]
+
+    # Get rankings from all council models in parallel, handling each as it arrives
+    stage2_results = []
+    async for model, response in query_models_as_completed(council_models, messages, api_key=api_key):
+        if response is not None:
+            full_text = response.get('content', '')
+            parsed = parse_ranking(full_text, label_to_model)
+            result = {
+                "model": model,
+                "ranking": full_text,
+                "parsed_ranking": parsed
+            }
+            if trimmed:
+                result["prompt_trimmed"] = trimmed
+            stage2_results.append(result)
+            if on_result:
+                on_result(result)
+
+    stage2_results.sort(key=lambda r: council_models.index(r['model']))
+
+    return stage2_results, label_to_model
+
+
+def _responses_text(label_to_response: Dict[str, str], labels: List[str]) -> str:
+    return "\n\n".join([
+        f"{label}:\n{label_to_response[label]}"
+        for label in labels
     ])
 
-    ranking_prompt = f"""You are evaluating different responses to the following question:
+
+def _text_ranking_prompt(user_query: str, responses_text: str) -> str:
+    return f"""You are evaluating different responses to the following question:
 
 Question: {user_query}
 
@@ -102,25 +268,133 @@ FINAL RANKING:
 
 Now provide your evaluation and ranking:"""
 
-    # Build messages with conversation context + ranking prompt
-    messages = (conversation_context or []) + [{"role": "user", "content": ranking_prompt}]
 
-    # Get rankings from all council models in parallel
-    responses = await query_models_parallel(council_models, messages, api_key=api_key)
+def _catalog_supports(model: str, parameter: str) -> Optional[bool]:
+    """Whether the model catalog lists `parameter` for the model (None if the model is unknown)."""
+    catalog = model_catalog.peek()
+    if catalog is None or model not in catalog.by_id:
+        return None
+    return parameter in (catalog.by_id[model].get("supported_parameters") or [])
 
-    # Format results
-    stage2_results = []
-    for model, response in responses.items():
-        if response is not None:
-            full_text = response.get('content', '')
-            parsed = parse_ranking_from_text(full_text)
-            stage2_results.append({
-                "model": model,
-                "ranking": full_text,
-                "parsed_ranking": parsed
-            })
 
-    return stage2_results, label_to_model
+def _supports_structured_output(model: str) -> Optional[bool]:
+    """Whether the model catalog says the model accepts json_schema output (None if unknown)."""
+    return _catalog_supports(model, "structured_outputs")
+
+
+async def _collect_judge_rankings(
+    user_query: str,
+    label_to_response: Dict[str, str],
+    assignments: Dict[str, List[str]],
+    api_key: str,
+    conversation_context: Optional[List[Dict[str, Any]]],
+    on_result: Optional[Callable[[Dict[str, Any]], None]],
+    ranking_mode: str,
+    critique_words: int,
+) -> List[Dict[str, Any]]:
+    """
+    Stage 2 with a prompt per judge: sparse review assignments and/or "json" mode.
+
+    Each judge sees only the responses in `assignments[model]`, under their
+    global labels, so partial rankings aggregate directly; they are fitted to
+    that judge's own context window. In "json" mode judges
+    are asked for a `response_format` JSON object (ordered labels plus a 1-10
+    score and a critique of at most `critique_words` words per response), which
+    makes stage 2 far cheaper than free-form critiques. Models the catalog lists
+    without structured output support, models whose JSON request fails, and
+    models whose reply isn't a usable JSON ranking (empty, truncated, prose)
+    are asked with the text prompt instead.
+    """
+    sparse = any(len(labels) < len(label_to_response) for labels in assignments.values())
+    context = conversation_context or []
+
+    async def judge(model: str) -> Optional[Dict[str, Any]]:
+        labels = assignments[model]
+        budget = prompt_budget([model], _text_ranking_prompt(user_query, ""), context)
+        fitted, trimmed = fit_sections({label: label_to_response[label] for label in labels}, budget)
+        responses_text = _responses_text(fitted, labels)
+        result = None
+        if ranking_mode == "json" and _supports_structured_output(model) is not False:
+            result = await _json_ranking(model, user_query, responses_text, labels, api_key, context, critique_words)
+        if result is None:
+            # The regular free-form ranking (also the fallback for failed JSON rankings)
+            messages = context + [{"role": "user", "content": _text_ranking_prompt(user_query, responses_text)}]
+            response = await query_model(model, messages, api_key=api_key)
+            if response is not None:
+                content = response.get('content', '')
+                result = {"model": model, "ranking": content, "parsed_ranking": parse_ranking(content, labels)}
+        if result is not None and sparse:
+            result["reviewed"] = labels
+        if result is not None and trimmed:
+            result["prompt_trimmed"] = trimmed
+        return result
+
+    tasks = [asyncio.create_task(judge(model)) for model in assignments]
+    results = []
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            if result is not None:
+                results.append(result)
+                if on_result:
+                    on_result(result)
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+    return results
+
+
+async def _json_ranking(
+    model: str,
+    user_query: str,
+    responses_text: str,
+    labels: List[str],
+    api_key: str,
+    context: List[Dict[str, Any]],
+    critique_words: int,
+) -> Optional[Dict[str, Any]]:
+    """
+    One judge's ranking as schema-constrained JSON.
+
+    Returns None if the request failed or the reply has no usable ranking, so
+    the judge is asked again with the text prompt rather than casting an empty
+    ballot.
+    """
+    json_prompt = f"""You are evaluating different responses to the following question:
+
+Question: {user_query}
+
+Here are the responses from different models (anonymized):
+
+{responses_text}
+
+For each response, give a score from 1 (poor) to 10 (excellent) and a critique of at most {critique_words} words.
+Then rank ALL responses from best to worst.
+
+Reply with JSON only, in this shape:
+{{"ranking": ["Response C", "Response A", ...], "notes": [{{"label": "Response A", "score": 7, "note": "..."}}, ...]}}"""
+
+    messages = context + [{"role": "user", "content": json_prompt}]
+    extra_body: Dict[str, Any] = {"response_format": ranking_response_format(labels, critique_words)}
+    # Reasoning tokens count against max_tokens, so only cap models known not to
+    # reason: room for every note at ~2 tokens per word, plus the JSON scaffolding
+    if _catalog_supports(model, "reasoning") is False:
+        extra_body["max_tokens"] = 256 + len(labels) * (critique_words * 2 + 32)
+    response = await query_model(model, messages, api_key=api_key, extra_body=extra_body)
+    if response is None:
+        return None
+
+    structured = parse_structured_ranking(response.get('content') or '', labels)
+    if structured is None:
+        return None
+    ranking, notes = structured
+    return {
+        "model": model,
+        "ranking": render_structured_ranking(ranking, notes),
+        "parsed_ranking": ranking,
+        "notes": notes,
+    }
 
 
 async def stage3_synthesize_final(
@@ -130,6 +404,7 @@ async def stage3_synthesize_final(
     chairman_model: str,
     api_key: str,
     conversation_context: Optional[List[Dict[str, Any]]] = None,
+    on_delta: Optional[Callable[[str], None]] = None,
 ) -> Dict[str, Any]:
     """
     Stage 3: Chairman synthesizes final response.
@@ -138,22 +413,57 @@ async def stage3_synthesize_final(
         user_query: The original user query
         stage1_results: Individual model responses from Stage 1
         stage2_results: Rankings from Stage 2
+        on_delta: Optional callback to stream the chairman's tokens as they arrive
 
     Returns:
-        Dict with 'model' and 'response' keys
+        Dict with 'model' and 'response' keys, plus 'prompt_trimmed' if any
+        response or ranking was truncated to fit the chairman's context
     """
-    # Build comprehensive context for chairman
+    # Build comprehensive context for chairman, fitted to the chairman's context window
+    sections = {f"stage1:{result['model']}": result['response'] for result in stage1_results}
+    sections.update({f"stage2:{result['model']}": result['ranking'] for result in stage2_results})
+    budget = prompt_budget([chairman_model], _chairman_prompt(user_query, "", ""), conversation_context)
+    fitted, trimmed = fit_sections(sections, budget)
+
     stage1_text = "\n\n".join([
-        f"Model: {result['model']}\nResponse: {result['response']}"
+        f"Model: {result['model']}\nResponse: {fitted['stage1:' + result['model']]}"
         for result in stage1_results
     ])
 
     stage2_text = "\n\n".join([
-        f"Model: {result['model']}\nRanking: {result['ranking']}"
+        f"Model: {result['model']}\nRanking: {fitted['stage2:' + result['model']]}"
         for result in stage2_results
     ])
 
-    chairman_prompt = f"""You are the Chairman of an LLM Council. Multiple AI models have provided responses to a user's question, and then ranked each other's responses.
+    chairman_prompt = _chairman_prompt(user_query, stage1_text, stage2_text)
+
+    # Build messages with conversation context + chairman prompt
+    messages = (conversation_context or []) + [{"role": "user", "content": chairman_prompt}]
+
+    # Query the chairman model
+    if on_delta is None:
+        response = await query_model(chairman_model, messages, api_key=api_key)
+    else:
+        response = await query_model_stream(chairman_model, messages, api_key=api_key, on_delta=on_delta)
+
+    if response is None:
+        # Fallback if chairman fails
+        result = {
+            "model": chairman_model,
+            "response": "Error: Unable to generate final synthesis."
+        }
+    else:
+        result = {
+            "model": chairman_model,
+            "response": response.get('content', '')
+        }
+    if trimmed:
+        result["prompt_trimmed"] = trimmed
+    return result
+
+
+def _chairman_prompt(user_query: str, stage1_text: str, stage2_text: str) -> str:
+    return f"""You are the Chairman of an LLM Council. Multiple AI models have provided responses to a user's question, and then ranked each other's responses.
 
 Original Question: {user_query}
 
@@ -170,24 +480,6 @@ Your task as Chairman is to synthesize all of this information into a single, co
 
 Provide a clear, well-reasoned final answer that represents the council's collective wisdom:"""
 
-    # Build messages with conversation context + chairman prompt
-    messages = (conversation_context or []) + [{"role": "user", "content": chairman_prompt}]
-
-    # Query the chairman model
-    response = await query_model(chairman_model, messages, api_key=api_key)
-
-    if response is None:
-        # Fallback if chairman fails
-        return {
-            "model": chairman_model,
-            "response": "Error: Unable to generate final synthesis."
-        }
-
-    return {
-        "model": chairman_model,
-        "response": response.get('content', '')
-    }
-
 
 def parse_ranking_from_text(ranking_text: str) -> List[str]:
     """
@@ -199,75 +491,34 @@ def parse_ranking_from_text(ranking_text: str) -> List[str]:
     Returns:
         List of response labels in ranked order
     """
-    import re
-
-    # Look for "FINAL RANKING:" section
-    if "FINAL RANKING:" in ranking_text:
-        # Extract everything after "FINAL RANKING:"
-        parts = ranking_text.split("FINAL RANKING:")
-        if len(parts) >= 2:
-            ranking_section = parts[1]
-            # Try to extract numbered list format (e.g., "1. Response A")
-            # This pattern looks for: number, period, optional space, "Response X"
-            numbered_matches = re.findall(r'\d+\.\s*Response [A-Z]', ranking_section)
-            if numbered_matches:
-                # Extract just the "Response X" part
-                return [re.search(r'Response [A-Z]', m).group() for m in numbered_matches]
-
-            # Fallback: Extract all "Response X" patterns in order
-            matches = re.findall(r'Response [A-Z]', ranking_section)
-            return matches
-
-    # Fallback: try to find any "Response X" patterns in order
-    matches = re.findall(r'Response [A-Z]', ranking_text)
-    return matches
+    return parse_ranking(ranking_text)
 
 
 def calculate_aggregate_rankings(
     stage2_results: List[Dict[str, Any]],
-    label_to_model: Dict[str, str]
+    label_to_model: Dict[str, str],
+    method: str = RANKING_METHOD,
 ) -> List[Dict[str, Any]]:
     """
     Calculate aggregate rankings across all models.
 
     Args:
-        stage2_results: Rankings from each model
+        stage2_results: Rankings from each model (possibly partial, see 'reviewed')
         label_to_model: Mapping from anonymous labels to model names
+        method: Aggregation method ('mean', 'borda', 'copeland' or 'schulze')
 
     Returns:
-        List of dicts with model name and average rank, sorted best to worst
+        List of dicts with model name, average rank and method score, sorted best to worst
     """
-    from collections import defaultdict
-
-    # Track positions for each model
-    model_positions = defaultdict(list)
-
-    for ranking in stage2_results:
-        ranking_text = ranking['ranking']
-
-        # Parse the ranking from the structured format
-        parsed_ranking = parse_ranking_from_text(ranking_text)
-
-        for position, label in enumerate(parsed_ranking, start=1):
-            if label in label_to_model:
-                model_name = label_to_model[label]
-                model_positions[model_name].append(position)
-
-    # Calculate average position for each model
-    aggregate = []
-    for model, positions in model_positions.items():
-        if positions:
-            avg_rank = sum(positions) / len(positions)
-            aggregate.append({
-                "model": model,
-                "average_rank": round(avg_rank, 2),
-                "rankings_count": len(positions)
-            })
-
-    # Sort by average rank (lower is better)
-    aggregate.sort(key=lambda x: x['average_rank'])
-
-    return aggregate
+    # Stage 2 already parsed each ranking; only re-parse results stored without it
+    ballots = [
+        ranking['parsed_ranking'] if 'parsed_ranking' in ranking
+        else parse_ranking(ranking.get('ranking', ''), ranking.get('reviewed', label_to_model))
+        for ranking in stage2_results
+    ]
+    # Sparse stage 2 judges only saw their assigned subset; the rest is unknown, not worse
+    reviewed = [ranking.get('reviewed') for ranking in stage2_results]
+    return aggregate_rankings(ballots, label_to_model, method, reviewed)
 
 
 async def generate_conversation_title(user_query: str, api_key: str) -> str:
@@ -313,18 +564,32 @@ async def run_full_council(
     council_models: List[str],
     chairman_model: str,
     api_key: str,
+    quorum: Optional[int] = STAGE1_QUORUM,
+    deadline: Optional[float] = STAGE1_DEADLINE_SEC,
+    ranking_mode: str = STAGE2_RANKING_MODE,
+    reviews_per_judge: Optional[int] = STAGE2_REVIEWS_PER_JUDGE,
 ) -> Tuple[List, List, Dict, Dict]:
     """
     Run the complete 3-stage council process.
 
     Args:
         user_query: The user's question
+        quorum: Stage 1 responses to wait for before ranking (None means all)
+        deadline: Seconds after which stage 1 proceeds with the responses in hand
+        ranking_mode: Stage 2 output mode, "text" or "json"
+        reviews_per_judge: Responses each stage 2 judge ranks (None or 0 means all)
 
     Returns:
         Tuple of (stage1_results, stage2_results, stage3_result, metadata)
     """
-    # Stage 1: Collect individual responses
-    stage1_results = await stage1_collect_responses(user_query, council_models=council_models, api_key=api_key)
+    # Stage 1: Collect individual responses (stragglers past the quorum are dropped)
+    stage1_results = await stage1_collect_responses(
+        user_query,
+        council_models=council_models,
+        api_key=api_key,
+        quorum=quorum,
+        deadline=deadline,
+    )
 
     # If no models responded successfully, return error
     if not stage1_results:
@@ -339,6 +604,8 @@ async def run_full_council(
         stage1_results,
         council_models=council_models,
         api_key=api_key,
+        ranking_mode=ranking_mode,
+        reviews_per_judge=reviews_per_judge,
     )
 
     # Calculate aggregate rankings
@@ -358,5 +625,12 @@ async def run_full_council(
         "label_to_model": label_to_model,
         "aggregate_rankings": aggregate_rankings
     }
+    # What was truncated to fit each stage's prompt budget
+    stage2_trimmed = {r['model']: r['prompt_trimmed'] for r in stage2_results if r.get('prompt_trimmed')}
+    if stage2_trimmed or stage3_result.get('prompt_trimmed'):
+        metadata["prompt_trimmed"] = {
+            "stage2": stage2_trimmed,
+            "stage3": stage3_result.get('prompt_trimmed', []),
+        }
 
     return stage1_results, stage2_results, stage3_result, metadata
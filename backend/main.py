@@ -2,9 +2,10 @@
 
 from fastapi import FastAPI, HTTPException, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Set
+from contextlib import asynccontextmanager
 import uuid
 import json
 import asyncio
@@ -17,9 +18,40 @@ from .council import (
     stage3_synthesize_final,
     calculate_aggregate_rankings,
 )
-from .openrouter import fetch_available_models
+from .openrouter import model_catalog, prewarm_http_client, close_http_client
+from .cache import response_cache
+from .coalescing import RunCoalescer, key_fingerprint, run_key
+from .scheduler import council_scheduler, QueueFullError
+from .config import (
+    STAGE1_QUORUM,
+    STAGE1_DEADLINE_SEC,
+    STAGE1_STRAGGLER_POLICY,
+    STAGE2_RANKING_MODE,
+    STAGE2_REVIEWS_PER_JUDGE,
+    CONTEXT_COMPACTION_ENABLED,
+    CONTEXT_SUMMARY_MODEL,
+)
+from .context import compact_context
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Warm the shared HTTP client and start the storage flusher; flush and close on shutdown."""
+    # Storage (and its sqlite/zlib imports) is only loaded by servers that run a lifespan
+    from .storage import flush_storage, run_write_behind, close_async_storage
+
+    prewarm_http_client()
+    write_behind = asyncio.create_task(run_write_behind())
+    yield
+    write_behind.cancel()
+    await close_async_storage()
+    await asyncio.to_thread(flush_storage)
+    await close_http_client()
+    if response_cache is not None:
+        response_cache.close()
+
 
-app = FastAPI(title="LLM Council API")
+app = FastAPI(title="LLM Council API", lifespan=lifespan)
 
 # Enable CORS (tighten in public deployments)
 #
@@ -66,6 +98,15 @@ class CouncilStreamRequest(BaseModel):
     conversation_context: Optional[List[Dict[str, Any]]] = None
     # Whether this is the first message in the conversation (for title generation)
     is_first_message: Optional[bool] = None
+    # Optional stage 1 quorum policy (defaults come from backend/config.py)
+    stage1_quorum: Optional[int] = None
+    stage1_deadline: Optional[float] = None
+    # "drop" cancels stage 1 stragglers, "report" streams them as stage1_late_response events
+    straggler_policy: Optional[str] = None
+    # Stage 2 output: "text" critiques or compact "json" rankings (default from backend/config.py)
+    ranking_mode: Optional[str] = None
+    # Responses each stage 2 judge ranks; lower is faster but less precise (0 = all)
+    reviews_per_judge: Optional[int] = None
 
     model_config = {
         "populate_by_name": True,
@@ -94,6 +135,13 @@ _RATE_WINDOW_SEC = 30
 _RATE_MAX_REQS = 30
 _rate_state: Dict[str, List[float]] = {}
 
+# conversation_context limits. With compaction enabled, the total limit caps the
+# compacted context (summary + recent messages) sent upstream; the raw context
+# may grow to _MAX_RAW_CONTEXT_CHARS.
+_MAX_CONTEXT_CHARS = 25000
+_MAX_CONTEXT_MESSAGE_CHARS = 5000  # Per-message limit
+_MAX_RAW_CONTEXT_CHARS = 1_000_000
+
 
 def _check_rate_limit(client_ip: str):
     import time
@@ -108,6 +156,149 @@ def _check_rate_limit(client_ip: str):
     _rate_state[client_ip] = bucket
 
 
+# In-flight council runs, keyed on everything that determines their output
+council_runs = RunCoalescer()
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    """Format an event dict as a Server-Sent Events data frame."""
+    return f"data: {json.dumps(event)}\n\n"
+
+
+async def _drain_events(task: asyncio.Task, events: asyncio.Queue):
+    """Yield progress events queued by `task` until it finishes."""
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    while True:
+        event = await events.get()
+        if event is None:
+            break
+        yield event
+
+
+async def _council_events(
+    body: CouncilStreamRequest,
+    api_key: str,
+    quorum: Optional[int],
+    deadline: Optional[float],
+    straggler_policy: str,
+    ranking_mode: str,
+    reviews_per_judge: int,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Run the 3-stage council pipeline, yielding progress events as dicts.
+
+    Every task the pipeline starts is cancelled when it ends, including when the
+    consumer stops early (e.g. the client disconnected), so no upstream request
+    outlives the run.
+    """
+    # Progress events (token deltas, per-model results) from the running stage
+    # are queued here and forwarded as they arrive
+    events: asyncio.Queue = asyncio.Queue()
+    owned_tasks: Set[asyncio.Task] = set()
+
+    def start(coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        owned_tasks.add(task)
+        return task
+
+    try:
+        # Long chats: older turns become a cached rolling summary
+        context, compaction = await compact_context(
+            body.conversation_context,
+            CONTEXT_SUMMARY_MODEL or body.model_cfg.chairman_model,
+            api_key,
+            _MAX_CONTEXT_CHARS,
+        )
+        if compaction:
+            yield {'type': 'context_compacted', 'data': compaction}
+
+        # Title generation only for first message
+        title_task = None
+        if body.is_first_message:
+            title_task = start(generate_conversation_title(body.content, api_key=api_key))
+
+        # Stage 1: Collect responses, streaming tokens and each finished response per model
+        yield {'type': 'stage1_start'}
+        stage1_task = start(stage1_collect_responses(
+            body.content,
+            council_models=body.model_cfg.council_models,
+            api_key=api_key,
+            conversation_context=context,
+            on_delta=lambda model, text: events.put_nowait({'type': 'stage1_delta', 'model': model, 'delta': text}),
+            on_result=lambda result: events.put_nowait({'type': 'stage1_model_complete', 'data': result}),
+            quorum=quorum,
+            deadline=deadline,
+            on_late_result=(
+                (lambda result: events.put_nowait({'type': 'stage1_late_response', 'data': result}))
+                if straggler_policy == "report" else None
+            ),
+            straggler_tasks=owned_tasks,
+        ))
+        async for event in _drain_events(stage1_task, events):
+            yield event
+        stage1_results = stage1_task.result()
+        yield {'type': 'stage1_complete', 'data': stage1_results}
+
+        # Stage 2: Collect rankings, emitting each one as its model finishes
+        yield {'type': 'stage2_start'}
+        stage2_task = start(stage2_collect_rankings(
+            body.content,
+            stage1_results,
+            council_models=body.model_cfg.council_models,
+            api_key=api_key,
+            conversation_context=context,
+            on_result=lambda result: events.put_nowait({'type': 'stage2_model_complete', 'data': result}),
+            ranking_mode=ranking_mode,
+            reviews_per_judge=reviews_per_judge,
+        ))
+        async for event in _drain_events(stage2_task, events):
+            yield event
+        stage2_results, label_to_model = stage2_task.result()
+        aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
+        yield {'type': 'stage2_complete', 'data': stage2_results, 'metadata': {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings}}
+
+        # Stage 3: Synthesize final answer, streaming the chairman's tokens
+        yield {'type': 'stage3_start'}
+        chairman_model = body.model_cfg.chairman_model
+        stage3_task = start(stage3_synthesize_final(
+            body.content,
+            stage1_results,
+            stage2_results,
+            chairman_model=chairman_model,
+            api_key=api_key,
+            conversation_context=context,
+            on_delta=lambda text: events.put_nowait({'type': 'stage3_delta', 'model': chairman_model, 'delta': text}),
+        ))
+        async for event in _drain_events(stage3_task, events):
+            yield event
+        stage3_result = stage3_task.result()
+        yield {'type': 'stage3_complete', 'data': stage3_result}
+
+        # Flush straggler reports that arrived after the last stage finished
+        while not events.empty():
+            event = events.get_nowait()
+            if event is not None:
+                yield event
+
+        # Wait for title generation (only if it was started)
+        if title_task:
+            title = await title_task
+            yield {'type': 'title_complete', 'data': {'title': title}}
+
+        # Send completion event
+        yield {'type': 'complete'}
+
+    except Exception as e:
+        # Send error event
+        yield {'type': 'error', 'message': str(e)}
+
+    finally:
+        # Drop stragglers and anything left running after an error or disconnect
+        for task in owned_tasks:
+            if not task.done():
+                task.cancel()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -119,13 +310,45 @@ async def get_available_models(
     request: Request,
     x_openrouter_api_key: Optional[str] = Header(default=None),
 ):
-    """Get list of available models from OpenRouter (stateless, user-keyed)."""
+    """Get list of available models from OpenRouter (shared cached catalog, user-keyed fetch)."""
     _check_rate_limit(request.client.host if request.client else "unknown")
     api_key = _require_openrouter_key(x_openrouter_api_key)
-    models = await fetch_available_models(api_key=api_key)
-    if models is None:
+    # No-op once warm; covers serverless runtimes that never run the lifespan
+    prewarm_http_client()
+    catalog = await model_catalog.get(api_key=api_key)
+    if catalog is None:
         raise HTTPException(status_code=503, detail="Unable to fetch models from OpenRouter")
-    return models
+
+    # Serve the pre-encoded catalog as-is; ModelInfo only documents the response schema
+    headers = {"ETag": catalog.client_etag}
+    if request.headers.get("if-none-match") == catalog.client_etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=catalog.body, media_type="application/json", headers=headers)
+
+
+@app.get("/api/conversations/search")
+async def search_conversations(
+    request: Request,
+    q: str,
+    model: Optional[str] = None,
+    limit: int = 20,
+    x_openrouter_api_key: Optional[str] = Header(default=None),
+):
+    """Full-text search over the caller's stored prompts and responses, best matches first."""
+    _check_rate_limit(request.client.host if request.client else "unknown")
+    api_key = _require_openrouter_key(x_openrouter_api_key)
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="Query must not be empty")
+
+    from .search import get_search_index
+
+    index = get_search_index()
+    if index is None:
+        raise HTTPException(status_code=404, detail="Search is disabled")
+
+    # Results are scoped to conversations written with the same key
+    results = await asyncio.to_thread(index.search, q, key_fingerprint(api_key), model, limit)
+    return {"query": q, "results": results}
 
 
 @app.post("/api/council/stream")
@@ -139,6 +362,8 @@ async def council_stream(
     """
     _check_rate_limit(request.client.host if request.client else "unknown")
     api_key = _require_openrouter_key(x_openrouter_api_key)
+    # No-op once warm; covers serverless runtimes that never run the lifespan
+    prewarm_http_client()
 
     # Basic payload guards for public proxy
     if not body.content or not body.content.strip():
@@ -150,14 +375,30 @@ async def council_stream(
     if len(body.model_cfg.council_models) > 10:
         raise HTTPException(status_code=400, detail="Too many council_models (max 10)")
 
+    quorum = body.stage1_quorum if body.stage1_quorum is not None else STAGE1_QUORUM
+    deadline = body.stage1_deadline if body.stage1_deadline is not None else STAGE1_DEADLINE_SEC
+    straggler_policy = body.straggler_policy or STAGE1_STRAGGLER_POLICY
+    ranking_mode = body.ranking_mode or STAGE2_RANKING_MODE
+    reviews_per_judge = body.reviews_per_judge if body.reviews_per_judge is not None else STAGE2_REVIEWS_PER_JUDGE
+    if quorum is not None and quorum < 1:
+        raise HTTPException(status_code=400, detail="stage1_quorum must be at least 1")
+    if deadline is not None and not 0 < deadline <= 120:
+        raise HTTPException(status_code=400, detail="stage1_deadline must be between 0 and 120 seconds")
+    if straggler_policy not in ("drop", "report"):
+        raise HTTPException(status_code=400, detail="straggler_policy must be 'drop' or 'report'")
+    if ranking_mode not in ("text", "json"):
+        raise HTTPException(status_code=400, detail="ranking_mode must be 'text' or 'json'")
+    if reviews_per_judge < 0:
+        raise HTTPException(status_code=400, detail="reviews_per_judge must be 0 (all) or more")
+
     # Validate conversation_context if provided
     if body.conversation_context is not None:
         if not isinstance(body.conversation_context, list):
             raise HTTPException(status_code=400, detail="conversation_context must be a list")
 
         total_chars = 0
-        max_total_chars = 25000  # Allow some buffer over frontend 20k limit
-        max_message_chars = 5000  # Per-message limit
+        max_total_chars = _MAX_RAW_CONTEXT_CHARS if CONTEXT_COMPACTION_ENABLED else _MAX_CONTEXT_CHARS
+        max_message_chars = _MAX_CONTEXT_MESSAGE_CHARS
 
         for i, msg in enumerate(body.conversation_context):
             if not isinstance(msg, dict):
@@ -179,58 +420,40 @@ async def council_stream(
             if total_chars > max_total_chars:
                 raise HTTPException(status_code=400, detail=f"conversation_context total content too large (max {max_total_chars} chars)")
 
-    async def event_generator():
+    # Identical concurrent runs from the same API key share one upstream execution and event stream
+    key = run_key(
+        key_fingerprint(api_key),
+        body.content,
+        body.model_cfg.council_models,
+        body.model_cfg.chairman_model,
+        body.conversation_context,
+        bool(body.is_first_message),
+        quorum,
+        deadline,
+        straggler_policy,
+        ranking_mode,
+        reviews_per_judge,
+    )
+    run = council_runs.get(key)
+    if run is None:
+        # New runs go through admission control; joining an in-flight run costs nothing upstream
         try:
-            # Title generation only for first message
-            title_task = None
-            if body.is_first_message:
-                title_task = asyncio.create_task(generate_conversation_title(body.content, api_key=api_key))
-
-            # Stage 1: Collect responses
-            yield f"data: {json.dumps({'type': 'stage1_start'})}\n\n"
-            stage1_results = await stage1_collect_responses(
-                body.content,
-                council_models=body.model_cfg.council_models,
-                api_key=api_key,
-                conversation_context=body.conversation_context,
-            )
-            yield f"data: {json.dumps({'type': 'stage1_complete', 'data': stage1_results})}\n\n"
-
-            # Stage 2: Collect rankings
-            yield f"data: {json.dumps({'type': 'stage2_start'})}\n\n"
-            stage2_results, label_to_model = await stage2_collect_rankings(
-                body.content,
-                stage1_results,
-                council_models=body.model_cfg.council_models,
-                api_key=api_key,
-                conversation_context=body.conversation_context,
-            )
-            aggregate_rankings = calculate_aggregate_rankings(stage2_results, label_to_model)
-            yield f"data: {json.dumps({'type': 'stage2_complete', 'data': stage2_results, 'metadata': {'label_to_model': label_to_model, 'aggregate_rankings': aggregate_rankings}})}\n\n"
-
-            # Stage 3: Synthesize final answer
-            yield f"data: {json.dumps({'type': 'stage3_start'})}\n\n"
-            stage3_result = await stage3_synthesize_final(
-                body.content,
-                stage1_results,
-                stage2_results,
-                chairman_model=body.model_cfg.chairman_model,
-                api_key=api_key,
-                conversation_context=body.conversation_context,
-            )
-            yield f"data: {json.dumps({'type': 'stage3_complete', 'data': stage3_result})}\n\n"
-
-            # Wait for title generation (only if it was started)
-            if title_task:
-                title = await title_task
-                yield f"data: {json.dumps({'type': 'title_complete', 'data': {'title': title}})}\n\n"
-
-            # Send completion event
-            yield f"data: {json.dumps({'type': 'complete'})}\n\n"
-
-        except Exception as e:
-            # Send error event
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            ticket = council_scheduler.enqueue(api_key)
+        except QueueFullError as e:
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+        run = council_runs.join(
+            key,
+            lambda: council_scheduler.run(ticket, _council_events(body, api_key, quorum, deadline, straggler_policy, ranking_mode, reviews_per_judge)),
+        )
+        # Also covers a run cancelled before its pipeline ever started
+        run.task.add_done_callback(lambda _: council_scheduler.release(ticket))
+
+    async def event_generator():
+        # When the client disconnects, the server closes this generator; the
+        # subscription then ends and, if it was the last one, cancels the run
+        async for event in run.subscribe():
+            yield _sse(event)
 
     return StreamingResponse(
         event_generator(),
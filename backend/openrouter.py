@@ -1,8 +1,334 @@
 """OpenRouter API client for making LLM requests."""
 
+import asyncio
+import hashlib
+import json
+import random
+import time
 import httpx
-from typing import List, Dict, Any, Optional
-from .config import OPENROUTER_API_URL
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Tuple
+from urllib.parse import urlsplit
+from .cache import cache_key, response_cache
+from .scheduler import upstream_limiter
+from .config import (
+    OPENROUTER_BASE_URL,
+    OPENROUTER_API_URL,
+    OPENROUTER_MODELS_URL,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_MAX_CONNECTIONS_PER_HOST,
+    HTTP2_ENABLED,
+    OPENROUTER_MAX_RETRIES,
+    OPENROUTER_RETRY_BACKOFF_BASE,
+    OPENROUTER_RETRY_BACKOFF_MAX,
+    OPENROUTER_HEDGING_ENABLED,
+    OPENROUTER_HEDGE_MIN_SAMPLES,
+    HTTP_PREWARM,
+    CIRCUIT_FAILURE_THRESHOLD,
+    CIRCUIT_RESET_SEC,
+    MODEL_CATALOG_TTL_SEC,
+    MODEL_CATALOG_STALE_SEC,
+)
+
+try:
+    import h2  # noqa: F401
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+
+class HTTPClientManager:
+    """
+    Owns a single pooled httpx.AsyncClient shared by every OpenRouter call.
+
+    Reusing one client keeps TLS sessions and keep-alive connections warm across
+    stages and council runs instead of paying a fresh handshake per request.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = HTTP_KEEPALIVE_EXPIRY,
+        max_connections_per_host: int = HTTP_MAX_CONNECTIONS_PER_HOST,
+        http2: bool = HTTP2_ENABLED,
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self.http2 = http2 and _H2_AVAILABLE
+        self._client: Optional[httpx.AsyncClient] = None
+        self._host_slots: Dict[str, asyncio.Semaphore] = {}
+        self._prewarm_task: Optional[asyncio.Task] = None
+
+    def get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it on first use."""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=self.limits,
+                http2=self.http2,
+                timeout=httpx.Timeout(120.0, connect=10.0),
+            )
+        return self._client
+
+    @asynccontextmanager
+    async def host_slot(self, url: str):
+        """Cap the number of in-flight requests to a single host."""
+        host = urlsplit(url).netloc
+        slot = self._host_slots.get(host)
+        if slot is None:
+            slot = asyncio.Semaphore(self.max_connections_per_host)
+            self._host_slots[host] = slot
+        async with slot:
+            yield
+
+    def prewarm(self, url: str = OPENROUTER_BASE_URL):
+        """
+        Open a pooled connection to `url` in the background (once per client).
+
+        On a cold start this overlaps the DNS/TCP/TLS handshake with request
+        parsing and admission, so the first real upstream call finds a warm
+        keep-alive connection. Must be called from a running event loop.
+        """
+        if not HTTP_PREWARM or (self._prewarm_task is not None and self._client is not None):
+            return
+        client = self.get_client()
+
+        async def warm():
+            try:
+                await client.head(url, timeout=10.0)
+            except httpx.HTTPError:
+                pass  # Only a warm-up; the real request will report any problem
+
+        self._prewarm_task = asyncio.create_task(warm())
+
+    async def aclose(self):
+        """Close the shared client and drop its pooled connections."""
+        if self._prewarm_task is not None:
+            self._prewarm_task.cancel()
+            self._prewarm_task = None
+        if self._client is not None:
+            await self._client.aclose()
+        self._client = None
+        self._host_slots = {}
+
+
+# Process-wide client manager; opened and closed by the FastAPI lifespan
+client_manager = HTTPClientManager()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Get the shared pooled HTTP client."""
+    return client_manager.get_client()
+
+
+def prewarm_http_client():
+    """Start warming a connection to OpenRouter if that hasn't happened yet."""
+    client_manager.prewarm()
+
+
+async def close_http_client():
+    """Close the shared pooled HTTP client."""
+    await client_manager.aclose()
+
+
+class ModelHealth:
+    """
+    Latency history and circuit breaker state for a single model.
+
+    The breaker opens after `failure_threshold` consecutive failures and fails
+    fast until `reset_after` seconds have passed. It then lets a single probe
+    request through (half-open) and closes again if that probe succeeds.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+        reset_after: float = CIRCUIT_RESET_SEC,
+        window: int = 100,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.latencies = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def allow_request(self) -> bool:
+        """Return True if a request may be sent to this model right now."""
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self, latency: float):
+        self.latencies.append(latency)
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.probe_in_flight or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probe_in_flight = False
+
+    def p95_latency(self, min_samples: int = OPENROUTER_HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """Observed p95 latency in seconds, or None until enough samples exist."""
+        if len(self.latencies) < min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+_model_health: Dict[str, ModelHealth] = {}
+
+
+def get_model_health(model: str) -> ModelHealth:
+    """Get (or create) the health tracker for a model."""
+    health = _model_health.get(model)
+    if health is None:
+        health = ModelHealth()
+        _model_health[model] = health
+    return health
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Retry rate limits, upstream 5xx and connection failures, but not timeouts."""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+    return isinstance(error, httpx.TransportError) and not isinstance(error, httpx.TimeoutException)
+
+
+def _is_model_failure(error: BaseException) -> bool:
+    """
+    Whether an error says something about the model's health.
+
+    5xx responses, transport errors and timeouts count against the model. 4xx
+    responses (bad key, bad request, and 429: OpenRouter rate limits are per
+    key/account) are the caller's problem: with per-user keys, counting them
+    would let one user open the breaker for all. 429s are still retried.
+    """
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    if isinstance(error, httpx.TransportError):
+        return True
+    # e.g. a stream interrupted by a transport error after the first token
+    cause = error.__cause__
+    return cause is not None and _is_model_failure(cause)
+
+
+def _retry_delay(attempt: int, error: Exception) -> float:
+    """Full-jitter exponential backoff, honouring Retry-After on 429 responses."""
+    if isinstance(error, httpx.HTTPStatusError):
+        retry_after = error.response.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(float(retry_after), OPENROUTER_RETRY_BACKOFF_MAX)
+            except ValueError:
+                pass
+    ceiling = min(OPENROUTER_RETRY_BACKOFF_MAX, OPENROUTER_RETRY_BACKOFF_BASE * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+
+async def _with_retries(call: Callable[[], Any], max_retries: int = OPENROUTER_MAX_RETRIES):
+    """Run `call`, retrying retryable errors with jittered backoff."""
+    attempt = 0
+    while True:
+        try:
+            return await call()
+        except Exception as e:
+            if attempt >= max_retries or not _is_retryable(e):
+                raise
+            await asyncio.sleep(_retry_delay(attempt, e))
+            attempt += 1
+
+
+async def _hedged(call: Callable[[], Any], hedge_after: Optional[float]):
+    """
+    Run `call`, firing a duplicate if it hasn't finished after `hedge_after` seconds.
+
+    The first successful result wins and the other request is cancelled.
+    """
+    if hedge_after is None:
+        return await call()
+
+    tasks = {asyncio.create_task(call())}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            tasks.add(asyncio.create_task(call()))
+
+        last_error = None
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                last_error = task.exception()
+        raise last_error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _parse_models(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Extract model information from an OpenRouter /models payload."""
+    models = []
+    for model in data.get("data", []):
+        model_id = model.get("id", "")
+        # Extract provider from model ID (e.g., "openai/gpt-4" -> "openai")
+        provider = model.get("owned_by", "")
+        if not provider and "/" in model_id:
+            provider = model_id.split("/")[0]
+
+        models.append({
+            "id": model_id,
+            "name": model.get("name", model_id),
+            "description": model.get("description", ""),
+            "pricing": model.get("pricing", {}),
+            "context_length": model.get("context_length"),
+            "supported_parameters": model.get("supported_parameters", []),
+            "provider": provider,
+            "created": model.get("created"),
+        })
+
+    return models
+
+
+async def _request_models(api_key: str, extra_headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    """GET the OpenRouter model list through the shared client."""
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+        **(extra_headers or {}),
+    }
+
+    client = get_http_client()
+    async with client_manager.host_slot(OPENROUTER_MODELS_URL):
+        return await client.get(
+            OPENROUTER_MODELS_URL,
+            headers=headers,
+            timeout=30.0
+        )
 
 
 async def fetch_available_models(api_key: str) -> Optional[List[Dict[str, Any]]]:
@@ -15,61 +341,132 @@ async def fetch_available_models(api_key: str) -> Optional[List[Dict[str, Any]]]
     if not api_key:
         return None
 
-    headers = {
-        "Authorization": f"Bearer {api_key}",
-        "Content-Type": "application/json",
-    }
-
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.get(
-                "https://openrouter.ai/api/v1/models",
-                headers=headers
-            )
-            response.raise_for_status()
-
-            data = response.json()
-
-            # Extract model information
-            models = []
-            for model in data.get("data", []):
-                model_id = model.get("id", "")
-                # Extract provider from model ID (e.g., "openai/gpt-4" -> "openai")
-                provider = model.get("owned_by", "")
-                if not provider and "/" in model_id:
-                    provider = model_id.split("/")[0]
-
-                models.append({
-                    "id": model_id,
-                    "name": model.get("name", model_id),
-                    "description": model.get("description", ""),
-                    "pricing": model.get("pricing", {}),
-                    "context_length": model.get("context_length"),
-                    "supported_parameters": model.get("supported_parameters", []),
-                    "provider": provider,
-                    "created": model.get("created"),
-                })
-
-            return models
+        response = await _request_models(api_key)
+        response.raise_for_status()
+        return _parse_models(response.json())
 
     except Exception as e:
         print(f"Error fetching available models: {e}")
         return None
 
 
+class ModelCatalog:
+    """A snapshot of the OpenRouter model list, pre-encoded for serving."""
+
+    def __init__(self, models: List[Dict[str, Any]], etag: Optional[str], last_modified: Optional[str]):
+        self.models = models
+        self.body = json.dumps(models).encode("utf-8")
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched_at = time.monotonic()
+        # Validator handed to our own clients; independent of the upstream ETag
+        self.client_etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.by_id = {model["id"]: model for model in models}
+
+
+class ModelCatalogCache:
+    """
+    Process-wide cache of the OpenRouter model catalog.
+
+    The catalog is the same for every API key, so one copy is shared by all
+    users. Fresh entries (younger than `ttl`) are served directly. Stale entries
+    within `stale_ttl` are served immediately while a background revalidation
+    runs. Revalidation is conditional (If-None-Match / If-Modified-Since) and
+    single-flight, so concurrent callers share one upstream request. If a
+    refresh fails, the last good catalog keeps being served.
+    """
+
+    def __init__(self, ttl: float = MODEL_CATALOG_TTL_SEC, stale_ttl: float = MODEL_CATALOG_STALE_SEC):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._catalog: Optional[ModelCatalog] = None
+        self._refresh: Optional[asyncio.Task] = None
+
+    def peek(self) -> Optional[ModelCatalog]:
+        """Return the cached catalog, if any, without touching the network."""
+        return self._catalog
+
+    async def get(self, api_key: str) -> Optional[ModelCatalog]:
+        """
+        Get the model catalog, fetching or revalidating it as needed.
+
+        Returns:
+            ModelCatalog, or None if nothing is cached and the fetch failed
+        """
+        catalog = self._catalog
+        if catalog is not None:
+            age = time.monotonic() - catalog.fetched_at
+            if age < self.ttl:
+                return catalog
+            if age < self.ttl + self.stale_ttl:
+                self._start_refresh(api_key)
+                return catalog
+
+        if not api_key:
+            return catalog
+
+        # Shield the shared fetch so one caller going away doesn't cancel it for the others
+        return await asyncio.shield(self._start_refresh(api_key))
+
+    def _start_refresh(self, api_key: str) -> "asyncio.Task[Optional[ModelCatalog]]":
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.create_task(self._revalidate(api_key))
+        return self._refresh
+
+    async def _revalidate(self, api_key: str) -> Optional[ModelCatalog]:
+        current = self._catalog
+        conditional = {}
+        if current is not None:
+            if current.etag:
+                conditional["If-None-Match"] = current.etag
+            if current.last_modified:
+                conditional["If-Modified-Since"] = current.last_modified
+
+        try:
+            response = await _request_models(api_key, conditional)
+            if response.status_code == 304 and current is not None:
+                current.fetched_at = time.monotonic()
+                return current
+
+            response.raise_for_status()
+            self._catalog = ModelCatalog(
+                _parse_models(response.json()),
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+            return self._catalog
+
+        except Exception as e:
+            print(f"Error refreshing model catalog: {e}")
+            return current
+
+
+# Shared model catalog cache used by /api/models
+model_catalog = ModelCatalogCache()
+
+
 async def query_model(
     model: str,
     messages: List[Dict[str, str]],
     api_key: str,
-    timeout: float = 120.0
+    timeout: float = 120.0,
+    extra_body: Optional[Dict[str, Any]] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Query a single model via OpenRouter API.
 
+    Rate limits, 5xx responses and connection errors are retried with jittered
+    backoff. With hedging enabled, a duplicate request is fired once the call
+    runs past the model's observed p95 latency. Models whose circuit breaker is
+    open fail fast without any upstream request. When the response cache is
+    enabled, identical requests are answered from it.
+
     Args:
         model: OpenRouter model identifier (e.g., "openai/gpt-4o")
         messages: List of message dicts with 'role' and 'content'
         timeout: Request timeout in seconds
+        extra_body: Optional extra request fields (e.g. response_format, max_tokens)
 
     Returns:
         Response dict with 'content' and optional 'reasoning_details', or None if failed
@@ -77,60 +474,325 @@ async def query_model(
     if not api_key:
         return None
 
+    payload = {
+        **(extra_body or {}),
+        "model": model,
+        "messages": messages,
+    }
+
+    key = cache_key(payload) if response_cache else None
+    if key:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            return cached
+
+    health = get_model_health(model)
+    if not health.allow_request():
+        print(f"Skipping model {model}: circuit breaker is open")
+        return None
+
+    headers = {
+        "Authorization": f"Bearer {api_key}",
+        "Content-Type": "application/json",
+    }
+
+    async def post_once() -> Dict[str, Any]:
+        client = get_http_client()
+        async with upstream_limiter.slot(model), client_manager.host_slot(OPENROUTER_API_URL):
+            response = await client.post(
+                OPENROUTER_API_URL,
+                headers=headers,
+                json=payload,
+                timeout=timeout
+            )
+        response.raise_for_status()
+
+        data = response.json()
+        message = data['choices'][0]['message']
+
+        return {
+            'content': message.get('content'),
+            'reasoning_details': message.get('reasoning_details')
+        }
+
+    hedge_after = health.p95_latency() if OPENROUTER_HEDGING_ENABLED else None
+    started = time.monotonic()
+
+    try:
+        result = await _hedged(lambda: _with_retries(post_once), hedge_after)
+    except asyncio.CancelledError:
+        # Not the model's fault; release a half-open probe slot if we held it
+        health.probe_in_flight = False
+        raise
+    except Exception as e:
+        if _is_model_failure(e):
+            health.record_failure()
+        else:
+            health.probe_in_flight = False
+        print(f"Error querying model {model}: {e}")
+        return None
+
+    health.record_success(time.monotonic() - started)
+    if key:
+        await response_cache.put(key, result)
+    return result
+
+
+async def stream_model(
+    model: str,
+    messages: List[Dict[str, str]],
+    api_key: str,
+    timeout: float = 120.0,
+    extra_body: Optional[Dict[str, Any]] = None
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Stream a completion from a single model via OpenRouter's SSE API.
+
+    Args:
+        model: OpenRouter model identifier (e.g., "openai/gpt-4o")
+        messages: List of message dicts with 'role' and 'content'
+        timeout: Request timeout in seconds
+        extra_body: Optional extra request fields (e.g. response_format, max_tokens)
+
+    Yields:
+        Delta dicts (e.g. {'content': '...'}) as chunks arrive
+
+    Raises:
+        httpx.HTTPError or RuntimeError if the request or stream fails
+    """
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
     }
 
     payload = {
+        **(extra_body or {}),
         "model": model,
         "messages": messages,
+        "stream": True,
     }
 
-    try:
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            response = await client.post(
-                OPENROUTER_API_URL,
-                headers=headers,
-                json=payload
-            )
+    client = get_http_client()
+    async with upstream_limiter.slot(model), client_manager.host_slot(OPENROUTER_API_URL):
+        async with client.stream(
+            "POST",
+            OPENROUTER_API_URL,
+            headers=headers,
+            json=payload,
+            timeout=timeout
+        ) as response:
             response.raise_for_status()
 
-            data = response.json()
-            message = data['choices'][0]['message']
+            async for line in response.aiter_lines():
+                # Skip blank separators and SSE comments (OpenRouter keep-alives)
+                if not line.startswith("data:"):
+                    continue
+
+                data = line[len("data:"):].strip()
+                if data == "[DONE]":
+                    break
+
+                chunk = json.loads(data)
+                if "error" in chunk:
+                    raise RuntimeError(chunk["error"].get("message", "Upstream stream error"))
+
+                choices = chunk.get("choices") or []
+                if choices and choices[0].get("delta"):
+                    yield choices[0]["delta"]
+
+
+async def query_model_stream(
+    model: str,
+    messages: List[Dict[str, str]],
+    api_key: str,
+    on_delta: Callable[[str], None],
+    timeout: float = 120.0,
+    extra_body: Optional[Dict[str, Any]] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Streaming variant of query_model.
+
+    Shares query_model's retry and circuit breaker handling, but only retries
+    failures that happen before the first token has been forwarded.
+
+    Args:
+        model: OpenRouter model identifier (e.g., "openai/gpt-4o")
+        messages: List of message dicts with 'role' and 'content'
+        on_delta: Called with each content chunk as it arrives
+        timeout: Request timeout in seconds
+        extra_body: Optional extra request fields (e.g. response_format, max_tokens)
+
+    Returns:
+        Response dict with 'content' and optional 'reasoning_details', or None if failed
+    """
+    if not api_key:
+        return None
+
+    key = cache_key({**(extra_body or {}), "model": model, "messages": messages}) if response_cache else None
+    if key:
+        cached = await response_cache.get(key)
+        if cached is not None:
+            if cached.get('content'):
+                on_delta(cached['content'])
+            return cached
+
+    health = get_model_health(model)
+    if not health.allow_request():
+        print(f"Skipping model {model}: circuit breaker is open")
+        return None
+
+    content_parts = []
+    reasoning_details = []
 
-            return {
-                'content': message.get('content'),
-                'reasoning_details': message.get('reasoning_details')
-            }
+    async def consume():
+        async for delta in stream_model(model, messages, api_key=api_key, timeout=timeout, extra_body=extra_body):
+            text = delta.get('content')
+            if text:
+                content_parts.append(text)
+                on_delta(text)
+            if delta.get('reasoning_details'):
+                reasoning_details.extend(delta['reasoning_details'])
 
+    async def consume_or_fail():
+        # A retried attempt starts over; anything a failed one collected (before
+        # its first token) would otherwise be duplicated in the result
+        content_parts.clear()
+        reasoning_details.clear()
+        try:
+            await consume()
+        except Exception as e:
+            # Tokens already forwarded can't be taken back, so only retry before the first one
+            if content_parts:
+                raise RuntimeError(f"stream interrupted: {e}") from e
+            raise
+
+    started = time.monotonic()
+
+    try:
+        await _with_retries(consume_or_fail)
+    except asyncio.CancelledError:
+        health.probe_in_flight = False
+        raise
     except Exception as e:
-        print(f"Error querying model {model}: {e}")
+        if _is_model_failure(e):
+            health.record_failure()
+        else:
+            health.probe_in_flight = False
+        print(f"Error streaming model {model}: {e}")
         return None
 
+    health.record_success(time.monotonic() - started)
+    result = {
+        'content': "".join(content_parts),
+        'reasoning_details': reasoning_details or None
+    }
+    if key:
+        await response_cache.put(key, result)
+    return result
+
+
+async def _query_one(
+    model: str,
+    messages: List[Dict[str, str]],
+    api_key: str,
+    on_delta: Optional[Callable[[str, str], None]] = None,
+    extra_body: Optional[Dict[str, Any]] = None,
+) -> Optional[Dict[str, Any]]:
+    """Query one model, streaming tokens through `on_delta` when it is given."""
+    if on_delta is None:
+        return await query_model(model, messages, api_key=api_key, extra_body=extra_body)
+    return await query_model_stream(
+        model,
+        messages,
+        api_key=api_key,
+        on_delta=lambda text: on_delta(model, text),
+        extra_body=extra_body,
+    )
+
 
 async def query_models_parallel(
     models: List[str],
     messages: List[Dict[str, str]],
     api_key: str,
+    on_delta: Optional[Callable[[str, str], None]] = None,
+    extra_body: Optional[Dict[str, Any]] = None,
 ) -> Dict[str, Optional[Dict[str, Any]]]:
     """
     Query multiple models in parallel.
 
+    All requests share the pooled client, so connections opened here are
+    reused by later stages.
+
     Args:
         models: List of OpenRouter model identifiers
         messages: List of message dicts to send to each model
+        on_delta: Optional callback (model, text) to stream tokens as they arrive
+        extra_body: Optional extra request fields sent to every model
 
     Returns:
         Dict mapping model identifier to response dict (or None if failed)
     """
-    import asyncio
-
     # Create tasks for all models
-    tasks = [query_model(model, messages, api_key=api_key) for model in models]
+    tasks = [_query_one(model, messages, api_key, on_delta, extra_body) for model in models]
 
     # Wait for all to complete
     responses = await asyncio.gather(*tasks)
 
     # Map models to their responses
     return {model: response for model, response in zip(models, responses)}
+
+
+def start_model_queries(
+    models: List[str],
+    messages: List[Dict[str, str]],
+    api_key: str,
+    on_delta: Optional[Callable[[str, str], None]] = None,
+    extra_body: Optional[Dict[str, Any]] = None,
+) -> List["asyncio.Task[Tuple[str, Optional[Dict[str, Any]]]]"]:
+    """
+    Start querying multiple models concurrently without waiting for them.
+
+    Args:
+        models: List of OpenRouter model identifiers
+        messages: List of message dicts to send to each model
+        on_delta: Optional callback (model, text) to stream tokens as they arrive
+        extra_body: Optional extra request fields sent to every model
+
+    Returns:
+        List of tasks, each resolving to a (model, response) tuple (response is None if failed)
+    """
+    async def tagged(model: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        return model, await _query_one(model, messages, api_key, on_delta, extra_body)
+
+    return [asyncio.create_task(tagged(model)) for model in models]
+
+
+async def query_models_as_completed(
+    models: List[str],
+    messages: List[Dict[str, str]],
+    api_key: str,
+    on_delta: Optional[Callable[[str, str], None]] = None,
+    extra_body: Optional[Dict[str, Any]] = None,
+) -> AsyncIterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    Query multiple models in parallel, yielding each result as soon as it arrives.
+
+    Requests still pending when the consumer stops iterating are cancelled.
+
+    Args:
+        models: List of OpenRouter model identifiers
+        messages: List of message dicts to send to each model
+        on_delta: Optional callback (model, text) to stream tokens as they arrive
+        extra_body: Optional extra request fields sent to every model
+
+    Yields:
+        (model, response) tuples in completion order (response is None if failed)
+    """
+    tasks = start_model_queries(models, messages, api_key, on_delta, extra_body)
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
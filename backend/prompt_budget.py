@@ -0,0 +1,200 @@
+"""Token budgets for stage 2/3 prompts: estimate, allot and truncate sections."""
+
+import re
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .config import (
+    PROMPT_BUDGET_ENABLED,
+    PROMPT_MAX_TOKENS,
+    PROMPT_OUTPUT_RESERVE,
+    PROMPT_TRUNCATION,
+)
+from .openrouter import model_catalog
+
+# Never cut a section below this many tokens, however tight the budget
+MIN_SECTION_TOKENS = 64
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_SENTENCE_RE = re.compile(r"[^.!?\n]+(?:[.!?]+|$)")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Approximate BPE token count without a tokenizer.
+
+    About 4 characters per token for prose, but at least one token per word or
+    symbol (code and punctuation-heavy text tokenize densely). Within ~15% of
+    cl100k-style tokenizers on typical model answers, which is enough for budgeting.
+    """
+    if not text:
+        return 0
+    return max(len(_PIECE_RE.findall(text)), (len(text) + 3) // 4)
+
+
+def context_length(model: str) -> Optional[int]:
+    """The model's context window from the cached catalog, or None if unknown."""
+    catalog = model_catalog.peek()
+    entry = catalog.by_id.get(model) if catalog is not None else None
+    length = entry.get("context_length") if entry else None
+    return int(length) if length else None
+
+
+def prompt_budget(
+    models: Sequence[str],
+    fixed_text: str = "",
+    context: Optional[List[Dict[str, Any]]] = None,
+) -> Optional[int]:
+    """
+    Tokens left for the variable sections of a prompt sent to every model in `models`.
+
+    Args:
+        models: Models that will receive the prompt (the smallest window wins)
+        fixed_text: The prompt template without its sections
+        context: Conversation messages sent ahead of the prompt
+
+    Returns:
+        Token budget, or None if there is no limit to fit: budgeting is
+        disabled, or no model's context length is known (the catalog may not
+        be loaded yet) and PROMPT_MAX_TOKENS is unset
+    """
+    if not PROMPT_BUDGET_ENABLED or not models:
+        return None
+    # Models missing from the catalog don't constrain the budget; guessing a
+    # window would truncate answers for models with far larger contexts
+    known = [length for length in map(context_length, models) if length]
+    limits = [min(known) - PROMPT_OUTPUT_RESERVE] if known else []
+    if PROMPT_MAX_TOKENS:
+        limits.append(PROMPT_MAX_TOKENS)
+    if not limits:
+        return None
+    limit = min(limits)
+    used = estimate_tokens(fixed_text)
+    used += sum(estimate_tokens(message.get("content") or "") for message in context or [])
+    return max(limit - used, 0)
+
+
+def _cut(text: str, max_chars: int, from_end: bool = False) -> str:
+    """Cut at a whitespace boundary near max_chars, keeping the start (or the end)."""
+    if max_chars <= 0:
+        return ""
+    if from_end:
+        piece = text[-max_chars:]
+        space = piece.find(" ")
+        return piece[space + 1:] if 0 <= space < len(piece) // 4 else piece
+    piece = text[:max_chars]
+    space = piece.rfind(" ")
+    return piece[:space] if space > len(piece) * 3 // 4 else piece
+
+
+def truncate_head_tail(text: str, max_tokens: int) -> str:
+    """Keep the opening two thirds and the closing third of the budget, marking the gap."""
+    tokens = estimate_tokens(text)
+    if tokens <= max_tokens:
+        return text
+    marker = f"\n[... {tokens - max_tokens} tokens omitted ...]\n"
+    chars = max(len(text) * max_tokens // tokens - len(marker), 0)
+    head = _cut(text, chars * 2 // 3)
+    tail = _cut(text, chars - len(head), from_end=True)
+    return head.rstrip() + marker + tail.lstrip()
+
+
+def truncate_extractive(text: str, max_tokens: int) -> str:
+    """
+    Keep the lead sentences of each paragraph (then the next ones) while they fit.
+
+    Answers tend to state each point up front, so paragraph leads preserve the
+    gist of every point rather than only the beginning of the answer.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    paragraphs = [p for p in re.split(r"\n\s*\n", text) if p.strip()]
+    sentences = [
+        (p, i, s.strip())
+        for p, paragraph in enumerate(paragraphs)
+        for i, s in enumerate(_SENTENCE_RE.findall(paragraph))
+        if s.strip()
+    ]
+    # Sentence i of every paragraph before sentence i+1 of any
+    keep = set()
+    used = 0
+    for p, i, sentence in sorted(sentences, key=lambda item: (item[1], item[0])):
+        cost = estimate_tokens(sentence) + 1
+        if used + cost > max_tokens:
+            break
+        keep.add((p, i))
+        used += cost
+
+    if not keep:
+        return truncate_head_tail(text, max_tokens)
+
+    kept_paragraphs = []
+    for p in range(len(paragraphs)):
+        parts = [s for q, i, s in sentences if q == p and (q, i) in keep]
+        if parts:
+            total = sum(1 for q, _, _ in sentences if q == p)
+            kept_paragraphs.append(" ".join(parts) + (" [...]" if len(parts) < total else ""))
+    return "\n\n".join(kept_paragraphs)
+
+
+TRUNCATION_STRATEGIES = {
+    "headtail": truncate_head_tail,
+    "extractive": truncate_extractive,
+}
+
+
+def fit_sections(
+    sections: Dict[str, str],
+    budget: Optional[int],
+    strategy: str = PROMPT_TRUNCATION,
+) -> Tuple[Dict[str, str], List[Dict[str, Any]]]:
+    """
+    Fit named sections into a shared token budget.
+
+    The budget is split fairly (water-filling): sections shorter than an equal
+    share are kept whole and their slack goes to the longer ones, so only the
+    longest sections are truncated, each to the same size.
+
+    Args:
+        sections: Section name -> text, in prompt order
+        budget: Total tokens for all sections (None means no limit)
+        strategy: One of TRUNCATION_STRATEGIES
+
+    Returns:
+        Tuple of (fitted sections in the same order, list of trimmed sections as
+        dicts with 'section', 'tokens', 'kept_tokens' and 'strategy')
+    """
+    if budget is None:
+        return dict(sections), []
+    sizes = {name: estimate_tokens(text) for name, text in sections.items()}
+    if sum(sizes.values()) <= budget:
+        return dict(sections), []
+
+    truncate = TRUNCATION_STRATEGIES.get(strategy, truncate_head_tail)
+    remaining = budget
+    pending = sorted(sizes, key=sizes.get)
+    caps: Dict[str, int] = {}
+    while pending:
+        share = remaining // len(pending)
+        name = pending[0]
+        if sizes[name] > share:
+            for rest in pending:
+                caps[rest] = max(share, MIN_SECTION_TOKENS)
+            break
+        remaining -= sizes[name]
+        pending.pop(0)
+
+    fitted = {}
+    trimmed = []
+    for name, text in sections.items():
+        cap = caps.get(name)
+        if cap is None or sizes[name] <= cap:
+            fitted[name] = text
+            continue
+        fitted[name] = truncate(text, cap)
+        trimmed.append({
+            "section": name,
+            "tokens": sizes[name],
+            "kept_tokens": estimate_tokens(fitted[name]),
+            "strategy": strategy if strategy in TRUNCATION_STRATEGIES else "headtail",
+        })
+    return fitted, trimmed
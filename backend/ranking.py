@@ -0,0 +1,375 @@
+"""Parsing of peer rankings and aggregation into a council-wide ranking."""
+
+import json
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+RANKING_HEADER = "FINAL RANKING:"
+
+# One pass over the text finds every label, remembering whether it was a numbered list item
+_LABEL_RE = re.compile(r"(\d+\.\s*)?Response ([A-Z]+)\b")
+
+
+def response_label(index: int) -> str:
+    """Anonymous label for the index-th response: A..Z, then AA, AB, ... (like spreadsheet columns)."""
+    letters = ""
+    index += 1
+    while index > 0:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def response_labels(count: int) -> List[str]:
+    return [response_label(i) for i in range(count)]
+
+
+def parse_ranking(text: str, valid_labels: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    Parse the FINAL RANKING section of a stage 2 evaluation.
+
+    Prefers the numbered list ("1. Response C") after the FINAL RANKING header,
+    then any "Response X" mention there, then any mention anywhere in the text.
+    Each label is kept only at its first (best) position.
+
+    Args:
+        text: The full text response from the model
+        valid_labels: If given, labels ("Response X") not in this set are dropped
+
+    Returns:
+        List of response labels ("Response X") in ranked order
+    """
+    start = text.find(RANKING_HEADER)
+    if start != -1:
+        start += len(RANKING_HEADER)
+        end = text.find(RANKING_HEADER, start)
+        section = text[start:end] if end != -1 else text[start:]
+    else:
+        section = text
+
+    numbered: List[str] = []
+    mentioned: List[str] = []
+    for match in _LABEL_RE.finditer(section):
+        label = f"Response {match.group(2)}"
+        mentioned.append(label)
+        if match.group(1):
+            numbered.append(label)
+
+    labels = numbered if start != -1 and numbered else mentioned
+
+    allowed = set(valid_labels) if valid_labels is not None else None
+    seen = set()
+    ranking = []
+    for label in labels:
+        if label in seen or (allowed is not None and label not in allowed):
+            continue
+        seen.add(label)
+        ranking.append(label)
+    return ranking
+
+
+def ranking_response_format(labels: Sequence[str], critique_words: int) -> Dict[str, Any]:
+    """
+    OpenAI-style `response_format` asking for a ranking as strict JSON.
+
+    The reply is an object with 'ranking' (every label, best first) and
+    'notes' (one entry per label with a 1-10 score and a critique of at most
+    `critique_words` words; the limit is stated in the schema description).
+    """
+    label_schema = {"type": "string", "enum": list(labels)}
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": "peer_ranking",
+            "strict": True,
+            "schema": {
+                "type": "object",
+                "properties": {
+                    "ranking": {
+                        "type": "array",
+                        "description": "All response labels, best first",
+                        "items": label_schema,
+                    },
+                    "notes": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "label": label_schema,
+                                "score": {"type": "number", "description": "1 (poor) to 10 (excellent)"},
+                                "note": {"type": "string", "description": f"At most {critique_words} words"},
+                            },
+                            "required": ["label", "score", "note"],
+                            "additionalProperties": False,
+                        },
+                    },
+                },
+                "required": ["ranking", "notes"],
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+_JSON_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+
+def parse_structured_ranking(
+    content: str,
+    valid_labels: Optional[Sequence[str]] = None,
+) -> Optional[Tuple[List[str], List[Dict[str, Any]]]]:
+    """
+    Parse a JSON ranking produced under ranking_response_format.
+
+    Returns:
+        (ranking, notes), or None if the content isn't a usable JSON ranking
+        (the caller should fall back to parse_ranking on the text)
+    """
+    fenced = _JSON_FENCE_RE.match(content or "")
+    try:
+        data = json.loads(fenced.group(1) if fenced else content)
+    except (TypeError, ValueError):
+        return None
+    if not isinstance(data, dict) or not isinstance(data.get("ranking"), list):
+        return None
+
+    allowed = set(valid_labels) if valid_labels is not None else None
+    ranking = []
+    for label in data["ranking"]:
+        if isinstance(label, str) and label not in ranking and (allowed is None or label in allowed):
+            ranking.append(label)
+    if not ranking:
+        return None
+
+    notes = []
+    for note in data.get("notes") or []:
+        if isinstance(note, dict) and isinstance(note.get("label"), str):
+            if allowed is None or note["label"] in allowed:
+                notes.append({
+                    "label": note["label"],
+                    "score": note.get("score"),
+                    "note": str(note.get("note", "")),
+                })
+    return ranking, notes
+
+
+def render_structured_ranking(ranking: List[str], notes: List[Dict[str, Any]]) -> str:
+    """Readable evaluation text for a JSON ranking, ending in the usual FINAL RANKING list."""
+    lines = []
+    for note in notes:
+        score = note.get("score")
+        score_text = f" ({score:g}/10)" if isinstance(score, (int, float)) else ""
+        lines.append(f"{note['label']}{score_text}: {note['note']}")
+    lines.append("")
+    lines.append(RANKING_HEADER)
+    lines.extend(f"{position}. {label}" for position, label in enumerate(ranking, start=1))
+    return "\n".join(lines).strip()
+
+
+def assign_reviews(
+    labels: Sequence[str],
+    judges: int,
+    per_judge: Optional[int] = None,
+    own_labels: Optional[Sequence[Optional[str]]] = None,
+) -> List[List[str]]:
+    """
+    Give each judge a balanced subset of the responses to rank (a cyclic k-of-N design).
+
+    Judge i reviews `per_judge` consecutive labels starting at i*N/judges, wrapping
+    around and skipping the judge's own response, so every response is reviewed
+    about judges*k/N times by other models, and neighbouring windows overlap,
+    which links the partial rankings into one comparison graph. k is raised if
+    needed so that every response gets at least one review.
+
+    Args:
+        labels: All response labels, in order
+        judges: Number of judges
+        per_judge: Responses per judge (None or 0 means all of them)
+        own_labels: Per judge, the label of its own response (None if it has none)
+
+    Returns:
+        One list of labels per judge
+    """
+    n = len(labels)
+    if not per_judge or per_judge >= n or judges <= 0:
+        return [list(labels) for _ in range(judges)]
+
+    per_judge = max(per_judge, -(-n // judges), 2 if n > 1 else 1)
+    assignments = []
+    for i in range(judges):
+        own = own_labels[i] if own_labels is not None else None
+        window = []
+        start = (i * n) // judges
+        for j in range(n):
+            if len(window) >= per_judge:
+                break
+            label = labels[(start + j) % n]
+            if label != own:
+                window.append(label)
+        assignments.append(window)
+    return assignments
+
+
+def rank_matrix(
+    ballots: Sequence[Sequence[str]],
+    labels: Sequence[str],
+    reviewed: Optional[Sequence[Optional[Sequence[str]]]] = None,
+) -> List[List[Optional[int]]]:
+    """
+    One row per ballot, one column per label: the 1-based position, or 0 if unranked.
+
+    With `reviewed` (the labels each ballot's judge was shown; None for all),
+    labels a judge never saw are None rather than 0, so they are neither
+    counted against the response nor compared with anything on that ballot.
+    """
+    column = {label: j for j, label in enumerate(labels)}
+    matrix = []
+    for b, ballot in enumerate(ballots):
+        shown = reviewed[b] if reviewed is not None else None
+        if shown is None:
+            row: List[Optional[int]] = [0] * len(labels)
+        else:
+            row = [None] * len(labels)
+            for label in shown:
+                j = column.get(label)
+                if j is not None:
+                    row[j] = 0
+        position = 0
+        for label in ballot:
+            j = column.get(label)
+            if j is not None and row[j] == 0:
+                position += 1
+                row[j] = position
+        matrix.append(row)
+    return matrix
+
+
+def _pairwise(matrix: List[List[Optional[int]]], n: int) -> List[List[int]]:
+    """d[i][j] = number of ballots preferring i to j (ranked beats unranked, unseen is skipped)."""
+    d = [[0] * n for _ in range(n)]
+    for row in matrix:
+        for i in range(n):
+            ri = row[i]
+            if not ri:
+                continue
+            di = d[i]
+            for j in range(n):
+                rj = row[j]
+                if j != i and rj is not None and (rj == 0 or ri < rj):
+                    di[j] += 1
+    return d
+
+
+def mean_rank_scores(matrix: List[List[int]], n: int) -> List[float]:
+    """Negated average position (higher is better), over ballots that ranked the response."""
+    scores = []
+    for j in range(n):
+        positions = [row[j] for row in matrix if row[j]]
+        scores.append(-sum(positions) / len(positions) if positions else float("-inf"))
+    return scores
+
+
+def borda_scores(matrix: List[List[int]], n: int) -> List[float]:
+    """Modified Borda count: on a ballot ranking k responses, position p earns k - p points."""
+    scores = [0.0] * n
+    for row in matrix:
+        k = sum(1 for r in row if r)
+        for j in range(n):
+            if row[j]:
+                scores[j] += k - row[j]
+    return scores
+
+
+def copeland_scores(matrix: List[List[int]], n: int) -> List[float]:
+    """Pairwise wins minus pairwise losses."""
+    d = _pairwise(matrix, n)
+    scores = [0.0] * n
+    for i in range(n):
+        for j in range(i + 1, n):
+            if d[i][j] > d[j][i]:
+                scores[i] += 1
+                scores[j] -= 1
+            elif d[j][i] > d[i][j]:
+                scores[j] += 1
+                scores[i] -= 1
+    return scores
+
+
+def schulze_scores(matrix: List[List[int]], n: int) -> List[float]:
+    """Number of responses each one beats by strongest (widest) path, per the Schulze method."""
+    d = _pairwise(matrix, n)
+    p = [[d[i][j] if d[i][j] > d[j][i] else 0 for j in range(n)] for i in range(n)]
+    for k in range(n):
+        pk = p[k]
+        for i in range(n):
+            if i == k:
+                continue
+            pik = p[i][k]
+            if pik == 0:
+                continue
+            pi = p[i]
+            for j in range(n):
+                if j != i and j != k:
+                    strength = pik if pik < pk[j] else pk[j]
+                    if strength > pi[j]:
+                        pi[j] = strength
+    return [float(sum(1 for j in range(n) if j != i and p[i][j] > p[j][i])) for i in range(n)]
+
+
+# name -> scoring function over the rank matrix (higher score is better)
+AGGREGATION_METHODS: Dict[str, Callable[[List[List[int]], int], List[float]]] = {
+    "mean": mean_rank_scores,
+    "borda": borda_scores,
+    "copeland": copeland_scores,
+    "schulze": schulze_scores,
+}
+
+
+def aggregate_rankings(
+    ballots: Sequence[Sequence[str]],
+    label_to_model: Dict[str, str],
+    method: str = "mean",
+    reviewed: Optional[Sequence[Optional[Sequence[str]]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Combine per-model rankings into one council ranking.
+
+    Args:
+        ballots: Each reviewer's parsed ranking (labels best to worst; may be partial)
+        label_to_model: Mapping from anonymous labels to model names
+        method: One of AGGREGATION_METHODS
+        reviewed: Per ballot, the labels its reviewer was assigned (see
+            assign_reviews), or None where the reviewer saw every response
+
+    Returns:
+        List of dicts with 'model', 'average_rank', 'rankings_count' and
+        'score', sorted best to worst. Responses nobody ranked are omitted.
+
+    Raises:
+        ValueError: If the method is unknown
+    """
+    scorer = AGGREGATION_METHODS.get(method)
+    if scorer is None:
+        raise ValueError(f"Unknown ranking method: {method}")
+
+    labels = list(label_to_model)
+    n = len(labels)
+    matrix = rank_matrix(ballots, labels, reviewed)
+    scores = scorer(matrix, n)
+
+    aggregate: List[Tuple[float, float, Dict[str, Any]]] = []
+    for j, label in enumerate(labels):
+        positions = [row[j] for row in matrix if row[j]]
+        if not positions:
+            continue
+        average = sum(positions) / len(positions)
+        aggregate.append((scores[j], average, {
+            "model": label_to_model[label],
+            "average_rank": round(average, 2),
+            "rankings_count": len(positions),
+            "score": round(scores[j], 4),
+        }))
+
+    # Best score first; average rank breaks ties
+    aggregate.sort(key=lambda item: (-item[0], item[1]))
+    return [entry for _, _, entry in aggregate]
@@ -0,0 +1,214 @@
+"""Admission control and fair scheduling for council runs and upstream calls."""
+
+import asyncio
+import hashlib
+import math
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional
+from .config import (
+    MAX_CONCURRENT_COUNCILS,
+    COUNCIL_QUEUE_SIZE,
+    COUNCIL_QUEUE_PER_KEY,
+    UPSTREAM_MAX_CONCURRENCY,
+    UPSTREAM_MAX_PER_MODEL,
+)
+
+
+class QueueFullError(Exception):
+    """Raised when a council run can't be queued; carries a Retry-After hint."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Ticket:
+    """A council run waiting for (or holding) an execution slot."""
+
+    def __init__(self, tenant: str):
+        self.tenant = tenant
+        self.admitted = False
+        self.released = False
+        self.enqueued_at = time.monotonic()
+
+
+class CouncilScheduler:
+    """
+    Bounded, fair admission queue in front of council runs.
+
+    At most `max_active` runs execute at once. Waiting runs are kept in one FIFO
+    per tenant (API key), and slots are handed out round-robin across tenants so
+    a single key submitting a burst can't starve everyone else. The queue holds
+    at most `max_queued` runs overall and `max_queued_per_tenant` per tenant;
+    beyond that, `enqueue` raises QueueFullError.
+    """
+
+    def __init__(
+        self,
+        max_active: int = MAX_CONCURRENT_COUNCILS,
+        max_queued: int = COUNCIL_QUEUE_SIZE,
+        max_queued_per_tenant: int = COUNCIL_QUEUE_PER_KEY,
+    ):
+        self.max_active = max_active
+        self.max_queued = max_queued
+        self.max_queued_per_tenant = max_queued_per_tenant
+        self.active = 0
+        self._queues: "OrderedDict[str, Deque[Ticket]]" = OrderedDict()
+        self._queued = 0
+        self._changed = asyncio.Event()
+        # Recent run durations, used to estimate Retry-After
+        self._durations: Deque[float] = deque(maxlen=50)
+
+    @staticmethod
+    def tenant_for(api_key: str) -> str:
+        """Identify a tenant without keeping the raw key around."""
+        return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+
+    def enqueue(self, api_key: str) -> Ticket:
+        """
+        Queue a new run for the given API key.
+
+        Raises:
+            QueueFullError: If the global or per-key queue limit is reached
+        """
+        ticket = Ticket(self.tenant_for(api_key))
+        if self.active < self.max_active and self._queued == 0:
+            self._admit(ticket)
+            return ticket
+
+        tenant_queue = self._queues.get(ticket.tenant)
+        if self._queued >= self.max_queued:
+            raise QueueFullError("Council queue is full", self.retry_after())
+        if tenant_queue is not None and len(tenant_queue) >= self.max_queued_per_tenant:
+            raise QueueFullError("Too many queued council runs for this API key", self.retry_after())
+
+        if tenant_queue is None:
+            tenant_queue = deque()
+            self._queues[ticket.tenant] = tenant_queue
+        tenant_queue.append(ticket)
+        self._queued += 1
+        self._notify()
+        return ticket
+
+    def position(self, ticket: Ticket) -> int:
+        """1-based position of a waiting ticket in dispatch order (0 once admitted)."""
+        if ticket.admitted:
+            return 0
+        for index, queued in enumerate(self._dispatch_order(), start=1):
+            if queued is ticket:
+                return index
+        return 0
+
+    def retry_after(self) -> int:
+        """Rough number of seconds until a queue slot is likely to free up."""
+        average = sum(self._durations) / len(self._durations) if self._durations else 30.0
+        waves = (self._queued + 1) / max(1, self.max_active)
+        return max(1, math.ceil(average * waves))
+
+    def release(self, ticket: Ticket):
+        """Give up a slot (or a queue place) and admit the next waiting run. Idempotent."""
+        if ticket.released:
+            return
+        ticket.released = True
+        if ticket.admitted:
+            self.active -= 1
+            self._durations.append(time.monotonic() - ticket.enqueued_at)
+        else:
+            tenant_queue = self._queues.get(ticket.tenant)
+            if tenant_queue is not None and ticket in tenant_queue:
+                tenant_queue.remove(ticket)
+                self._queued -= 1
+                if not tenant_queue:
+                    del self._queues[ticket.tenant]
+        self._dispatch()
+
+    async def run(self, ticket: Ticket, source: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Gate an event pipeline behind `ticket`.
+
+        While waiting, yields `queued` events with the current position; once
+        admitted, yields the pipeline's own events. The slot is released when the
+        pipeline finishes or is cancelled.
+        """
+        try:
+            last_position = None
+            while not ticket.admitted:
+                position = self.position(ticket)
+                if position != last_position:
+                    yield {'type': 'queued', 'position': position}
+                    last_position = position
+                await self._changed.wait()
+
+            async for event in source:
+                yield event
+        finally:
+            self.release(ticket)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": self._queued,
+            "tenants_waiting": len(self._queues),
+        }
+
+    def _admit(self, ticket: Ticket):
+        ticket.admitted = True
+        ticket.enqueued_at = time.monotonic()
+        self.active += 1
+
+    def _dispatch(self):
+        # Round-robin: take the head of the first tenant's queue, then rotate that tenant to the back
+        while self.active < self.max_active and self._queues:
+            tenant, tenant_queue = next(iter(self._queues.items()))
+            ticket = tenant_queue.popleft()
+            self._queued -= 1
+            del self._queues[tenant]
+            if tenant_queue:
+                self._queues[tenant] = tenant_queue
+            self._admit(ticket)
+        self._notify()
+
+    def _dispatch_order(self) -> List[Ticket]:
+        queues = [list(q) for q in self._queues.values()]
+        order = []
+        for round_index in range(max((len(q) for q in queues), default=0)):
+            for q in queues:
+                if round_index < len(q):
+                    order.append(q[round_index])
+        return order
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class UpstreamLimiter:
+    """Caps concurrent upstream calls globally and per model."""
+
+    def __init__(self, max_total: int = UPSTREAM_MAX_CONCURRENCY, max_per_model: int = UPSTREAM_MAX_PER_MODEL):
+        self.max_total = max_total
+        self.max_per_model = max_per_model
+        self._total: Optional[asyncio.Semaphore] = None
+        self._per_model: Dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def slot(self, model: str):
+        """Hold one upstream slot for `model` for the duration of the block."""
+        if self._total is None:
+            self._total = asyncio.Semaphore(self.max_total)
+        model_slot = self._per_model.get(model)
+        if model_slot is None:
+            model_slot = asyncio.Semaphore(self.max_per_model)
+            self._per_model[model] = model_slot
+
+        # Take the model slot first so waiting on a busy model doesn't hold a global slot
+        async with model_slot:
+            async with self._total:
+                yield
+
+
+# Process-wide scheduler instances
+council_scheduler = CouncilScheduler()
+upstream_limiter = UpstreamLimiter()
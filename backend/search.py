@@ -0,0 +1,235 @@
+"""Full-text search over stored conversations (SQLite FTS5)."""
+
+import os
+import re
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from .config import SEARCH_ENABLED, SEARCH_DB_PATH
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    conversation_id TEXT NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('user', 'stage1', 'stage3')),
+    model TEXT,
+    created_at TEXT NOT NULL,
+    owner TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_entries_model ON entries(model);
+CREATE INDEX IF NOT EXISTS idx_entries_conversation_id ON entries(conversation_id);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(body, tokenize = 'porter unicode61');
+"""
+
+# Applied after SCHEMA, once indexes created before the owner column have it
+OWNER_INDEX = "CREATE INDEX IF NOT EXISTS idx_entries_owner ON entries(owner);"
+
+MAX_RESULTS = 100
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(query: str) -> Optional[str]:
+    """
+    Turn free text into a safe FTS5 query: every word must match, last one as a prefix.
+
+    Returns:
+        FTS5 MATCH expression, or None if the query has no searchable words
+    """
+    terms = _TERM_RE.findall(query)
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class SearchIndex:
+    """
+    Inverted index over user prompts, stage1 responses and stage3 syntheses.
+
+    Lives in its own SQLite database regardless of the storage engine. Each
+    indexed text is one row in `entries` (with its conversation, kind and model,
+    so results can be filtered by model through a B-tree index) and one row
+    with the same rowid in the FTS5 table. Results are ranked by BM25.
+
+    Every entry records its owner, the fingerprint of the API key that wrote
+    it, and searches only ever see the caller's own entries. Entries indexed
+    without an owner are not returned to anyone.
+    """
+
+    def __init__(self, path: str = SEARCH_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        db = self._connection()
+        db.executescript(SCHEMA)
+        columns = {row["name"] for row in db.execute("PRAGMA table_info(entries)")}
+        if "owner" not in columns:
+            db.execute("ALTER TABLE entries ADD COLUMN owner TEXT")
+        db.execute(OWNER_INDEX)
+        db.commit()
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30.0)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _insert(self, entries: List[tuple], owner: Optional[str] = None):
+        """Index (conversation_id, kind, model, body) tuples owned by `owner` in one transaction."""
+        entries = [e for e in entries if e[3]]
+        if not entries:
+            return
+
+        db = self._connection()
+        created_at = datetime.utcnow().isoformat()
+        try:
+            for conversation_id, kind, model, body in entries:
+                rowid = db.execute(
+                    "INSERT INTO entries (conversation_id, kind, model, created_at, owner) VALUES (?, ?, ?, ?, ?)",
+                    (conversation_id, kind, model, created_at, owner),
+                ).lastrowid
+                db.execute("INSERT INTO entries_fts (rowid, body) VALUES (?, ?)", (rowid, body))
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+    def index_user_message(self, conversation_id: str, content: str, owner: Optional[str] = None):
+        self._insert([(conversation_id, "user", None, content)], owner)
+
+    def index_assistant_message(
+        self,
+        conversation_id: str,
+        stage1: List[Dict[str, Any]],
+        stage3: Dict[str, Any],
+        owner: Optional[str] = None,
+    ):
+        entries = [(conversation_id, "stage1", r.get("model"), r.get("response")) for r in stage1]
+        if stage3:
+            entries.append((conversation_id, "stage3", stage3.get("model"), stage3.get("response")))
+        self._insert(entries, owner)
+
+    def conversation_owner(self, conversation_id: str) -> Optional[str]:
+        """The owner recorded for a conversation's entries, or None."""
+        row = self._connection().execute(
+            "SELECT owner FROM entries WHERE conversation_id = ? AND owner IS NOT NULL LIMIT 1",
+            (conversation_id,),
+        ).fetchone()
+        return row["owner"] if row else None
+
+    def remove_conversation(self, conversation_id: str):
+        db = self._connection()
+        try:
+            db.execute(
+                "DELETE FROM entries_fts WHERE rowid IN (SELECT id FROM entries WHERE conversation_id = ?)",
+                (conversation_id,),
+            )
+            db.execute("DELETE FROM entries WHERE conversation_id = ?", (conversation_id,))
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+    def search(
+        self,
+        query: str,
+        owner: str,
+        model: Optional[str] = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search one owner's indexed messages.
+
+        Args:
+            query: Free-text query; all words must match (the last one as a prefix)
+            owner: Fingerprint of the caller's API key; only its entries match
+            model: Only return stage1/stage3 texts written by this model
+            limit: Maximum number of results (capped at MAX_RESULTS)
+
+        Returns:
+            Best matches first: dicts with 'conversation_id', 'kind', 'model',
+            'created_at', 'snippet' (matches wrapped in **) and 'score'
+        """
+        match = build_match_query(query)
+        if match is None:
+            return []
+
+        sql = (
+            "SELECT e.conversation_id, e.kind, e.model, e.created_at, "
+            "snippet(entries_fts, 0, '**', '**', '…', 16) AS snippet, bm25(entries_fts) AS score "
+            "FROM entries_fts JOIN entries e ON e.id = entries_fts.rowid "
+            "WHERE entries_fts MATCH ? AND e.owner = ?"
+        )
+        params: List[Any] = [match, owner]
+        if model:
+            sql += " AND e.model = ?"
+            params.append(model)
+        sql += " ORDER BY score LIMIT ?"
+        params.append(max(1, min(limit, MAX_RESULTS)))
+
+        rows = self._connection().execute(sql, params).fetchall()
+        # bm25() is lower-is-better; expose a higher-is-better score
+        return [{**dict(row), "score": -row["score"]} for row in rows]
+
+
+_search_index: Optional[SearchIndex] = None
+
+
+def get_search_index() -> Optional[SearchIndex]:
+    """Get the search index, or None if search is disabled."""
+    global _search_index
+
+    if _search_index is None and SEARCH_ENABLED:
+        _search_index = SearchIndex(SEARCH_DB_PATH)
+
+    return _search_index
+
+
+def rebuild_search_index(index: SearchIndex) -> int:
+    """
+    Re-index every stored conversation from scratch.
+
+    Stored conversations don't record who wrote them, so each keeps the owner
+    its entries already had; conversations never indexed stay unowned.
+
+    Returns:
+        Number of conversations indexed
+    """
+    from .storage import get_storage
+
+    storage = get_storage()
+    count = 0
+    for meta in storage.list_conversations():
+        conversation = storage.get_conversation(meta["id"])
+        if conversation is None:
+            continue
+        owner = index.conversation_owner(conversation["id"])
+        index.remove_conversation(conversation["id"])
+        for message in conversation["messages"]:
+            if message.get("role") == "user":
+                index.index_user_message(conversation["id"], message.get("content", ""), owner)
+            else:
+                index.index_assistant_message(
+                    conversation["id"], message.get("stage1") or [], message.get("stage3") or {}, owner
+                )
+        count += 1
+    return count
+
+
+if __name__ == "__main__":
+    # Usage: python -m backend.search [search_db_path]
+    target = SearchIndex(sys.argv[1] if len(sys.argv) > 1 else SEARCH_DB_PATH)
+    count = rebuild_search_index(target)
+    print(f"Indexed {count} conversations into {target.path}")
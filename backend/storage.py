@@ -1,11 +1,592 @@
-"""JSON-based storage for conversations."""
+"""Conversation storage with pluggable backends (append-only logs by default)."""
 
+import asyncio
+import atexit
+import copy
 import json
 import os
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 from pathlib import Path
-from .config import DATA_DIR
+from .config import (
+    DATA_DIR,
+    STORAGE_BACKEND,
+    SQLITE_DB_PATH,
+    STORAGE_CACHE_ENABLED,
+    STORAGE_CACHE_MAX_MB,
+    STORAGE_FLUSH_INTERVAL_SEC,
+    STORAGE_BLOBS_ENABLED,
+    BLOB_GC_GRACE_SEC,
+)
+from .blobs import BlobStore, blob_refs, pack_message, unpack_message
+from .search import get_search_index
+from .storage_index import ConversationIndex, conversation_meta, page_from_list
+
+# Metadata index file kept next to the conversations by the file-based engines
+INDEX_FILENAME = "conversations.idx"
+
+
+class StorageBackend:
+    """
+    Interface implemented by every conversation storage engine.
+
+    Conversations are plain dicts with 'id', 'created_at', 'title' and
+    'messages'; listings return metadata dicts with 'id', 'created_at', 'title'
+    and 'message_count'.
+    """
+
+    def create_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def get_conversation_lazy(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Like get_conversation, but stage bodies may be left as references for `load_stages`."""
+        return self.get_conversation(conversation_id)
+
+    def load_stages(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Resolve stage references in a message returned by get_conversation_lazy."""
+        return message
+
+    def save_conversation(self, conversation: Dict[str, Any]):
+        raise NotImplementedError
+
+    def list_conversations(self) -> List[Dict[str, Any]]:
+        raise NotImplementedError
+
+    def list_conversations_page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of conversation metadata, newest first (ties broken by id).
+
+        Engines with an index override this; the default slices the full listing.
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        return page_from_list(self.list_conversations(), limit, cursor)
+
+    def add_message(self, conversation_id: str, message: Dict[str, Any]):
+        """Append a message; raises ValueError if the conversation doesn't exist."""
+        raise NotImplementedError
+
+    def add_messages(self, conversation_id: str, messages: List[Dict[str, Any]]):
+        """Append several messages in one write where the engine supports it."""
+        for message in messages:
+            self.add_message(conversation_id, message)
+
+    def update_conversation_title(self, conversation_id: str, title: str):
+        """Set the title; raises ValueError if the conversation doesn't exist."""
+        raise NotImplementedError
+
+
+def new_conversation(conversation_id: str) -> Dict[str, Any]:
+    """Build the dict for a new, empty conversation."""
+    return {
+        "id": conversation_id,
+        "created_at": datetime.utcnow().isoformat(),
+        "title": "New Conversation",
+        "messages": []
+    }
+
+
+def user_message(content: str) -> Dict[str, Any]:
+    """Build a stored user message."""
+    return {
+        "role": "user",
+        "content": content
+    }
+
+
+def assistant_message(
+    stage1: List[Dict[str, Any]],
+    stage2: List[Dict[str, Any]],
+    stage3: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Build a stored assistant message with all 3 stages."""
+    return {
+        "role": "assistant",
+        "stage1": stage1,
+        "stage2": stage2,
+        "stage3": stage3
+    }
+
+
+class JSONFileStorage(StorageBackend):
+    """One pretty-printed JSON file per conversation."""
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self.index = ConversationIndex(os.path.join(data_dir, INDEX_FILENAME), self._scan)
+
+    def ensure_data_dir(self):
+        Path(self.data_dir).mkdir(parents=True, exist_ok=True)
+
+    def get_conversation_path(self, conversation_id: str) -> str:
+        return os.path.join(self.data_dir, f"{conversation_id}.json")
+
+    def create_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        conversation = new_conversation(conversation_id)
+        self.save_conversation(conversation)
+        return conversation
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        path = self.get_conversation_path(conversation_id)
+
+        if not os.path.exists(path):
+            return None
+
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def save_conversation(self, conversation: Dict[str, Any]):
+        self.ensure_data_dir()
+
+        path = self.get_conversation_path(conversation['id'])
+        with open(path, 'w') as f:
+            json.dump(conversation, f, indent=2)
+        self.index.put(conversation_meta(conversation))
+
+    def _scan(self, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Metadata of conversations on disk, for building or reconciling the index.
+
+        Args:
+            since: Only include conversations whose files were modified at or after this time
+        """
+        self.ensure_data_dir()
+
+        conversations = []
+        with os.scandir(self.data_dir) as it:
+            for entry in it:
+                if entry.name.endswith('.json') and (since is None or entry.stat().st_mtime >= since):
+                    with open(entry.path, 'r') as f:
+                        conversations.append(conversation_meta(json.load(f)))
+        return conversations
+
+    def list_conversations(self) -> List[Dict[str, Any]]:
+        return self.index.all()
+
+    def list_conversations_page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        return self.index.page(limit, cursor)
+
+    def add_message(self, conversation_id: str, message: Dict[str, Any]):
+        self.add_messages(conversation_id, [message])
+
+    def add_messages(self, conversation_id: str, messages: List[Dict[str, Any]]):
+        conversation = self.get_conversation(conversation_id)
+        if conversation is None:
+            raise ValueError(f"Conversation {conversation_id} not found")
+
+        conversation["messages"].extend(messages)
+        self.save_conversation(conversation)
+
+    def update_conversation_title(self, conversation_id: str, title: str):
+        conversation = self.get_conversation(conversation_id)
+        if conversation is None:
+            raise ValueError(f"Conversation {conversation_id} not found")
+
+        conversation["title"] = title
+        self.save_conversation(conversation)
+
+
+def _json_size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":")))
+
+
+class _CachedConversation:
+    """A cached conversation plus the changes not yet written to the backend."""
+
+    def __init__(self, conversation: Dict[str, Any]):
+        self.conversation = conversation
+        self.size = _json_size(conversation)
+        # A full save is needed (new or replaced conversation); covers everything below
+        self.snapshot = False
+        self.messages: List[Dict[str, Any]] = []
+        self.title: Optional[str] = None
+        # A batch taken from this entry is being written; it must stay cached until then
+        self.flushing = False
+
+    @property
+    def dirty(self) -> bool:
+        return self.snapshot or bool(self.messages) or self.title is not None
+
+
+class CachedStorage(StorageBackend):
+    """
+    Bounded LRU of hot conversations with write-behind in front of another engine.
+
+    Reads of a cached conversation never touch disk. Mutations are applied to
+    the cached copy and recorded as pending; `flush()` (called by the lifespan
+    flusher every `flush_interval` seconds and at shutdown) coalesces each
+    conversation's pending changes into one durable write: a single batched
+    append of all buffered messages, or one full save for new conversations.
+    Write-behind only applies while run_write_behind() is running; otherwise
+    (plain scripts, CLI tools) and with `flush_interval` 0, every mutation is
+    flushed before returning.
+
+    Entries are evicted least-recently-used first once the cache exceeds
+    `max_bytes` (sizes are the JSON-encoded length). Dirty entries are never
+    evicted before they have been flushed. If a flush fails, the changes stay
+    pending and are retried on the next flush.
+    """
+
+    def __init__(
+        self,
+        backend: StorageBackend,
+        max_bytes: int = STORAGE_CACHE_MAX_MB * 1024 * 1024,
+        flush_interval: float = STORAGE_FLUSH_INTERVAL_SEC,
+    ):
+        self.backend = backend
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self._entries: "OrderedDict[str, _CachedConversation]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        # Only one flush writes to the backend at a time, so batches stay in order
+        self._flush_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    # Cache bookkeeping
+
+    def _cached(self, conversation_id: str) -> Optional[_CachedConversation]:
+        """Return the entry for a conversation, loading it from the backend on a miss."""
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is not None:
+                self._entries.move_to_end(conversation_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        conversation = self.backend.get_conversation(conversation_id)
+        if conversation is None:
+            return None
+
+        with self._lock:
+            # Another thread may have loaded (and changed) it meanwhile; theirs wins
+            entry = self._entries.get(conversation_id)
+            if entry is None:
+                entry = self._insert(conversation)
+            return entry
+
+    def _insert(self, conversation: Dict[str, Any]) -> _CachedConversation:
+        previous = self._entries.pop(conversation["id"], None)
+        if previous is not None:
+            self._bytes -= previous.size
+        entry = _CachedConversation(conversation)
+        self._entries[conversation["id"]] = entry
+        self._bytes += entry.size
+        return entry
+
+    def _attach(self, conversation_id: str, entry: _CachedConversation) -> _CachedConversation:
+        """Return the live entry for a conversation, re-adding `entry` if it was evicted meanwhile."""
+        current = self._entries.get(conversation_id)
+        if current is None:
+            self._entries[conversation_id] = entry
+            self._bytes += entry.size
+            return entry
+        return current
+
+    def _evict(self):
+        # Drop clean entries, oldest first, until we're within budget
+        for conversation_id in list(self._entries):
+            if self._bytes <= self.max_bytes:
+                return
+            entry = self._entries[conversation_id]
+            if entry.dirty or entry.flushing or len(self._entries) == 1:
+                continue
+            del self._entries[conversation_id]
+            self._bytes -= entry.size
+            self.evictions += 1
+
+    def _after_write(self):
+        with self._lock:
+            over_budget = self._bytes > self.max_bytes
+            self._evict()
+        if self.flush_interval <= 0 or not _write_behind_running or over_budget:
+            self.flush()
+
+    # StorageBackend
+
+    def create_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        conversation = new_conversation(conversation_id)
+        with self._lock:
+            self._insert(copy.deepcopy(conversation)).snapshot = True
+        self._after_write()
+        return conversation
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._cached(conversation_id)
+        if entry is None:
+            return None
+        with self._lock:
+            return copy.deepcopy(entry.conversation)
+
+    def save_conversation(self, conversation: Dict[str, Any]):
+        with self._lock:
+            self._insert(copy.deepcopy(conversation)).snapshot = True
+        self._after_write()
+
+    def list_conversations(self) -> List[Dict[str, Any]]:
+        # Listings come from the backend's index, so bring it up to date first
+        self.flush()
+        return self.backend.list_conversations()
+
+    def list_conversations_page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        self.flush()
+        return self.backend.list_conversations_page(limit, cursor)
+
+    def add_message(self, conversation_id: str, message: Dict[str, Any]):
+        self.add_messages(conversation_id, [message])
+
+    def add_messages(self, conversation_id: str, messages: List[Dict[str, Any]]):
+        entry = self._cached(conversation_id)
+        if entry is None:
+            raise ValueError(f"Conversation {conversation_id} not found")
+
+        messages = copy.deepcopy(messages)
+        added = sum(_json_size(m) for m in messages)
+        with self._lock:
+            entry = self._attach(conversation_id, entry)
+            entry.conversation["messages"].extend(messages)
+            if not entry.snapshot:
+                entry.messages.extend(messages)
+            entry.size += added
+            self._bytes += added
+        self._after_write()
+
+    def update_conversation_title(self, conversation_id: str, title: str):
+        entry = self._cached(conversation_id)
+        if entry is None:
+            raise ValueError(f"Conversation {conversation_id} not found")
+
+        with self._lock:
+            entry = self._attach(conversation_id, entry)
+            entry.conversation["title"] = title
+            if not entry.snapshot:
+                entry.title = title
+        self._after_write()
+
+    # Write-behind
+
+    def flush(self) -> int:
+        """
+        Write all pending changes to the backend.
+
+        Returns:
+            Number of conversations written
+        """
+        written = 0
+        with self._flush_lock:
+            with self._lock:
+                dirty = [(cid, e) for cid, e in self._entries.items() if e.dirty]
+
+            for conversation_id, entry in dirty:
+                # Take the pending changes; new mutations accumulate on a fresh batch
+                with self._lock:
+                    snapshot = copy.deepcopy(entry.conversation) if entry.snapshot else None
+                    messages, title = entry.messages, entry.title
+                    entry.snapshot, entry.messages, entry.title = False, [], None
+                    entry.flushing = True
+
+                try:
+                    if snapshot is not None:
+                        self.backend.save_conversation(snapshot)
+                    else:
+                        if messages:
+                            self.backend.add_messages(conversation_id, messages)
+                        if title is not None:
+                            self.backend.update_conversation_title(conversation_id, title)
+                except Exception as e:
+                    print(f"Error flushing conversation {conversation_id}: {e}")
+                    self.flush_errors += 1
+                    with self._lock:
+                        # Put the batch back in front of anything queued since; a full save
+                        # is the safe retry because part of the batch may have been written
+                        live = self._attach(conversation_id, entry)
+                        live.snapshot = True
+                        live.messages, live.title = [], None
+                    continue
+                finally:
+                    entry.flushing = False
+                written += 1
+
+            if written:
+                self.flushes += 1
+            with self._lock:
+                self._evict()
+        return written
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "items": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "dirty": sum(1 for e in self._entries.values() if e.dirty),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "flushes": self.flushes,
+                "flush_errors": self.flush_errors,
+            }
+
+
+class BlobStorage(StorageBackend):
+    """
+    Moves stage texts out of stored messages into a compressed, deduplicated BlobStore.
+
+    Assistant messages are stored with each large stage1 response, stage2
+    ranking and stage3 response replaced by a `{"$blob": <sha256>}` reference.
+    get_conversation resolves them; get_conversation_lazy doesn't, so callers
+    that only need titles or user messages never read or decompress a blob.
+    Messages written before this layer existed keep their inline text and are
+    returned unchanged.
+
+    Blobs are shared between messages and never deleted on write, so texts
+    dropped by save_conversation stay on disk until collect_garbage runs.
+    """
+
+    def __init__(self, backend: StorageBackend, blobs: Optional[BlobStore] = None):
+        self.backend = backend
+        self.blobs = blobs if blobs is not None else BlobStore()
+
+    def _pack(self, conversation: Dict[str, Any]) -> Dict[str, Any]:
+        return {**conversation, "messages": [pack_message(m, self.blobs) for m in conversation.get("messages", [])]}
+
+    def create_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        return self.backend.create_conversation(conversation_id)
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        conversation = self.backend.get_conversation(conversation_id)
+        if conversation is None:
+            return None
+        return {**conversation, "messages": [self.load_stages(m) for m in conversation["messages"]]}
+
+    def get_conversation_lazy(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        return self.backend.get_conversation(conversation_id)
+
+    def load_stages(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        return unpack_message(message, self.blobs)
+
+    def save_conversation(self, conversation: Dict[str, Any]):
+        self.backend.save_conversation(self._pack(conversation))
+
+    def list_conversations(self) -> List[Dict[str, Any]]:
+        return self.backend.list_conversations()
+
+    def list_conversations_page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        return self.backend.list_conversations_page(limit, cursor)
+
+    def add_message(self, conversation_id: str, message: Dict[str, Any]):
+        self.backend.add_message(conversation_id, pack_message(message, self.blobs))
+
+    def add_messages(self, conversation_id: str, messages: List[Dict[str, Any]]):
+        self.backend.add_messages(conversation_id, [pack_message(m, self.blobs) for m in messages])
+
+    def update_conversation_title(self, conversation_id: str, title: str):
+        self.backend.update_conversation_title(conversation_id, title)
+
+    def collect_garbage(self, grace_seconds: float = BLOB_GC_GRACE_SEC) -> Dict[str, int]:
+        """
+        Mark every blob referenced by a stored message, then sweep the rest.
+
+        Safe to run while the app is writing: blobs stored or reused within
+        `grace_seconds` are kept even if the mark missed their message.
+
+        Returns:
+            Dict with 'kept', 'removed' and 'removed_bytes'
+        """
+        referenced = set()
+        for meta in self.backend.list_conversations():
+            conversation = self.backend.get_conversation(meta["id"]) or {}
+            for message in conversation.get("messages", []):
+                referenced.update(blob_refs(message))
+        return self.blobs.sweep(referenced, grace_seconds)
+
+
+_storage: Optional[StorageBackend] = None
+# True while run_write_behind() is flushing periodically; CachedStorage writes through otherwise
+_write_behind_running = False
+
+
+def get_storage() -> StorageBackend:
+    """Get the configured storage backend (selected by STORAGE_BACKEND)."""
+    global _storage
+
+    if _storage is None:
+        if STORAGE_BACKEND == "log":
+            from .storage_log import AppendLogStorage
+            _storage = AppendLogStorage(DATA_DIR)
+        elif STORAGE_BACKEND == "json":
+            _storage = JSONFileStorage(DATA_DIR)
+        elif STORAGE_BACKEND == "sqlite":
+            from .storage_sqlite import SQLiteStorage
+            _storage = SQLiteStorage(SQLITE_DB_PATH)
+        elif STORAGE_BACKEND == "postgres":
+            raise ValueError("The postgres storage backend is async-only; use get_async_storage()")
+        else:
+            raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+
+        # The cache holds packed conversations, so blob references stay small in memory
+        if STORAGE_CACHE_ENABLED:
+            _storage = CachedStorage(_storage)
+            # Last resort for buffered changes if the app exits without its shutdown flush
+            atexit.register(flush_storage)
+        if STORAGE_BLOBS_ENABLED:
+            _storage = BlobStorage(_storage)
+
+    return _storage
+
+
+def set_storage(storage: Optional[StorageBackend]):
+    """Replace the active storage backend (None re-reads the configuration on next use)."""
+    global _storage
+    flush_storage()
+    _storage = storage
+
+
+def flush_storage() -> int:
+    """
+    Write any buffered conversation changes to disk.
+
+    Returns:
+        Number of conversations written
+    """
+    storage = _storage
+    while storage is not None:
+        if isinstance(storage, CachedStorage):
+            return storage.flush()
+        storage = getattr(storage, "backend", None)
+    return 0
+
+
+async def run_write_behind():
+    """
+    Periodically flush buffered conversation changes (run as a task for the app's lifetime).
+
+    Mutations are only buffered while this runs; cancelling it switches the
+    cache back to write-through (flush_storage() then writes what is left).
+    """
+    global _write_behind_running
+    interval = STORAGE_FLUSH_INTERVAL_SEC if STORAGE_FLUSH_INTERVAL_SEC > 0 else 1.0
+    _write_behind_running = True
+    try:
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(flush_storage)
+    finally:
+        _write_behind_running = False
 
 
 def ensure_data_dir():
@@ -14,7 +595,7 @@ def ensure_data_dir():
 
 
 def get_conversation_path(conversation_id: str) -> str:
-    """Get the file path for a conversation."""
+    """Get the file path for a conversation (JSON file backend)."""
     return os.path.join(DATA_DIR, f"{conversation_id}.json")
 
 
@@ -28,40 +609,37 @@ def create_conversation(conversation_id: str) -> Dict[str, Any]:
     Returns:
         New conversation dict
     """
-    ensure_data_dir()
-
-    conversation = {
-        "id": conversation_id,
-        "created_at": datetime.utcnow().isoformat(),
-        "title": "New Conversation",
-        "messages": []
-    }
+    return get_storage().create_conversation(conversation_id)
 
-    # Save to file
-    path = get_conversation_path(conversation_id)
-    with open(path, 'w') as f:
-        json.dump(conversation, f, indent=2)
 
-    return conversation
-
-
-def get_conversation(conversation_id: str) -> Optional[Dict[str, Any]]:
+def get_conversation(conversation_id: str, load_stages: bool = True) -> Optional[Dict[str, Any]]:
     """
     Load a conversation from storage.
 
     Args:
         conversation_id: Unique identifier for the conversation
+        load_stages: If False, assistant stage texts may be returned as blob
+            references; resolve a message later with load_message_stages
 
     Returns:
         Conversation dict or None if not found
     """
-    path = get_conversation_path(conversation_id)
+    if not load_stages:
+        return get_storage().get_conversation_lazy(conversation_id)
+    return get_storage().get_conversation(conversation_id)
+
+
+def load_message_stages(message: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resolve the stage texts of a message loaded with load_stages=False.
 
-    if not os.path.exists(path):
-        return None
+    Args:
+        message: Message dict from a lazily loaded conversation
 
-    with open(path, 'r') as f:
-        return json.load(f)
+    Returns:
+        Copy of the message with full stage texts
+    """
+    return get_storage().load_stages(message)
 
 
 def save_conversation(conversation: Dict[str, Any]):
@@ -71,11 +649,7 @@ def save_conversation(conversation: Dict[str, Any]):
     Args:
         conversation: Conversation dict to save
     """
-    ensure_data_dir()
-
-    path = get_conversation_path(conversation['id'])
-    with open(path, 'w') as f:
-        json.dump(conversation, f, indent=2)
+    get_storage().save_conversation(conversation)
 
 
 def list_conversations() -> List[Dict[str, Any]]:
@@ -83,55 +657,72 @@ def list_conversations() -> List[Dict[str, Any]]:
     List all conversations (metadata only).
 
     Returns:
-        List of conversation metadata dicts
+        List of conversation metadata dicts, newest first
     """
-    ensure_data_dir()
+    return get_storage().list_conversations()
+
+
+def list_conversations_page(limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    List one page of conversations (metadata only), newest first.
+
+    Args:
+        limit: Page size (defaults to 50, capped at 200)
+        cursor: 'next_cursor' from the previous page, or None for the first page
+
+    Returns:
+        Dict with 'conversations' and 'next_cursor' (None on the last page)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    return get_storage().list_conversations_page(limit, cursor)
+
 
-    conversations = []
-    for filename in os.listdir(DATA_DIR):
-        if filename.endswith('.json'):
-            path = os.path.join(DATA_DIR, filename)
-            with open(path, 'r') as f:
-                data = json.load(f)
-                # Return metadata only
-                conversations.append({
-                    "id": data["id"],
-                    "created_at": data["created_at"],
-                    "title": data.get("title", "New Conversation"),
-                    "message_count": len(data["messages"])
-                })
+def _index_user_message(conversation_id: str, content: str, owner: Optional[str] = None):
+    # Search is best-effort: a failed index update never fails the write itself
+    try:
+        index = get_search_index()
+        if index is not None:
+            index.index_user_message(conversation_id, content, owner)
+    except Exception as e:
+        print(f"Error indexing message for search: {e}")
 
-    # Sort by creation time, newest first
-    conversations.sort(key=lambda x: x["created_at"], reverse=True)
 
-    return conversations
+def _index_assistant_message(
+    conversation_id: str,
+    stage1: List[Dict[str, Any]],
+    stage3: Dict[str, Any],
+    owner: Optional[str] = None,
+):
+    try:
+        index = get_search_index()
+        if index is not None:
+            index.index_assistant_message(conversation_id, stage1, stage3, owner)
+    except Exception as e:
+        print(f"Error indexing message for search: {e}")
 
 
-def add_user_message(conversation_id: str, content: str):
+def add_user_message(conversation_id: str, content: str, owner: Optional[str] = None):
     """
     Add a user message to a conversation.
 
     Args:
         conversation_id: Conversation identifier
         content: User message content
+        owner: Fingerprint of the writer's API key (key_fingerprint); only
+            that key can find the message through search
     """
-    conversation = get_conversation(conversation_id)
-    if conversation is None:
-        raise ValueError(f"Conversation {conversation_id} not found")
-
-    conversation["messages"].append({
-        "role": "user",
-        "content": content
-    })
-
-    save_conversation(conversation)
+    get_storage().add_message(conversation_id, user_message(content))
+    _index_user_message(conversation_id, content, owner)
 
 
 def add_assistant_message(
     conversation_id: str,
     stage1: List[Dict[str, Any]],
     stage2: List[Dict[str, Any]],
-    stage3: Dict[str, Any]
+    stage3: Dict[str, Any],
+    owner: Optional[str] = None,
 ):
     """
     Add an assistant message with all 3 stages to a conversation.
@@ -141,19 +732,10 @@ def add_assistant_message(
         stage1: List of individual model responses
         stage2: List of model rankings
         stage3: Final synthesized response
+        owner: Fingerprint of the writer's API key (see add_user_message)
     """
-    conversation = get_conversation(conversation_id)
-    if conversation is None:
-        raise ValueError(f"Conversation {conversation_id} not found")
-
-    conversation["messages"].append({
-        "role": "assistant",
-        "stage1": stage1,
-        "stage2": stage2,
-        "stage3": stage3
-    })
-
-    save_conversation(conversation)
+    get_storage().add_message(conversation_id, assistant_message(stage1, stage2, stage3))
+    _index_assistant_message(conversation_id, stage1, stage3, owner)
 
 
 def update_conversation_title(conversation_id: str, title: str):
@@ -164,9 +746,115 @@ def update_conversation_title(conversation_id: str, title: str):
         conversation_id: Conversation identifier
         title: New title for the conversation
     """
-    conversation = get_conversation(conversation_id)
-    if conversation is None:
-        raise ValueError(f"Conversation {conversation_id} not found")
+    get_storage().update_conversation_title(conversation_id, title)
+
+
+class AsyncStorage:
+    """
+    Non-blocking facade over a StorageBackend for use from async handlers.
+
+    Every backend call runs in the default thread pool, so serializing or
+    fsyncing a large conversation never stalls the event loop (and the SSE
+    streams it is serving). Writes to the same conversation are serialized by a
+    per-conversation lock so concurrent appends can't interleave; writes to
+    different conversations still proceed in parallel.
+    """
 
-    conversation["title"] = title
-    save_conversation(conversation)
+    def __init__(self, backend: Optional[StorageBackend] = None):
+        self._backend = backend
+        # conversation_id -> [lock, number of holders/waiters]
+        self._locks: Dict[str, list] = {}
+
+    @property
+    def backend(self) -> StorageBackend:
+        return self._backend if self._backend is not None else get_storage()
+
+    @asynccontextmanager
+    async def _write_lock(self, conversation_id: str):
+        entry = self._locks.get(conversation_id)
+        if entry is None:
+            entry = [asyncio.Lock(), 0]
+            self._locks[conversation_id] = entry
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[conversation_id]
+
+    async def create_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        async with self._write_lock(conversation_id):
+            return await asyncio.to_thread(self.backend.create_conversation, conversation_id)
+
+    async def get_conversation(self, conversation_id: str, load_stages: bool = True) -> Optional[Dict[str, Any]]:
+        if not load_stages:
+            return await asyncio.to_thread(self.backend.get_conversation_lazy, conversation_id)
+        return await asyncio.to_thread(self.backend.get_conversation, conversation_id)
+
+    async def load_stages(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.backend.load_stages, message)
+
+    async def save_conversation(self, conversation: Dict[str, Any]):
+        async with self._write_lock(conversation["id"]):
+            await asyncio.to_thread(self.backend.save_conversation, conversation)
+
+    async def list_conversations(self) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.backend.list_conversations)
+
+    async def list_conversations_page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        return await asyncio.to_thread(self.backend.list_conversations_page, limit, cursor)
+
+    async def add_user_message(self, conversation_id: str, content: str, owner: Optional[str] = None):
+        async with self._write_lock(conversation_id):
+            await asyncio.to_thread(self.backend.add_message, conversation_id, user_message(content))
+        await asyncio.to_thread(_index_user_message, conversation_id, content, owner)
+
+    async def add_assistant_message(
+        self,
+        conversation_id: str,
+        stage1: List[Dict[str, Any]],
+        stage2: List[Dict[str, Any]],
+        stage3: Dict[str, Any],
+        owner: Optional[str] = None,
+    ):
+        async with self._write_lock(conversation_id):
+            await asyncio.to_thread(
+                self.backend.add_message, conversation_id, assistant_message(stage1, stage2, stage3)
+            )
+        await asyncio.to_thread(_index_assistant_message, conversation_id, stage1, stage3, owner)
+
+    async def update_conversation_title(self, conversation_id: str, title: str):
+        async with self._write_lock(conversation_id):
+            await asyncio.to_thread(self.backend.update_conversation_title, conversation_id, title)
+
+    async def close(self):
+        """Release connections and flush buffered writes."""
+        await asyncio.to_thread(flush_storage)
+
+
+_async_storage: Optional[AsyncStorage] = None
+
+
+def get_async_storage() -> AsyncStorage:
+    """Get the async storage facade over the configured backend."""
+    global _async_storage
+
+    if _async_storage is None:
+        if STORAGE_BACKEND == "postgres":
+            from .storage_postgres import PostgresStorage
+            _async_storage = PostgresStorage()
+        else:
+            _async_storage = AsyncStorage()
+
+    return _async_storage
+
+
+async def close_async_storage():
+    """Close the async storage facade (its pool, if any) at shutdown."""
+    global _async_storage
+
+    if _async_storage is not None:
+        await _async_storage.close()
+        _async_storage = None
@@ -0,0 +1,246 @@
+"""Persisted conversation metadata index for the file-based storage engines."""
+
+import base64
+import bisect
+import json
+import os
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Files modified this long before the index's last write are rescanned on load too,
+# covering coarse filesystem timestamps and writes racing the index append
+RECONCILE_SLACK_SEC = 2.0
+
+
+def conversation_meta(conversation: Dict[str, Any]) -> Dict[str, Any]:
+    """Listing metadata for a full conversation dict."""
+    return {
+        "id": conversation["id"],
+        "created_at": conversation["created_at"],
+        "title": conversation.get("title", "New Conversation"),
+        "message_count": len(conversation.get("messages", [])),
+    }
+
+
+def encode_cursor(meta: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just past `meta` in newest-first order."""
+    raw = json.dumps([meta["created_at"], meta["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """
+    Decode a cursor from encode_cursor into its (created_at, id) sort key.
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        decoded = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+    except (ValueError, TypeError, UnicodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+    if not isinstance(decoded, list) or len(decoded) != 2 or not all(isinstance(part, str) for part in decoded):
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    created_at, conversation_id = decoded
+    return created_at, conversation_id
+
+
+def clamp_page_size(limit: Optional[int]) -> int:
+    if limit is None:
+        return DEFAULT_PAGE_SIZE
+    return max(1, min(int(limit), MAX_PAGE_SIZE))
+
+
+def page_from_list(conversations: List[Dict[str, Any]], limit: Optional[int], cursor: Optional[str]) -> Dict[str, Any]:
+    """
+    Cut one page out of a full listing already sorted newest first.
+
+    Used by engines without an index of their own.
+    """
+    limit = clamp_page_size(limit)
+    ordered = sorted(conversations, key=lambda c: (c["created_at"], c["id"]), reverse=True)
+    if cursor is not None:
+        after = decode_cursor(cursor)
+        ordered = [c for c in ordered if (c["created_at"], c["id"]) < after]
+    page = ordered[:limit]
+    return {
+        "conversations": page,
+        "next_cursor": encode_cursor(page[-1]) if len(ordered) > limit else None,
+    }
+
+
+class ConversationIndex:
+    """
+    Metadata for every conversation, kept in memory and persisted as a JSONL log.
+
+    Each record is the full metadata of one conversation; later records for the
+    same id replace earlier ones. Writes append a single line, so keeping the
+    index current costs O(1) per mutation, and the file is rewritten once it
+    holds more than twice as many records as there are conversations.
+
+    In memory, sort keys (created_at, id) are kept in a sorted list, so a page
+    is a bisect plus a slice and costs O(page size) regardless of history
+    length. The index is derived data: if its file is missing it is rebuilt by
+    scanning the conversations once via `scan`.
+
+    The index is appended after the conversation file is written, so a crash in
+    between leaves it missing or stale. On load it therefore reconciles itself
+    with `scan(since)`, which returns the metadata of conversations whose files
+    changed at or after `since` (the index file's mtime, minus a little slack).
+    """
+
+    def __init__(self, path: str, scan: Callable[..., Iterable[Dict[str, Any]]]):
+        self.path = path
+        self._scan = scan
+        self._lock = threading.RLock()
+        self._entries: Optional[Dict[str, Dict[str, Any]]] = None
+        self._keys: List[Tuple[str, str]] = []
+        self._records = 0
+
+    # Loading
+
+    def _ensure_loaded(self) -> Dict[str, Dict[str, Any]]:
+        if self._entries is not None:
+            return self._entries
+
+        entries: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(self.path):
+            indexed_at = os.stat(self.path).st_mtime
+            records = 0
+            torn = False
+            with open(self.path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        torn = True  # Torn write from a crash
+                        break
+                    try:
+                        meta = json.loads(line)
+                    except json.JSONDecodeError:
+                        torn = True
+                        break
+                    entries[meta["id"]] = meta
+                    records += 1
+
+            # Catch up on conversations written after the index's last append
+            stale = False
+            for meta in self._scan(indexed_at - RECONCILE_SLACK_SEC):
+                if entries.get(meta["id"]) != meta:
+                    entries[meta["id"]] = meta
+                    stale = True
+            self._set_entries(entries)
+            self._records = records
+            if torn or stale:
+                # Persist the repair; a fresh file also drops the torn tail appends would land after
+                self._compact()
+        else:
+            for meta in self._scan():
+                entries[meta["id"]] = meta
+            self._set_entries(entries)
+            self._compact()
+        return self._entries
+
+    def _set_entries(self, entries: Dict[str, Dict[str, Any]]):
+        self._entries = entries
+        self._keys = sorted((meta["created_at"], meta["id"]) for meta in entries.values())
+
+    def _compact(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            for meta in self._entries.values():
+                f.write(json.dumps(meta, separators=(",", ":")) + "\n")
+        os.replace(tmp_path, self.path)
+        self._records = len(self._entries)
+
+    # Updating
+
+    def put(self, meta: Dict[str, Any]):
+        """Insert or replace the metadata of one conversation."""
+        with self._lock:
+            entries = self._ensure_loaded()
+            previous = entries.get(meta["id"])
+            if previous is not None:
+                old_key = (previous["created_at"], previous["id"])
+                index = bisect.bisect_left(self._keys, old_key)
+                if index < len(self._keys) and self._keys[index] == old_key:
+                    del self._keys[index]
+            entries[meta["id"]] = meta
+            bisect.insort(self._keys, (meta["created_at"], meta["id"]))
+
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(meta, separators=(",", ":")) + "\n")
+            self._records += 1
+
+            if self._records > 2 * len(entries) + 16:
+                self._compact()
+
+    def update(self, conversation_id: str, **changes: Any) -> bool:
+        """
+        Apply changes to an indexed conversation's metadata.
+
+        Returns:
+            False if the conversation isn't in the index (the caller should `put` it)
+        """
+        with self._lock:
+            meta = self._ensure_loaded().get(conversation_id)
+            if meta is None:
+                return False
+            self.put({**meta, **changes})
+            return True
+
+    def increment_messages(self, conversation_id: str, count: int = 1) -> bool:
+        with self._lock:
+            meta = self._ensure_loaded().get(conversation_id)
+            if meta is None:
+                return False
+            return self.update(conversation_id, message_count=meta["message_count"] + count)
+
+    def rebuild(self):
+        """Discard the index and rebuild it from a full scan."""
+        with self._lock:
+            self._entries = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._ensure_loaded()
+
+    # Reading
+
+    def get(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._ensure_loaded().get(conversation_id)
+
+    def all(self) -> List[Dict[str, Any]]:
+        """Every conversation's metadata, newest first."""
+        with self._lock:
+            entries = self._ensure_loaded()
+            return [dict(entries[conversation_id]) for _, conversation_id in reversed(self._keys)]
+
+    def page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        """
+        One page of conversations, newest first.
+
+        Args:
+            limit: Page size (clamped to 1..MAX_PAGE_SIZE)
+            cursor: `next_cursor` from the previous page, or None for the first page
+
+        Returns:
+            Dict with 'conversations' and 'next_cursor' (None on the last page)
+        """
+        limit = clamp_page_size(limit)
+        with self._lock:
+            entries = self._ensure_loaded()
+            end = len(self._keys) if cursor is None else bisect.bisect_left(self._keys, decode_cursor(cursor))
+            start = max(0, end - limit)
+            page = [dict(entries[conversation_id]) for _, conversation_id in reversed(self._keys[start:end])]
+        return {
+            "conversations": page,
+            "next_cursor": encode_cursor(page[-1]) if start > 0 else None,
+        }
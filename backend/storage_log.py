@@ -0,0 +1,252 @@
+"""Append-only JSONL log storage engine for conversations."""
+
+import json
+import os
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+from .config import DATA_DIR, LOG_COMPACT_EVERY
+from .storage import StorageBackend, new_conversation, INDEX_FILENAME
+from .storage_index import ConversationIndex, conversation_meta
+
+
+def _fsync_dir(directory: str):
+    """Make a rename durable by syncing its directory (no-op where unsupported)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class AppendLogStorage(StorageBackend):
+    """
+    One append-only JSONL log per conversation.
+
+    The first record of a log is a snapshot of the whole conversation; every
+    mutation after that is appended as a small record ('message' or 'title')
+    with a single write followed by fsync, so adding a message costs the size
+    of that message rather than a rewrite of the whole conversation. Once a log
+    has accumulated `compact_every` records it is compacted into a fresh
+    snapshot, written to a temp file and atomically renamed into place.
+
+    A crash mid-append can only leave a torn final line. Readers ignore it and
+    the next append truncates it away. Legacy `<id>.json` files are read
+    transparently and converted to a log on their first mutation.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, compact_every: int = LOG_COMPACT_EVERY):
+        self.data_dir = data_dir
+        self.compact_every = compact_every
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+        # Records per log since its last snapshot, learned on first write
+        self._record_counts: Dict[str, int] = {}
+        self.index = ConversationIndex(os.path.join(data_dir, INDEX_FILENAME), self._scan)
+
+    def _lock(self, conversation_id: str) -> threading.Lock:
+        with self._locks_guard:
+            lock = self._locks.get(conversation_id)
+            if lock is None:
+                lock = threading.Lock()
+                self._locks[conversation_id] = lock
+            return lock
+
+    def _log_path(self, conversation_id: str) -> str:
+        return os.path.join(self.data_dir, f"{conversation_id}.jsonl")
+
+    def _legacy_path(self, conversation_id: str) -> str:
+        return os.path.join(self.data_dir, f"{conversation_id}.json")
+
+    # Reading
+
+    def _replay(self, path: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        """Rebuild a conversation from its log; returns (conversation, record count)."""
+        conversation = None
+        records = 0
+        with open(path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # Torn write from a crash; everything before it is intact
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                records += 1
+                op = record.get("op")
+                if op == "snapshot":
+                    conversation = record["conversation"]
+                elif conversation is None:
+                    continue
+                elif op == "message":
+                    conversation["messages"].append(record["message"])
+                elif op == "title":
+                    conversation["title"] = record["title"]
+        return conversation, records
+
+    def _load(self, conversation_id: str) -> Tuple[Optional[Dict[str, Any]], int]:
+        path = self._log_path(conversation_id)
+        if os.path.exists(path):
+            return self._replay(path)
+
+        legacy = self._legacy_path(conversation_id)
+        if os.path.exists(legacy):
+            with open(legacy, 'r') as f:
+                return json.load(f), 0
+        return None, 0
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        conversation, _ = self._load(conversation_id)
+        return conversation
+
+    def _scan(self, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Metadata of conversations on disk, for building or reconciling the index.
+
+        Args:
+            since: Only include conversations whose files were modified at or after this time
+        """
+        os.makedirs(self.data_dir, exist_ok=True)
+
+        ids = set()
+        with os.scandir(self.data_dir) as it:
+            for entry in it:
+                stem, ext = os.path.splitext(entry.name)
+                if ext in (".jsonl", ".json") and (since is None or entry.stat().st_mtime >= since):
+                    ids.add(stem)
+
+        conversations = []
+        for conversation_id in ids:
+            data = self.get_conversation(conversation_id)
+            if data is not None:
+                conversations.append(conversation_meta(data))
+        return conversations
+
+    def list_conversations(self) -> List[Dict[str, Any]]:
+        return self.index.all()
+
+    def list_conversations_page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        return self.index.page(limit, cursor)
+
+    # Writing
+
+    def _append(self, conversation_id: str, records: List[Dict[str, Any]]):
+        """Durably append records to an existing log with a single write."""
+        path = self._log_path(conversation_id)
+        line = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records).encode("utf-8")
+
+        fd = os.open(path, os.O_RDWR | os.O_APPEND)
+        try:
+            self._repair_tail(fd)
+            os.write(fd, line)
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _repair_tail(fd: int):
+        """Truncate a torn final line left behind by a crash."""
+        size = os.fstat(fd).st_size
+        if size == 0 or os.pread(fd, 1, size - 1) == b"\n":
+            return
+
+        # Scan backwards for the last complete line
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            chunk = os.pread(fd, end - start, start)
+            newline = chunk.rfind(b"\n")
+            if newline != -1:
+                os.ftruncate(fd, start + newline + 1)
+                return
+            end = start
+        os.ftruncate(fd, 0)
+
+    def _write_snapshot(self, conversation: Dict[str, Any]):
+        """Atomically replace a conversation's log with a single snapshot record."""
+        os.makedirs(self.data_dir, exist_ok=True)
+        path = self._log_path(conversation["id"])
+        tmp_path = path + ".tmp"
+        line = json.dumps({"op": "snapshot", "conversation": conversation}, separators=(",", ":")) + "\n"
+
+        with open(tmp_path, 'w') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_dir(self.data_dir)
+        self._record_counts[conversation["id"]] = 1
+
+        legacy = self._legacy_path(conversation["id"])
+        if os.path.exists(legacy):
+            os.remove(legacy)
+
+    def _record_count(self, conversation_id: str, path: str) -> int:
+        count = self._record_counts.get(conversation_id)
+        if count is None:
+            with open(path, 'rb') as f:
+                count = sum(1 for _ in f)
+        return count
+
+    def _mutate(self, conversation_id: str, records: List[Dict[str, Any]]):
+        # Load the index before the log changes, or a first-time scan or reconcile would count this record twice
+        self.index.get(conversation_id)
+        with self._lock(conversation_id):
+            path = self._log_path(conversation_id)
+            if not os.path.exists(path):
+                # Legacy JSON file (or nothing at all): start a log from a snapshot
+                conversation, _ = self._load(conversation_id)
+                if conversation is None:
+                    raise ValueError(f"Conversation {conversation_id} not found")
+                self._write_snapshot(conversation)
+
+            count = self._record_count(conversation_id, path)
+            self._append(conversation_id, records)
+            count += len(records)
+
+            # Compaction is a full rewrite, so only do it every `compact_every` records
+            if count >= self.compact_every:
+                conversation, _ = self._replay(path)
+                self._write_snapshot(conversation)
+                count = 1
+            self._record_counts[conversation_id] = count
+            self._index_records(conversation_id, records)
+
+    def _index_records(self, conversation_id: str, records: List[Dict[str, Any]]):
+        messages = sum(1 for record in records if record["op"] == "message")
+        titles = [record["title"] for record in records if record["op"] == "title"]
+        indexed = True
+        if messages:
+            indexed = self.index.increment_messages(conversation_id, messages)
+        if titles and indexed:
+            indexed = self.index.update(conversation_id, title=titles[-1])
+        if not indexed:
+            # Not indexed yet (e.g. a legacy file added after the index was built)
+            conversation, _ = self._load(conversation_id)
+            self.index.put(conversation_meta(conversation))
+
+    def create_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        conversation = new_conversation(conversation_id)
+        with self._lock(conversation_id):
+            self._write_snapshot(conversation)
+            self.index.put(conversation_meta(conversation))
+        return conversation
+
+    def save_conversation(self, conversation: Dict[str, Any]):
+        with self._lock(conversation["id"]):
+            self._write_snapshot(conversation)
+            self.index.put(conversation_meta(conversation))
+
+    def add_message(self, conversation_id: str, message: Dict[str, Any]):
+        self._mutate(conversation_id, [{"op": "message", "message": message}])
+
+    def add_messages(self, conversation_id: str, messages: List[Dict[str, Any]]):
+        if messages:
+            self._mutate(conversation_id, [{"op": "message", "message": m} for m in messages])
+
+    def update_conversation_title(self, conversation_id: str, title: str):
+        self._mutate(conversation_id, [{"op": "title", "title": title}])
@@ -0,0 +1,318 @@
+"""Async Postgres storage engine for conversations (database/schema.sql)."""
+
+import asyncio
+import json
+import uuid
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Optional
+from .config import DATABASE_URL, POSTGRES_POOL_MIN_SIZE, POSTGRES_POOL_MAX_SIZE
+from .storage import (
+    AsyncStorage,
+    assistant_message,
+    new_conversation,
+    user_message,
+    _index_user_message,
+    _index_assistant_message,
+)
+from .storage_index import clamp_page_size, decode_cursor, encode_cursor
+
+try:
+    import asyncpg
+except ImportError:
+    asyncpg = None
+
+# Keep in sync with database/schema.sql
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id UUID PRIMARY KEY,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    title TEXT NOT NULL DEFAULT 'New Conversation'
+);
+
+-- Never maintained by the JS writer (database/db.js) on a shared database
+ALTER TABLE conversations DROP COLUMN IF EXISTS message_count;
+
+CREATE TABLE IF NOT EXISTS messages (
+    id SERIAL PRIMARY KEY,
+    conversation_id UUID NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    role TEXT NOT NULL CHECK (role IN ('user', 'assistant')),
+    content TEXT,
+    stage1 JSONB,
+    stage2 JSONB,
+    stage3 JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- New names, so databases that already have the single-column indexes get
+-- these definitions; the old indexes are superseded by them
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_id_id ON messages(conversation_id, id);
+CREATE INDEX IF NOT EXISTS idx_conversations_created_at_id ON conversations(created_at DESC, id DESC);
+DROP INDEX IF EXISTS idx_messages_conversation_id;
+DROP INDEX IF EXISTS idx_conversations_created_at;
+"""
+
+INSERT_MESSAGE = (
+    "INSERT INTO messages (conversation_id, role, content, stage1, stage2, stage3) "
+    "VALUES ($1, $2, $3, $4, $5, $6)"
+)
+
+# Counted per listed row from the (conversation_id, id) index, so the count is
+# right whichever writer added the messages
+LIST_COLUMNS = (
+    "id, created_at, title, "
+    "(SELECT COUNT(*) FROM messages m WHERE m.conversation_id = conversations.id) AS message_count"
+)
+
+
+def _to_timestamp(value: str) -> datetime:
+    """Our ISO timestamps are naive UTC; Postgres wants them timezone-aware."""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _from_timestamp(value: datetime) -> str:
+    """Render timestamps exactly like the other engines (naive UTC ISO 8601)."""
+    return value.astimezone(timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def _valid_id(conversation_id: str) -> bool:
+    """Conversation ids are UUIDs in this schema; anything else can't exist."""
+    try:
+        uuid.UUID(conversation_id)
+    except (ValueError, TypeError, AttributeError):
+        return False
+    return True
+
+
+def _meta(row) -> Dict[str, Any]:
+    return {
+        "id": str(row["id"]),
+        "created_at": _from_timestamp(row["created_at"]),
+        "title": row["title"],
+        "message_count": row["message_count"],
+    }
+
+
+def _message_args(conversation_id: str, message: Dict[str, Any]) -> tuple:
+    return (
+        conversation_id,
+        message["role"],
+        message.get("content"),
+        message.get("stage1"),
+        message.get("stage2"),
+        message.get("stage3"),
+    )
+
+
+def _row_message(row) -> Dict[str, Any]:
+    message = {"role": row["role"]}
+    if row["content"] is not None:
+        message["content"] = row["content"]
+    for col in ("stage1", "stage2", "stage3"):
+        if row[col] is not None:
+            message[col] = row[col]
+    return message
+
+
+async def _init_connection(conn):
+    # Decode JSONB stage columns to Python objects (and encode them back)
+    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+
+class PostgresStorage(AsyncStorage):
+    """
+    Natively async storage on Postgres, for running several backend replicas.
+
+    Uses an asyncpg connection pool opened on first use. Every query is a
+    constant SQL string, so asyncpg prepares it once per connection and reuses
+    the prepared statement from its cache. Concurrent writers are serialized by
+    Postgres itself (row locks on the conversation), so no in-process locks are
+    needed. Listing uses keyset pagination on (created_at, id) and counts each
+    listed conversation's messages from the (conversation_id, id) index.
+    """
+
+    def __init__(
+        self,
+        dsn: str = DATABASE_URL,
+        min_size: int = POSTGRES_POOL_MIN_SIZE,
+        max_size: int = POSTGRES_POOL_MAX_SIZE,
+    ):
+        if asyncpg is None:
+            raise RuntimeError("STORAGE_BACKEND=postgres requires the asyncpg package (pip install asyncpg)")
+        if not dsn:
+            raise RuntimeError("STORAGE_BACKEND=postgres requires DATABASE_URL")
+        super().__init__()
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool = None
+        self._pool_lock = asyncio.Lock()
+
+    async def pool(self):
+        """The connection pool, created (and the schema applied) on first use."""
+        if self._pool is None:
+            async with self._pool_lock:
+                if self._pool is None:
+                    pool = await asyncpg.create_pool(
+                        self.dsn,
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        init=_init_connection,
+                    )
+                    async with pool.acquire() as conn:
+                        await conn.execute(SCHEMA)
+                    self._pool = pool
+        return self._pool
+
+    async def close(self):
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    async def create_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        conversation = new_conversation(conversation_id)
+        pool = await self.pool()
+        await pool.execute(
+            "INSERT INTO conversations (id, created_at, title) VALUES ($1, $2, $3)",
+            conversation_id, _to_timestamp(conversation["created_at"]), conversation["title"],
+        )
+        return conversation
+
+    async def get_conversation(self, conversation_id: str, load_stages: bool = True) -> Optional[Dict[str, Any]]:
+        if not _valid_id(conversation_id):
+            return None
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                "SELECT id, created_at, title FROM conversations WHERE id = $1", conversation_id
+            )
+            if row is None:
+                return None
+
+            if load_stages:
+                messages = await conn.fetch(
+                    "SELECT role, content, stage1, stage2, stage3 FROM messages "
+                    "WHERE conversation_id = $1 ORDER BY id",
+                    conversation_id,
+                )
+            else:
+                # Skip the (TOASTed, possibly large) stage columns entirely
+                messages = await conn.fetch(
+                    "SELECT id, role, content, NULL::jsonb AS stage1, NULL::jsonb AS stage2, NULL::jsonb AS stage3 "
+                    "FROM messages WHERE conversation_id = $1 ORDER BY id",
+                    conversation_id,
+                )
+
+        result = []
+        for m in messages:
+            message = _row_message(m)
+            if not load_stages and m["role"] == "assistant":
+                message["message_id"] = m["id"]
+            result.append(message)
+
+        return {
+            "id": str(row["id"]),
+            "created_at": _from_timestamp(row["created_at"]),
+            "title": row["title"],
+            "messages": result,
+        }
+
+    async def load_stages(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        if "message_id" not in message:
+            return message
+        pool = await self.pool()
+        row = await pool.fetchrow(
+            "SELECT stage1, stage2, stage3 FROM messages WHERE id = $1", message["message_id"]
+        )
+        loaded = {k: v for k, v in message.items() if k != "message_id"}
+        if row is not None:
+            for col in ("stage1", "stage2", "stage3"):
+                if row[col] is not None:
+                    loaded[col] = row[col]
+        return loaded
+
+    async def save_conversation(self, conversation: Dict[str, Any]):
+        messages = conversation.get("messages", [])
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                await conn.execute(
+                    "INSERT INTO conversations (id, created_at, title) VALUES ($1, $2, $3) "
+                    "ON CONFLICT (id) DO UPDATE SET title = EXCLUDED.title",
+                    conversation["id"],
+                    _to_timestamp(conversation["created_at"]),
+                    conversation.get("title", "New Conversation"),
+                )
+                await conn.execute("DELETE FROM messages WHERE conversation_id = $1", conversation["id"])
+                await conn.executemany(INSERT_MESSAGE, [_message_args(conversation["id"], m) for m in messages])
+
+    async def list_conversations(self) -> List[Dict[str, Any]]:
+        pool = await self.pool()
+        rows = await pool.fetch(
+            f"SELECT {LIST_COLUMNS} FROM conversations ORDER BY created_at DESC, id DESC"
+        )
+        return [_meta(row) for row in rows]
+
+    async def list_conversations_page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        limit = clamp_page_size(limit)
+        pool = await self.pool()
+        if cursor is None:
+            rows = await pool.fetch(
+                f"SELECT {LIST_COLUMNS} FROM conversations ORDER BY created_at DESC, id DESC LIMIT $1",
+                limit + 1,
+            )
+        else:
+            created_at, conversation_id = decode_cursor(cursor)
+            rows = await pool.fetch(
+                f"SELECT {LIST_COLUMNS} FROM conversations WHERE (created_at, id) < ($1, $2::uuid) "
+                "ORDER BY created_at DESC, id DESC LIMIT $3",
+                _to_timestamp(created_at), conversation_id, limit + 1,
+            )
+
+        page = [_meta(row) for row in rows[:limit]]
+        return {
+            "conversations": page,
+            "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None,
+        }
+
+    async def add_messages(self, conversation_id: str, messages: List[Dict[str, Any]]):
+        """Append messages in one transaction with a single batched insert."""
+        if not _valid_id(conversation_id):
+            raise ValueError(f"Conversation {conversation_id} not found")
+        pool = await self.pool()
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                # Also serializes concurrent appends to the conversation
+                found = await conn.fetchval(
+                    "SELECT 1 FROM conversations WHERE id = $1 FOR UPDATE", conversation_id
+                )
+                if found is None:
+                    raise ValueError(f"Conversation {conversation_id} not found")
+                await conn.executemany(INSERT_MESSAGE, [_message_args(conversation_id, m) for m in messages])
+
+    async def add_user_message(self, conversation_id: str, content: str, owner: Optional[str] = None):
+        await self.add_messages(conversation_id, [user_message(content)])
+        await asyncio.to_thread(_index_user_message, conversation_id, content, owner)
+
+    async def add_assistant_message(
+        self,
+        conversation_id: str,
+        stage1: List[Dict[str, Any]],
+        stage2: List[Dict[str, Any]],
+        stage3: Dict[str, Any],
+        owner: Optional[str] = None,
+    ):
+        await self.add_messages(conversation_id, [assistant_message(stage1, stage2, stage3)])
+        await asyncio.to_thread(_index_assistant_message, conversation_id, stage1, stage3, owner)
+
+    async def update_conversation_title(self, conversation_id: str, title: str):
+        if not _valid_id(conversation_id):
+            raise ValueError(f"Conversation {conversation_id} not found")
+        pool = await self.pool()
+        updated = await pool.execute(
+            "UPDATE conversations SET title = $1 WHERE id = $2", title, conversation_id
+        )
+        if updated == "UPDATE 0":
+            raise ValueError(f"Conversation {conversation_id} not found")
@@ -0,0 +1,246 @@
+"""SQLite (WAL) storage engine for conversations."""
+
+import json
+import os
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from .config import DATA_DIR, SQLITE_DB_PATH
+from .storage import StorageBackend, new_conversation
+from .storage_index import clamp_page_size, decode_cursor, encode_cursor
+
+# Mirrors database/schema.sql; stage payloads are stored as JSON text
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    created_at TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT 'New Conversation',
+    message_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    conversation_id TEXT NOT NULL REFERENCES conversations(id) ON DELETE CASCADE,
+    role TEXT NOT NULL CHECK (role IN ('user', 'assistant')),
+    content TEXT,
+    stage1 TEXT,
+    stage2 TEXT,
+    stage3 TEXT,
+    created_at TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id, id);
+DROP INDEX IF EXISTS idx_conversations_created_at;
+CREATE INDEX IF NOT EXISTS idx_conversations_created_at_id ON conversations(created_at, id);
+"""
+
+STAGE_COLUMNS = ("stage1", "stage2", "stage3")
+
+
+def _message_row(conversation_id: str, message: Dict[str, Any]) -> tuple:
+    return (
+        conversation_id,
+        message["role"],
+        message.get("content"),
+        *(json.dumps(message[col]) if message.get(col) is not None else None for col in STAGE_COLUMNS),
+        datetime.utcnow().isoformat(),
+    )
+
+
+def _row_message(row: sqlite3.Row) -> Dict[str, Any]:
+    message = {"role": row["role"]}
+    if row["content"] is not None:
+        message["content"] = row["content"]
+    for col in STAGE_COLUMNS:
+        if row[col] is not None:
+            message[col] = json.loads(row[col])
+    return message
+
+
+class SQLiteStorage(StorageBackend):
+    """
+    Conversations in a single SQLite database in WAL mode.
+
+    Listing reads only the indexed `conversations` table (with a denormalized
+    message count), so its cost doesn't depend on how much history is stored.
+    Each thread gets its own connection; WAL lets readers proceed while a
+    writer commits.
+    """
+
+    def __init__(self, path: str = SQLITE_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._transaction() as db:
+            db.executescript(SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30.0)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute("PRAGMA foreign_keys=ON")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        try:
+            yield db
+            db.commit()
+        except BaseException:
+            db.rollback()
+            raise
+
+    def create_conversation(self, conversation_id: str) -> Dict[str, Any]:
+        conversation = new_conversation(conversation_id)
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO conversations (id, created_at, title, message_count) VALUES (?, ?, ?, 0)",
+                (conversation["id"], conversation["created_at"], conversation["title"]),
+            )
+        return conversation
+
+    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        db = self._connection()
+        row = db.execute(
+            "SELECT id, created_at, title FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        messages = db.execute(
+            "SELECT role, content, stage1, stage2, stage3 FROM messages WHERE conversation_id = ? ORDER BY id",
+            (conversation_id,),
+        ).fetchall()
+
+        return {
+            "id": row["id"],
+            "created_at": row["created_at"],
+            "title": row["title"],
+            "messages": [_row_message(m) for m in messages],
+        }
+
+    def save_conversation(self, conversation: Dict[str, Any]):
+        messages = conversation.get("messages", [])
+        with self._transaction() as db:
+            db.execute(
+                """
+                INSERT INTO conversations (id, created_at, title, message_count) VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET title = excluded.title, message_count = excluded.message_count
+                """,
+                (conversation["id"], conversation["created_at"], conversation.get("title", "New Conversation"), len(messages)),
+            )
+            db.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation["id"],))
+            db.executemany(
+                "INSERT INTO messages (conversation_id, role, content, stage1, stage2, stage3, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [_message_row(conversation["id"], m) for m in messages],
+            )
+
+    def list_conversations(self) -> List[Dict[str, Any]]:
+        rows = self._connection().execute(
+            "SELECT id, created_at, title, message_count FROM conversations ORDER BY created_at DESC, id DESC"
+        ).fetchall()
+        return [dict(row) for row in rows]
+
+    def list_conversations_page(self, limit: Optional[int] = None, cursor: Optional[str] = None) -> Dict[str, Any]:
+        # Keyset pagination: seek past the cursor on the (created_at, id) index, no OFFSET scan
+        limit = clamp_page_size(limit)
+        if cursor is None:
+            rows = self._connection().execute(
+                "SELECT id, created_at, title, message_count FROM conversations "
+                "ORDER BY created_at DESC, id DESC LIMIT ?",
+                (limit + 1,),
+            ).fetchall()
+        else:
+            rows = self._connection().execute(
+                "SELECT id, created_at, title, message_count FROM conversations "
+                "WHERE (created_at, id) < (?, ?) ORDER BY created_at DESC, id DESC LIMIT ?",
+                (*decode_cursor(cursor), limit + 1),
+            ).fetchall()
+
+        page = [dict(row) for row in rows[:limit]]
+        return {
+            "conversations": page,
+            "next_cursor": encode_cursor(page[-1]) if len(rows) > limit else None,
+        }
+
+    def add_message(self, conversation_id: str, message: Dict[str, Any]):
+        self.add_messages(conversation_id, [message])
+
+    def add_messages(self, conversation_id: str, messages: List[Dict[str, Any]]):
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE conversations SET message_count = message_count + ? WHERE id = ?",
+                (len(messages), conversation_id),
+            ).rowcount
+            if not updated:
+                raise ValueError(f"Conversation {conversation_id} not found")
+            db.executemany(
+                "INSERT INTO messages (conversation_id, role, content, stage1, stage2, stage3, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [_message_row(conversation_id, m) for m in messages],
+            )
+
+    def update_conversation_title(self, conversation_id: str, title: str):
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE conversations SET title = ? WHERE id = ?", (title, conversation_id)
+            ).rowcount
+            if not updated:
+                raise ValueError(f"Conversation {conversation_id} not found")
+
+    def has_conversation(self, conversation_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone() is not None
+
+
+def migrate_json_conversations(storage: SQLiteStorage, json_dir: str = DATA_DIR) -> int:
+    """
+    One-shot import of `<json_dir>/*.json` conversations into SQLite.
+
+    Conversations already present in the database are skipped, so the
+    migration can safely be re-run.
+
+    Returns:
+        Number of conversations imported
+    """
+    if not os.path.isdir(json_dir):
+        return 0
+
+    imported = 0
+    for filename in sorted(os.listdir(json_dir)):
+        if not filename.endswith('.json'):
+            continue
+
+        path = os.path.join(json_dir, filename)
+        try:
+            with open(path, 'r') as f:
+                conversation = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Skipping {path}: {e}")
+            continue
+
+        if storage.has_conversation(conversation["id"]):
+            continue
+
+        storage.save_conversation(conversation)
+        imported += 1
+
+    return imported
+
+
+if __name__ == "__main__":
+    # Usage: python -m backend.storage_sqlite [json_dir] [sqlite_path]
+    source_dir = sys.argv[1] if len(sys.argv) > 1 else DATA_DIR
+    target = SQLiteStorage(sys.argv[2] if len(sys.argv) > 2 else SQLITE_DB_PATH)
+    count = migrate_json_conversations(target, source_dir)
+    print(f"Imported {count} conversations from {source_dir} into {target.path}")
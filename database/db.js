@@ -25,9 +25,9 @@ async function initSchema() {
     )
   `;
 
-  // Create indexes
-  await sql`CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id)`;
-  await sql`CREATE INDEX IF NOT EXISTS idx_conversations_created_at ON conversations(created_at DESC)`;
+  // Create indexes (keep in sync with schema.sql)
+  await sql`CREATE INDEX IF NOT EXISTS idx_messages_conversation_id_id ON messages(conversation_id, id)`;
+  await sql`CREATE INDEX IF NOT EXISTS idx_conversations_created_at_id ON conversations(created_at DESC, id DESC)`;
 }
 
 // Database operations
@@ -19,9 +19,13 @@ CREATE TABLE IF NOT EXISTS messages (
     created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
--- Indexes for better performance
-CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id);
-CREATE INDEX IF NOT EXISTS idx_conversations_created_at ON conversations(created_at DESC);
+-- Indexes for better performance (message counts and keyset pagination)
+CREATE INDEX IF NOT EXISTS idx_messages_conversation_id_id ON messages(conversation_id, id);
+CREATE INDEX IF NOT EXISTS idx_conversations_created_at_id ON conversations(created_at DESC, id DESC);
+
+-- Superseded by the indexes above
+DROP INDEX IF EXISTS idx_messages_conversation_id;
+DROP INDEX IF EXISTS idx_conversations_created_at;
 
 
 
@@ -139,11 +139,13 @@ function App() {
       }));
 
       // Build conversation context from prior messages (Stage 3-only history)
-      // Include user messages + assistant stage3.response only, apply rolling window + size cap
+      // Send the whole history: the backend compacts long contexts into a cached
+      // summary plus the most recent messages, so nothing is windowed here beyond
+      // the backend's request limits
       const buildConversationContext = (messages) => {
         const context = [];
-        const maxTurns = 8; // Keep last 8 user+assistant pairs
-        const maxTotalChars = 20000; // 20k char budget as token proxy
+        const maxMessageChars = 5000; // Backend per-message limit
+        const maxTotalChars = 1000000; // Backend limit on the raw (uncompacted) context
         let totalChars = 0;
 
         // Process messages in reverse order to get the most recent ones first
@@ -151,19 +153,22 @@ function App() {
           msg.role === 'user' || (msg.role === 'assistant' && msg.stage3?.response)
         );
 
-        for (let i = priorMessages.length - 1; i >= 0 && context.length < maxTurns * 2; i--) {
+        for (let i = priorMessages.length - 1; i >= 0; i--) {
           const msg = priorMessages[i];
-          const content = msg.role === 'user' ? msg.content : msg.stage3.response;
-          const contextMsg = { role: msg.role, content };
+          const full = msg.role === 'user' ? msg.content : msg.stage3.response;
+          // Keep the start of over-long answers rather than having the request rejected
+          const content = full.length > maxMessageChars ? full.slice(0, maxMessageChars) : full;
+          if (!content.trim()) {
+            continue;
+          }
 
           // Check if adding this message would exceed the character limit
-          const msgChars = JSON.stringify(contextMsg).length;
-          if (totalChars + msgChars > maxTotalChars) {
+          if (totalChars + content.length > maxTotalChars) {
             break;
           }
 
-          context.unshift(contextMsg); // Add to front to maintain chronological order
-          totalChars += msgChars;
+          context.unshift({ role: msg.role, content }); // Add to front to maintain chronological order
+          totalChars += content.length;
         }
 
         return context;
@@ -177,6 +182,16 @@ function App() {
         content,
         (eventType, event) => {
         switch (eventType) {
+          case 'context_compacted':
+            // Older turns were summarized server-side to fit the context budget
+            setCurrentConversation((prev) => {
+              const messages = [...prev.messages];
+              const lastMsg = messages[messages.length - 1];
+              messages[messages.length - 1] = { ...lastMsg, contextCompacted: event.data };
+              return { ...prev, messages };
+            });
+            break;
+
           case 'stage1_start':
             setCurrentConversation((prev) => {
               const messages = [...prev.messages];
@@ -186,6 +201,39 @@ function App() {
             });
             break;
 
+          case 'stage1_delta':
+            setCurrentConversation((prev) => {
+              const messages = [...prev.messages];
+              const lastMsg = messages[messages.length - 1];
+              const stage1 = [...(lastMsg.stage1 || [])];
+              const idx = stage1.findIndex((r) => r.model === event.model);
+              if (idx === -1) {
+                stage1.push({ model: event.model, response: event.delta });
+              } else {
+                stage1[idx] = { ...stage1[idx], response: stage1[idx].response + event.delta };
+              }
+              // Replace, don't mutate: StrictMode runs updaters twice, which would append each token twice
+              messages[messages.length - 1] = { ...lastMsg, stage1 };
+              return { ...prev, messages };
+            });
+            break;
+
+          case 'stage1_model_complete':
+            setCurrentConversation((prev) => {
+              const messages = [...prev.messages];
+              const lastMsg = messages[messages.length - 1];
+              const stage1 = [...(lastMsg.stage1 || [])];
+              const idx = stage1.findIndex((r) => r.model === event.data.model);
+              if (idx === -1) {
+                stage1.push(event.data);
+              } else {
+                stage1[idx] = event.data;
+              }
+              messages[messages.length - 1] = { ...lastMsg, stage1 };
+              return { ...prev, messages };
+            });
+            break;
+
           case 'stage1_complete':
             setCurrentConversation((prev) => {
               const messages = [...prev.messages];
@@ -205,6 +253,23 @@ function App() {
             });
             break;
 
+          case 'stage2_model_complete':
+            setCurrentConversation((prev) => {
+              const messages = [...prev.messages];
+              const lastMsg = messages[messages.length - 1];
+              // Upsert into a new array: StrictMode runs updaters twice, so appending would duplicate
+              const stage2 = [...(lastMsg.stage2 || [])];
+              const idx = stage2.findIndex((r) => r.model === event.data.model);
+              if (idx === -1) {
+                stage2.push(event.data);
+              } else {
+                stage2[idx] = event.data;
+              }
+              messages[messages.length - 1] = { ...lastMsg, stage2 };
+              return { ...prev, messages };
+            });
+            break;
+
           case 'stage2_complete':
             setCurrentConversation((prev) => {
               const messages = [...prev.messages];
@@ -225,6 +290,22 @@ function App() {
             });
             break;
 
+          case 'stage3_delta':
+            setCurrentConversation((prev) => {
+              const messages = [...prev.messages];
+              const lastMsg = messages[messages.length - 1];
+              messages[messages.length - 1] = {
+                ...lastMsg,
+                stage3: {
+                  ...lastMsg.stage3,
+                  model: event.model,
+                  response: (lastMsg.stage3?.response || '') + event.delta,
+                },
+              };
+              return { ...prev, messages };
+            });
+            break;
+
           case 'stage3_complete':
             setCurrentConversation((prev) => {
               const messages = [...prev.messages];
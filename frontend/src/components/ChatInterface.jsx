@@ -81,6 +81,16 @@ export default function ChatInterface({
                 <div className="assistant-message">
                   <div className="message-label">LLM Council</div>
 
+                  {msg.contextCompacted && (
+                    <div className="context-note">
+                      {msg.contextCompacted.summarized_messages > 0
+                        ? `Earlier conversation (${msg.contextCompacted.summarized_messages} messages) was summarized to fit the context.`
+                        : 'Earlier conversation was shortened to fit the context.'}
+                      {msg.contextCompacted.dropped_messages > 0 &&
+                        ` ${msg.contextCompacted.dropped_messages} older messages were left out.`}
+                    </div>
+                  )}
+
                   {/* Stage 1 */}
                   {msg.loading?.stage1 && (
                     <div className="stage-loading">
@@ -9,7 +9,8 @@ function deAnonymizeText(text, labelToModel) {
   // Replace each "Response X" with the actual model name
   Object.entries(labelToModel).forEach(([label, model]) => {
     const modelShortName = model.split('/')[1] || model;
-    result = result.replace(new RegExp(label, 'g'), `**${modelShortName}**`);
+    // Word boundary so "Response A" doesn't also rewrite "Response AB"
+    result = result.replace(new RegExp(`${label}\\b`, 'g'), `**${modelShortName}**`);
   });
   return result;
 }
@@ -0,0 +1,17 @@
+import httpx
+import pytest
+
+from backend import openrouter
+
+
+@pytest.fixture
+def mock_upstream(monkeypatch):
+    """Route the shared OpenRouter client through an httpx.MockTransport handler."""
+    def install(handler):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(openrouter.client_manager, "_client", client)
+        return client
+
+    monkeypatch.setattr(openrouter, "_model_health", {})
+    yield install
+    monkeypatch.setattr(openrouter.client_manager, "_client", None)
@@ -0,0 +1,74 @@
+import asyncio
+
+import httpx
+
+from backend import main
+
+BODY = {
+    "content": "What is 2+2?",
+    "model_config": {"council_models": ["a/x", "b/y"], "chairman_model": "a/x"},
+}
+
+
+def stream(client, api_key):
+    return client.post("/api/council/stream", json=BODY, headers={"X-OpenRouter-Api-Key": api_key})
+
+
+def test_identical_runs_are_only_shared_by_the_same_key(monkeypatch):
+    started = []
+
+    async def fake_events(body, api_key, *args):
+        started.append(api_key)
+        await asyncio.sleep(0.05)
+        yield {"type": "complete"}
+
+    monkeypatch.setattr(main, "_council_events", fake_events)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(
+                stream(client, "key-1"),
+                stream(client, "key-1"),
+                stream(client, "key-2"),
+            )
+        return responses
+
+    responses = asyncio.run(run())
+    assert all(r.status_code == 200 and '"complete"' in r.text for r in responses)
+    assert sorted(started) == ["key-1", "key-2"]
+
+
+def test_search_only_returns_the_callers_conversations(monkeypatch, tmp_path):
+    from backend import search
+    from backend.coalescing import key_fingerprint
+
+    index = search.SearchIndex(str(tmp_path / "search.sqlite3"))
+    index.index_user_message("mine", "my secret plan", key_fingerprint("key-1"))
+    index.index_user_message("theirs", "their secret plan", key_fingerprint("key-2"))
+    index.index_user_message("unowned", "an old secret plan")
+    monkeypatch.setattr(search, "get_search_index", lambda: index)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            anonymous = await client.get("/api/conversations/search", params={"q": "secret"})
+            keyed = await client.get(
+                "/api/conversations/search",
+                params={"q": "secret"},
+                headers={"X-OpenRouter-Api-Key": "key-1"},
+            )
+            stranger = await client.get(
+                "/api/conversations/search",
+                params={"q": "secret"},
+                headers={"X-OpenRouter-Api-Key": "made-up"},
+            )
+        return anonymous, keyed, stranger
+
+    anonymous, keyed, stranger = asyncio.run(run())
+    assert anonymous.status_code == 400
+    assert "secret" not in anonymous.text
+    assert keyed.status_code == 200
+    assert [r["conversation_id"] for r in keyed.json()["results"]] == ["mine"]
+    assert stranger.status_code == 200
+    assert stranger.json()["results"] == []
@@ -0,0 +1,124 @@
+"""
+Event-loop latency while conversations are being written.
+
+Run directly for a report:
+
+    python -m tests.test_async_storage [appends] [response_chars]
+
+A ticker coroutine stands in for an SSE stream: it wakes every few
+milliseconds and records how late each wake-up is. Meanwhile a writer appends
+large assistant messages to one growing conversation, either through
+AsyncStorage (the backend runs in worker threads) or by calling the backend
+directly on the loop, as the handlers used to. As a test it checks that the
+ticker's lag stays within a loose budget through AsyncStorage and that
+concurrent appends to one conversation are never lost.
+"""
+
+import asyncio
+import statistics
+import sys
+import tempfile
+import time
+
+import pytest
+
+from backend import storage
+from backend.storage import AsyncStorage, JSONFileStorage, assistant_message
+
+TICK_SECONDS = 0.005
+
+
+def make_turn(response_chars, models=4):
+    text = ("The council considered the question carefully. " * (response_chars // 48 + 1))[:response_chars]
+    stage1 = [{"model": f"model/{i}", "response": text} for i in range(models)]
+    stage2 = [{"model": f"model/{i}", "ranking": text[: response_chars // 4]} for i in range(models)]
+    stage3 = {"model": "model/chair", "response": text}
+    return stage1, stage2, stage3
+
+
+async def _ticker(stop, lags):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(TICK_SECONDS)
+        lags.append(time.perf_counter() - started - TICK_SECONDS)
+
+
+async def _measure(data_dir, mode, appends, response_chars):
+    backend = JSONFileStorage(data_dir)
+    facade = AsyncStorage(backend)
+    conversation_id = f"bench-{mode}"
+    backend.create_conversation(conversation_id)
+    turn = make_turn(response_chars)
+
+    stop = asyncio.Event()
+    lags = []
+    ticker = asyncio.create_task(_ticker(stop, lags))
+    await asyncio.sleep(TICK_SECONDS * 2)
+
+    started = time.perf_counter()
+    for _ in range(appends):
+        if mode == "async":
+            await facade.add_assistant_message(conversation_id, *turn)
+        else:
+            backend.add_message(conversation_id, assistant_message(*turn))
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+    return {
+        "elapsed": elapsed,
+        "ticks": len(lags),
+        "median_lag": statistics.median(lags),
+        "max_lag": max(lags),
+    }
+
+
+def run(data_dir, appends=30, response_chars=20000):
+    return {
+        mode: asyncio.run(_measure(data_dir, mode, appends, response_chars))
+        for mode in ("sync", "async")
+    }
+
+
+@pytest.fixture
+def no_search_index(monkeypatch):
+    monkeypatch.setattr(storage, "get_search_index", lambda: None)
+
+
+def test_event_loop_stays_responsive_under_write_load(tmp_path, no_search_index):
+    results = run(str(tmp_path))
+
+    # The loop keeps ticking through the writes instead of stalling behind them
+    assert results["async"]["ticks"] > results["sync"]["ticks"], results
+    assert results["async"]["median_lag"] < 0.02, results
+    assert results["async"]["median_lag"] < results["sync"]["median_lag"], results
+
+
+def test_concurrent_appends_to_one_conversation_are_kept(tmp_path, no_search_index):
+    backend = JSONFileStorage(str(tmp_path))
+    facade = AsyncStorage(backend)
+    backend.create_conversation("abc")
+
+    async def write_all():
+        await asyncio.gather(*(facade.add_user_message("abc", f"m{i}") for i in range(20)))
+
+    asyncio.run(write_all())
+
+    contents = sorted(message["content"] for message in backend.get_conversation("abc")["messages"])
+    assert contents == sorted(f"m{i}" for i in range(20))
+    assert facade._locks == {}
+
+
+if __name__ == "__main__":
+    storage.get_search_index = lambda: None
+    appends = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    response_chars = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    with tempfile.TemporaryDirectory() as data_dir:
+        results = run(data_dir, appends, response_chars)
+    print(f"{appends} appends of {4 * response_chars} chars each")
+    for mode, result in results.items():
+        print(
+            f"{mode:>5}: {result['elapsed'] * 1000:8.1f} ms writing, {result['ticks']:4d} ticks, "
+            f"median lag {result['median_lag'] * 1000:6.2f} ms, max lag {result['max_lag'] * 1000:7.2f} ms"
+        )
@@ -0,0 +1,149 @@
+import os
+import random
+import time
+
+from backend.blobs import ZDICTS, BlobStore, _compress, blob_refs, train_zdict
+from backend.storage import BlobStorage, JSONFileStorage, assistant_message, user_message
+
+PHRASES = [
+    "The response provides a clear and accurate explanation of",
+    "However, it overlooks an important consideration:",
+    "FINAL RANKING:\n1. Response A\n2. Response C\n3. Response B",
+    "This answer correctly identifies the main trade-off between",
+    "It would benefit from a concrete example showing how",
+]
+
+
+def make_samples(count, seed):
+    """Council-like texts: recurring phrasing between sample-specific words."""
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(2000)]
+    samples = []
+    for _ in range(count):
+        parts = [
+            rng.choice(PHRASES) if rng.random() < 0.3
+            else " ".join(rng.choice(vocab) for _ in range(rng.randint(3, 10))) + "."
+            for _ in range(rng.randint(10, 60))
+        ]
+        samples.append(" ".join(parts))
+    return samples
+
+
+def compressed_size(texts, zdict):
+    return sum(len(_compress(text.encode("utf-8"), zdict, 0)) for text in texts)
+
+
+def test_trained_dictionary_beats_seed_dictionary_on_held_out_texts():
+    zdict = train_zdict(make_samples(300, seed=0), size=4096)
+
+    assert 0 < len(zdict) <= 4096
+    assert PHRASES[1].encode("utf-8") in zdict
+    # Short texts gain the most from a dictionary
+    held_out = [text[:400] for text in make_samples(50, seed=1)]
+    assert compressed_size(held_out, zdict) < compressed_size(held_out, ZDICTS[1])
+
+
+def test_nothing_to_train_on():
+    assert train_zdict(["one sample only"]) == b""
+
+
+def test_installed_dictionary_is_used_and_old_blobs_still_decode(tmp_path):
+    store = BlobStore(str(tmp_path))
+    old = store.put("an answer written before training " * 20)
+
+    version = store.install_zdict(train_zdict(make_samples(50, seed=0)))
+    new = store.put(PHRASES[0] * 20)
+
+    assert version == 2 and store.zdict_version == 2
+    with open(store._path(new), "rb") as f:
+        assert f.read()[0] == 2
+    # A process started later loads the dictionary from the blob directory
+    reopened = BlobStore(str(tmp_path))
+    assert reopened.zdict_version == 2
+    assert reopened.get(old) == "an answer written before training " * 20
+    assert reopened.get(new) == PHRASES[0] * 20
+
+
+def test_reader_picks_up_dictionary_installed_by_another_process(tmp_path):
+    reader = BlobStore(str(tmp_path))
+    writer = BlobStore(str(tmp_path))
+    writer.install_zdict(train_zdict(make_samples(50, seed=0)))
+    digest = writer.put(PHRASES[1] * 20)
+
+    assert reader.get(digest) == PHRASES[1] * 20
+
+
+def age(path, seconds=7200):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def age_all(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            age(os.path.join(root, name))
+
+
+def council_turn(text):
+    return assistant_message(
+        [{"model": "a/one", "response": text + " (one)"}, {"model": "a/two", "response": "short"}],
+        [{"model": "a/one", "ranking": text + " (ranking)"}],
+        {"model": "a/chair", "response": text + " (final)"},
+    )
+
+
+def test_blob_refs_lists_every_referenced_stage_text(tmp_path):
+    storage = BlobStorage(JSONFileStorage(str(tmp_path / "conversations")), BlobStore(str(tmp_path / "blobs")))
+    storage.create_conversation("c")
+    storage.add_messages("c", [user_message("question " * 100), council_turn("long answer " * 50)])
+
+    user, assistant = storage.get_conversation_lazy("c")["messages"]
+    assert blob_refs(user) == []
+    assert len(blob_refs(assistant)) == 3
+
+
+def test_garbage_collection_removes_only_unreferenced_blobs(tmp_path):
+    blob_dir = str(tmp_path / "blobs")
+    storage = BlobStorage(JSONFileStorage(str(tmp_path / "conversations")), BlobStore(blob_dir))
+    storage.create_conversation("c")
+    storage.add_message("c", council_turn("first answer " * 50))
+    replaced = storage.get_conversation("c")
+    replaced["messages"] = [council_turn("second answer " * 50)]
+    storage.save_conversation(replaced)
+    # A crashed write leaves a temp file behind
+    orphan_tmp = storage.blobs._path("ab" * 32) + ".123.456.tmp"
+    os.makedirs(os.path.dirname(orphan_tmp), exist_ok=True)
+    open(orphan_tmp, "wb").close()
+    age_all(blob_dir)
+
+    stats = storage.collect_garbage(grace_seconds=3600)
+
+    assert (stats["removed"], stats["kept"]) == (4, 3)
+    assert stats["removed_bytes"] > 0
+    assert storage.get_conversation("c")["messages"] == [council_turn("second answer " * 50)]
+    assert not os.path.exists(orphan_tmp)
+    # Dictionaries are not blobs
+    storage.blobs.install_zdict(b"dictionary")
+    storage.collect_garbage(grace_seconds=0)
+    assert storage.blobs.zdict_version == 2 and os.path.exists(storage.blobs._zdict_path(2))
+
+
+def test_garbage_collection_spares_recent_and_reused_blobs(tmp_path):
+    store = BlobStore(str(tmp_path))
+    old = store.put("written long ago " * 20)
+    reused = store.put("written long ago, then stored again " * 20)
+    age_all(str(tmp_path))
+    recent = store.put("just written " * 20)
+    # Storing existing text again counts as a fresh write
+    assert store.put("written long ago, then stored again " * 20) == reused
+
+    stats = store.sweep(set(), grace_seconds=3600)
+
+    assert stats == {"kept": 2, "removed": 1, "removed_bytes": stats["removed_bytes"]}
+    assert store.get(old) is None
+    assert store.get(recent) == "just written " * 20
+    assert store.get(reused) == "written long ago, then stored again " * 20
+
+
+def test_sweep_of_an_empty_store(tmp_path):
+    assert BlobStore(str(tmp_path / "missing")).sweep(set()) == {"kept": 0, "removed": 0, "removed_bytes": 0}
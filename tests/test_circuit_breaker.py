@@ -0,0 +1,81 @@
+import asyncio
+
+import httpx
+
+from backend import openrouter
+from backend.config import CIRCUIT_FAILURE_THRESHOLD, OPENROUTER_MAX_RETRIES
+
+MODEL = "test/model"
+MESSAGES = [{"role": "user", "content": "hi"}]
+COMPLETION = {"choices": [{"message": {"content": "hello"}}]}
+
+
+def test_bad_key_does_not_open_breaker(mock_upstream):
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if request.headers["Authorization"] == "Bearer bad":
+            return httpx.Response(401, json={"error": "invalid key"})
+        return httpx.Response(200, json=COMPLETION)
+
+    mock_upstream(handler)
+
+    async def run():
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD + 2):
+            assert await openrouter.query_model(MODEL, MESSAGES, api_key="bad") is None
+        return await openrouter.query_model(MODEL, MESSAGES, api_key="good")
+
+    assert asyncio.run(run()) == {"content": "hello", "reasoning_details": None}
+    assert openrouter.get_model_health(MODEL).state == "closed"
+    assert len(calls) == CIRCUIT_FAILURE_THRESHOLD + 3
+
+
+def test_upstream_errors_open_breaker(mock_upstream, monkeypatch):
+    monkeypatch.setattr(openrouter, "_retry_delay", lambda attempt, error: 0)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    mock_upstream(handler)
+
+    async def run():
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD + 2):
+            assert await openrouter.query_model(MODEL, MESSAGES, api_key="good") is None
+
+    asyncio.run(run())
+    assert openrouter.get_model_health(MODEL).state == "open"
+    # Once open, the breaker fails fast without calling upstream
+    assert len(calls) == CIRCUIT_FAILURE_THRESHOLD * (OPENROUTER_MAX_RETRIES + 1)
+
+
+def test_rate_limits_are_retried_but_do_not_open_breaker(mock_upstream, monkeypatch):
+    delays = []
+
+    def retry_delay(attempt, error):
+        delays.append(error.response.headers.get("Retry-After"))
+        return 0
+
+    monkeypatch.setattr(openrouter, "_retry_delay", retry_delay)
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if request.headers["Authorization"] == "Bearer limited":
+            return httpx.Response(429, headers={"Retry-After": "1"}, json={"error": "rate limited"})
+        return httpx.Response(200, json=COMPLETION)
+
+    mock_upstream(handler)
+
+    async def run():
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD + 2):
+            assert await openrouter.query_model(MODEL, MESSAGES, api_key="limited") is None
+        return await openrouter.query_model(MODEL, MESSAGES, api_key="good")
+
+    assert asyncio.run(run()) == {"content": "hello", "reasoning_details": None}
+    assert openrouter.get_model_health(MODEL).state == "closed"
+    # Every rate-limited call was retried, honouring Retry-After
+    assert len(calls) == (CIRCUIT_FAILURE_THRESHOLD + 2) * (OPENROUTER_MAX_RETRIES + 1) + 1
+    assert delays and set(delays) == {"1"}
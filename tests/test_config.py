@@ -0,0 +1,129 @@
+import json
+import os
+
+import pytest
+
+from backend import config
+from backend.config import ConfigFile
+
+
+def write_raw(path, text):
+    with open(path, "w") as f:
+        f.write(text)
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "settings.json")
+
+
+@pytest.fixture
+def reloads(path):
+    """A ConfigFile plus the configs its subscriber has seen (one per reload or write)."""
+    seen = []
+    config_file = ConfigFile(path, default=lambda: {"default": True})
+    config_file.subscribe(seen.append)
+    return config_file, seen
+
+
+def test_missing_file_serves_defaults(reloads):
+    config_file, seen = reloads
+    assert config_file.get() == {"default": True}
+    assert seen == [{"default": True}]
+
+
+def test_file_is_only_reparsed_when_it_changes(path, reloads):
+    config_file, seen = reloads
+    write_raw(path, '{"a": 1}')
+
+    for _ in range(5):
+        assert config_file.get() == {"a": 1}
+    assert len(seen) == 1
+
+    # Another process edits the file: a different size is picked up on the next read
+    write_raw(path, '{"a": 100}')
+    assert config_file.get() == {"a": 100}
+
+    # Same size, new mtime
+    write_raw(path, '{"a": 200}')
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert config_file.get() == {"a": 200}
+    assert seen == [{"a": 1}, {"a": 100}, {"a": 200}]
+
+
+def test_get_returns_a_copy(path, reloads):
+    config_file, _ = reloads
+    write_raw(path, '{"nested": {"a": 1}}')
+    config_file.get()["nested"]["a"] = 2
+    assert config_file.get() == {"nested": {"a": 1}}
+
+
+def test_write_replaces_the_file_atomically(path, reloads, tmp_path):
+    config_file, seen = reloads
+    config_file.write({"a": 1})
+
+    with open(path) as f:
+        assert json.load(f) == {"a": 1}
+    assert os.listdir(tmp_path) == ["settings.json"]
+    # Another reader sees the new contents; the writer doesn't re-parse its own write
+    assert ConfigFile(path).get() == {"a": 1}
+    assert config_file.get() == {"a": 1}
+    assert seen == [{"a": 1}]
+
+
+def test_failed_write_leaves_the_old_file_in_place(path, reloads, tmp_path, monkeypatch):
+    config_file, seen = reloads
+    config_file.write({"a": 1})
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(config.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        config_file.write({"a": 2})
+    monkeypatch.undo()
+
+    assert os.listdir(tmp_path) == ["settings.json"]
+    assert ConfigFile(path).get() == config_file.get() == {"a": 1}
+    assert seen == [{"a": 1}]
+
+
+def test_subscribers_are_isolated_from_each_other(path):
+    config_file = ConfigFile(path)
+    seen = []
+
+    def mutating(data):
+        data["a"] = "changed"
+
+    def failing(data):
+        raise RuntimeError("subscriber bug")
+
+    config_file.subscribe(mutating)
+    config_file.subscribe(failing)
+    config_file.subscribe(seen.append)
+    config_file.write({"a": 1})
+
+    assert seen == [{"a": 1}]
+    assert config_file.get() == {"a": 1}
+
+
+@pytest.mark.parametrize("breakage", ["invalid json", "directory"])
+def test_unreadable_file_keeps_the_last_good_config(path, reloads, breakage):
+    config_file, seen = reloads
+    write_raw(path, '{"a": 1}')
+    assert config_file.get() == {"a": 1}
+
+    os.remove(path)
+    if breakage == "directory":
+        os.mkdir(path)
+    else:
+        write_raw(path, '{"a": ')
+    assert config_file.get() == {"a": 1}
+
+    # Fixing the file is picked up again
+    if breakage == "directory":
+        os.rmdir(path)
+    write_raw(path, '{"a": 3}')
+    assert config_file.get() == {"a": 3}
+    assert {"default": True} not in seen
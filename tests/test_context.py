@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from backend import context
+from backend.context import SUMMARY_PREFIX, ContextCompactor, prefix_hashes
+
+
+def conversation(turns, chars=1000):
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"question {i} " + "q" * chars})
+        messages.append({"role": "assistant", "content": f"answer {i} " + "a" * chars})
+    return messages
+
+
+@pytest.fixture
+def summarizer(monkeypatch):
+    """Fake summary model: records each prompt and answers with a short summary."""
+    calls = []
+
+    async def fake_query_model(model, messages, api_key=None, **kwargs):
+        calls.append(messages[0]["content"])
+        await asyncio.sleep(0.01)
+        return {"content": f"summary {len(calls)}"}
+
+    monkeypatch.setattr(context, "query_model", fake_query_model)
+    return calls
+
+
+def compact(compactor, messages, **kwargs):
+    options = {"threshold_chars": 5000, "recent_messages": 4, "summary_max_chars": 500}
+    options.update(kwargs)
+    return compactor.compact(messages, "m/summary", "key", 20000, **options)
+
+
+def test_prefix_hashes_are_stable_as_the_conversation_grows():
+    messages = conversation(3)
+    assert prefix_hashes(messages + conversation(1))[:6] == prefix_hashes(messages)
+    assert prefix_hashes(messages, seed="other") != prefix_hashes(messages)
+
+
+def test_short_context_is_unchanged(summarizer):
+    messages = conversation(1)
+    compacted, info = asyncio.run(compact(ContextCompactor(), messages))
+    assert compacted is messages and info is None
+    assert summarizer == []
+
+
+def test_next_turn_reuses_the_cached_summary(summarizer):
+    compactor = ContextCompactor()
+    turn1 = conversation(5)
+    compacted, info = asyncio.run(compact(compactor, turn1))
+
+    assert compacted[0] == {"role": "system", "content": SUMMARY_PREFIX + "summary 1"}
+    assert compacted[1:] == turn1[-4:]
+    assert (info["summarized_messages"], info["reused_messages"]) == (6, 0)
+
+    # The same context again is a pure cache hit
+    asyncio.run(compact(compactor, turn1))
+    assert len(summarizer) == 1 and compactor.hits == 1
+
+    # One more turn only folds the two newly old messages into the summary
+    turn2 = turn1 + conversation(1)
+    compacted, info = asyncio.run(compact(compactor, turn2))
+    assert (info["summarized_messages"], info["reused_messages"]) == (8, 6)
+    assert len(summarizer) == 2
+    assert "summary 1" in summarizer[1]
+    assert "question 3" in summarizer[1] and "question 0" not in summarizer[1]
+    assert compacted[0]["content"] == SUMMARY_PREFIX + "summary 2"
+
+
+def test_concurrent_requests_share_one_summary_call(summarizer):
+    compactor = ContextCompactor()
+    messages = conversation(5)
+
+    async def both():
+        return await asyncio.gather(compact(compactor, messages), compact(compactor, messages))
+
+    (first, _), (second, _) = asyncio.run(both())
+    assert len(summarizer) == 1
+    assert first == second
+
+
+def test_failed_summary_drops_oldest_messages_to_fit(monkeypatch):
+    async def failing_query_model(model, messages, api_key=None, **kwargs):
+        return None
+
+    monkeypatch.setattr(context, "query_model", failing_query_model)
+    compactor = ContextCompactor()
+    messages = conversation(5)
+
+    compacted, info = asyncio.run(compactor.compact(
+        messages, "m/summary", "key", 4500, threshold_chars=3000, recent_messages=4, summary_max_chars=500,
+    ))
+
+    assert compacted == messages[-4:]
+    assert info["summarized_messages"] == 0
+    assert info["dropped_messages"] == 6
+    assert info["compacted_chars"] <= 4500
+    # Nothing was cached, so the next turn tries again
+    assert compactor._summaries == {}
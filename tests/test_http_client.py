@@ -0,0 +1,78 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend import openrouter
+from backend.openrouter import HTTPClientManager
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Minimal OpenRouter chat completions stub with keep-alive."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.connections.add(self.client_address)
+        self.server.requests += 1
+        body = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.connections = set()
+    server.requests = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_connections_are_reused_across_stages(stub_server, monkeypatch):
+    url = f"http://127.0.0.1:{stub_server.server_address[1]}/api/v1/chat/completions"
+    monkeypatch.setattr(openrouter, "OPENROUTER_API_URL", url)
+    monkeypatch.setattr(openrouter, "_model_health", {})
+    manager = HTTPClientManager(max_connections=4, max_connections_per_host=4)
+    monkeypatch.setattr(openrouter, "client_manager", manager)
+
+    models = [f"model/{i}" for i in range(4)]
+    messages = [{"role": "user", "content": "hi"}]
+
+    async def council():
+        try:
+            # Stage 1 and stage 2 fan out to every model, stage 3 asks the chairman
+            for stage in ("stage1", "stage2"):
+                results = await asyncio.gather(*[
+                    openrouter.query_model(model, messages + [{"role": "user", "content": stage}], api_key="key")
+                    for model in models
+                ])
+                assert all(r["content"] == "ok" for r in results)
+            assert (await openrouter.query_model(models[0], messages, api_key="key"))["content"] == "ok"
+        finally:
+            await manager.aclose()
+
+    asyncio.run(council())
+
+    assert stub_server.requests == 9
+    # Every request after the first fan-out rode an existing keep-alive connection
+    assert len(stub_server.connections) <= 4
+
+
+def test_http2_enabled_when_h2_is_installed():
+    pytest.importorskip("h2")
+    manager = HTTPClientManager(http2=True)
+    assert manager.http2
+    assert HTTPClientManager(http2=False).http2 is False
@@ -0,0 +1,82 @@
+"""
+Cold-start import benchmark for serverless deployments (python -X importtime).
+
+Run directly for a report (median of several cold interpreters):
+
+    python tests/test_import_time.py
+
+As a test it enforces the regression budget: modules that must stay out of a
+cold `import backend.main`, and time budgets for the backend's own modules and
+the whole import (overridable with IMPORT_BUDGET_BACKEND_MS / IMPORT_BUDGET_TOTAL_MS).
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use only (storage/search by the lifespan, sqlite3 by the
+# response cache's disk tier, asyncpg by the postgres engine)
+DEFERRED_MODULES = {
+    "sqlite3",
+    "asyncpg",
+    "backend.storage",
+    "backend.search",
+    "backend.blobs",
+    "backend.storage_postgres",
+}
+
+BACKEND_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_BACKEND_MS", "250"))
+TOTAL_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_TOTAL_MS", "2000"))
+RUNS = 5
+
+
+def measure(module: str = "backend.main") -> dict:
+    """Import `module` in a fresh interpreter; return {name: (self_us, cumulative_us)}."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    timings = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        timings[name.strip()] = (int(self_us), int(cumulative_us))
+    return timings
+
+
+def summarize(timings: dict) -> tuple:
+    backend_ms = sum(s for name, (s, _) in timings.items() if name.split(".")[0] == "backend") / 1000
+    total_ms = timings["backend.main"][1] / 1000
+    return backend_ms, total_ms
+
+
+def test_cold_import_defers_heavy_modules():
+    loaded = set(measure())
+    assert not DEFERRED_MODULES & loaded
+
+
+def test_cold_import_within_budget():
+    runs = [summarize(measure()) for _ in range(RUNS)]
+    backend_ms = statistics.median(r[0] for r in runs)
+    total_ms = statistics.median(r[1] for r in runs)
+    assert backend_ms <= BACKEND_BUDGET_MS, f"backend modules took {backend_ms:.1f} ms"
+    assert total_ms <= TOTAL_BUDGET_MS, f"import backend.main took {total_ms:.1f} ms"
+
+
+if __name__ == "__main__":
+    runs = [measure() for _ in range(RUNS)]
+    summaries = [summarize(t) for t in runs]
+    print(f"import backend.main, median of {RUNS} cold runs:")
+    print(f"  total    {statistics.median(s[1] for s in summaries):8.1f} ms (budget {TOTAL_BUDGET_MS:.0f})")
+    print(f"  backend  {statistics.median(s[0] for s in summaries):8.1f} ms (budget {BACKEND_BUDGET_MS:.0f})")
+    print("  slowest modules (cumulative):")
+    last = runs[-1]
+    for name, (_, cumulative) in sorted(last.items(), key=lambda item: -item[1][1])[:10]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from backend import main
+from backend.openrouter import ModelCatalogCache
+
+MODELS_V1 = {"data": [{"id": "a/x", "name": "X"}]}
+MODELS_V2 = {"data": [{"id": "a/x", "name": "X"}, {"id": "b/y", "name": "Y"}]}
+
+
+class Upstream:
+    """Fake OpenRouter /models endpoint that answers conditionally on its ETag."""
+
+    def __init__(self, payload=MODELS_V1, etag='"v1"'):
+        self.payload = payload
+        self.etag = etag
+        self.requests = []
+        self.fail = False
+
+    async def __call__(self, request):
+        if request.method != "GET":
+            return httpx.Response(200)  # connection pre-warming
+        self.requests.append(request)
+        await asyncio.sleep(0.01)
+        if self.fail:
+            return httpx.Response(502)
+        if request.headers.get("If-None-Match") == self.etag:
+            return httpx.Response(304, headers={"ETag": self.etag})
+        return httpx.Response(200, json=self.payload, headers={"ETag": self.etag})
+
+
+@pytest.fixture
+def upstream(mock_upstream):
+    fake = Upstream()
+    mock_upstream(fake)
+    return fake
+
+
+def expire(cache, seconds):
+    cache.peek().fetched_at = time.monotonic() - seconds
+
+
+def test_fresh_catalog_is_served_without_upstream_call(upstream):
+    cache = ModelCatalogCache(ttl=60, stale_ttl=60)
+
+    async def run():
+        first = await cache.get("key")
+        second = await cache.get("key")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second
+    assert [m["id"] for m in first.models] == ["a/x"]
+    assert len(upstream.requests) == 1
+
+
+def test_concurrent_misses_share_one_fetch(upstream):
+    cache = ModelCatalogCache(ttl=60, stale_ttl=60)
+
+    async def run():
+        return await asyncio.gather(*(cache.get("key") for _ in range(10)))
+
+    catalogs = asyncio.run(run())
+    assert len(upstream.requests) == 1
+    assert all(catalog is catalogs[0] for catalog in catalogs)
+
+
+def test_not_modified_keeps_the_snapshot(upstream):
+    cache = ModelCatalogCache(ttl=60, stale_ttl=0)
+
+    async def run():
+        first = await cache.get("key")
+        expire(cache, 120)
+        return first, await cache.get("key")
+
+    first, second = asyncio.run(run())
+    assert second is first
+    assert upstream.requests[1].headers["If-None-Match"] == '"v1"'
+    assert time.monotonic() - second.fetched_at < 60
+
+
+def test_stale_catalog_is_served_while_revalidating(upstream):
+    cache = ModelCatalogCache(ttl=60, stale_ttl=600)
+
+    async def run():
+        first = await cache.get("key")
+        expire(cache, 120)
+        upstream.payload, upstream.etag = MODELS_V2, '"v2"'
+        stale = await cache.get("key")
+        await cache._refresh
+        return first, stale, await cache.get("key")
+
+    first, stale, refreshed = asyncio.run(run())
+    assert stale is first
+    assert [m["id"] for m in refreshed.models] == ["a/x", "b/y"]
+    assert len(upstream.requests) == 2
+
+
+def test_failed_refresh_serves_last_good_snapshot(upstream):
+    cache = ModelCatalogCache(ttl=60, stale_ttl=0)
+
+    async def run():
+        first = await cache.get("key")
+        expire(cache, 120)
+        upstream.fail = True
+        return first, await cache.get("key")
+
+    first, after_failure = asyncio.run(run())
+    assert after_failure is first
+    assert len(upstream.requests) == 2
+
+
+def test_models_endpoint_answers_if_none_match_with_304(upstream, monkeypatch):
+    monkeypatch.setattr(main, "model_catalog", ModelCatalogCache(ttl=60, stale_ttl=60))
+    headers = {"X-OpenRouter-Api-Key": "key"}
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            full = await client.get("/api/models", headers=headers)
+            again = await client.get("/api/models", headers={**headers, "If-None-Match": full.headers["ETag"]})
+            changed = await client.get("/api/models", headers={**headers, "If-None-Match": '"other"'})
+        return full, again, changed
+
+    full, again, changed = asyncio.run(run())
+    assert full.status_code == 200 and [m["id"] for m in full.json()] == ["a/x"]
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["ETag"] == full.headers["ETag"]
+    assert changed.status_code == 200
+    assert len(upstream.requests) == 1
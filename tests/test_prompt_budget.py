@@ -0,0 +1,38 @@
+from backend import prompt_budget
+from backend.openrouter import ModelCatalog, model_catalog
+from backend.prompt_budget import estimate_tokens, fit_sections
+
+
+def with_catalog(monkeypatch, models):
+    catalog = ModelCatalog(models, etag=None, last_modified=None)
+    monkeypatch.setattr(model_catalog, "peek", lambda: catalog)
+
+
+def test_no_budget_when_context_length_unknown(monkeypatch):
+    monkeypatch.setattr(model_catalog, "peek", lambda: None)
+    monkeypatch.setattr(prompt_budget, "PROMPT_MAX_TOKENS", 0)
+    assert prompt_budget.prompt_budget(["a/model"], "template") is None
+
+    answers = {f"Response {c}": "word " * 11000 for c in "ABCD"}
+    fitted, trimmed = fit_sections(answers, prompt_budget.prompt_budget(["a/model"]))
+    assert fitted == answers and trimmed == []
+
+
+def test_budget_uses_smallest_known_context(monkeypatch):
+    with_catalog(monkeypatch, [
+        {"id": "small", "context_length": 16000},
+        {"id": "large", "context_length": 1000000},
+    ])
+    monkeypatch.setattr(prompt_budget, "PROMPT_MAX_TOKENS", 0)
+    reserve = prompt_budget.PROMPT_OUTPUT_RESERVE
+    assert prompt_budget.prompt_budget(["small", "large", "unknown"]) == 16000 - reserve
+    assert prompt_budget.prompt_budget(["large", "unknown"]) == 1000000 - reserve
+
+
+def test_fit_sections_only_trims_the_longest():
+    sections = {"short": "word " * 100, "long": "word " * 5000}
+    fitted, trimmed = fit_sections(sections, 1000)
+
+    assert fitted["short"] == sections["short"]
+    assert [t["section"] for t in trimmed] == ["long"]
+    assert estimate_tokens(fitted["long"]) <= 1000
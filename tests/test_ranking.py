@@ -0,0 +1,57 @@
+from collections import Counter
+
+from backend.ranking import aggregate_rankings, assign_reviews, response_labels
+
+
+def labels(n):
+    return [f"Response {label}" for label in response_labels(n)]
+
+
+def test_sparse_reviews_skip_own_response_and_stay_balanced():
+    all_labels = labels(8)
+    assignments = assign_reviews(all_labels, 8, 3, all_labels)
+
+    for own, window in zip(all_labels, assignments):
+        assert len(window) == 3
+        assert own not in window
+    assert set(Counter(label for window in assignments for label in window).values()) == {3}
+
+
+def test_sparse_reviews_cover_every_response():
+    all_labels = labels(10)
+    # Two judges without a stage 1 response of their own
+    assignments = assign_reviews(all_labels, 12, 2, all_labels + [None, None])
+    assert {label for window in assignments for label in window} == set(all_labels)
+
+
+def test_full_reviews_unchanged():
+    all_labels = labels(4)
+    assert assign_reviews(all_labels, 4, 0, all_labels) == [all_labels] * 4
+
+
+def test_schulze_recovers_order_from_sparse_ballots():
+    all_labels = labels(8)
+    label_to_model = {label: f"m{i}" for i, label in enumerate(all_labels)}
+    assignments = assign_reviews(all_labels, 8, 3, all_labels)
+    # Later labels are better
+    ballots = [sorted(window, key=all_labels.index, reverse=True) for window in assignments]
+
+    result = aggregate_rankings(ballots, label_to_model, "schulze", reviewed=assignments)
+    assert [entry["model"] for entry in result] == [f"m{i}" for i in reversed(range(8))]
+
+
+def test_invalid_ranking_method_fails_at_startup():
+    import os
+    import subprocess
+    import sys
+
+    env = {**os.environ, "RANKING_METHOD": "bogus"}
+    result = subprocess.run(
+        [sys.executable, "-c", "import backend.config"],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode != 0
+    assert "Unknown RANKING_METHOD 'bogus'" in result.stderr
@@ -0,0 +1,67 @@
+"""
+Micro-benchmark for stage 2 ranking parsing and aggregation on large councils.
+
+Run directly for a report:
+
+    python -m tests.test_ranking_benchmark [responses] [critique_words]
+
+As a test it checks that a 40-response council with long critiques parses and
+aggregates with every method well within a generous time budget.
+"""
+
+import random
+import sys
+import time
+
+from backend.ranking import AGGREGATION_METHODS, aggregate_rankings, parse_ranking, response_labels
+
+WORDS = "the response explains accuracy depth clarity misses detail covers example".split()
+
+
+def make_critique(labels, critique_words, rng):
+    """A long free-form critique mentioning every label, ending in a FINAL RANKING list."""
+    paragraphs = [
+        f"{label} " + " ".join(rng.choice(WORDS) for _ in range(critique_words // len(labels)))
+        for label in labels
+    ]
+    ranking = rng.sample(labels, len(labels))
+    # Duplicates and a few omissions, as real judges produce
+    ranking = ranking[: len(ranking) - 2] + ranking[:1]
+    final = "\n".join(f"{i}. {label}" for i, label in enumerate(ranking, start=1))
+    return "\n\n".join(paragraphs) + "\n\nFINAL RANKING:\n" + final
+
+
+def run(responses=40, critique_words=4000, seed=0):
+    rng = random.Random(seed)
+    labels = [f"Response {label}" for label in response_labels(responses)]
+    label_to_model = {label: f"model/{i}" for i, label in enumerate(labels)}
+    critiques = [make_critique(labels, critique_words, rng) for _ in range(responses)]
+
+    timings = {}
+    started = time.perf_counter()
+    ballots = [parse_ranking(text, labels) for text in critiques]
+    timings["parse"] = time.perf_counter() - started
+
+    for method in AGGREGATION_METHODS:
+        started = time.perf_counter()
+        result = aggregate_rankings(ballots, label_to_model, method)
+        timings[method] = time.perf_counter() - started
+        assert len(result) == responses
+    return ballots, timings
+
+
+def test_large_council_within_budget():
+    ballots, timings = run()
+    assert all(len(ballot) == 38 for ballot in ballots)
+    assert timings["parse"] < 0.5, timings
+    for method in AGGREGATION_METHODS:
+        assert timings[method] < 0.5, (method, timings)
+
+
+if __name__ == "__main__":
+    responses = int(sys.argv[1]) if len(sys.argv) > 1 else 40
+    critique_words = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    _, timings = run(responses, critique_words)
+    print(f"{responses} responses x {responses} critiques of ~{critique_words} words:")
+    for name, seconds in timings.items():
+        print(f"  {name:9s} {seconds * 1000:8.2f} ms")
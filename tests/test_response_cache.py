@@ -0,0 +1,159 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend import cache, openrouter
+from backend.cache import ResponseCache, cache_key
+
+MODEL = "test/model"
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class Clock:
+    """Stands in for the time module inside backend.cache."""
+
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(cache, "time", fake)
+    return fake
+
+
+def response(i, chars=90):
+    return {"content": f"{i:04d}" + "x" * chars}
+
+
+def test_cache_key_ignores_stream_flag():
+    payload = {"model": MODEL, "messages": MESSAGES, "temperature": 0}
+    assert cache_key({**payload, "stream": True}) == cache_key(payload)
+    assert cache_key(dict(reversed(list(payload.items())))) == cache_key(payload)
+    assert cache_key({**payload, "temperature": 1}) != cache_key(payload)
+
+
+def test_memory_tier_evicts_least_recently_used_by_count(tmp_path):
+    store = ResponseCache(str(tmp_path), ttl=60, max_items=2)
+
+    async def run():
+        await store.put("a", response(1))
+        await store.put("b", response(2))
+        await store.get("a")
+        await store.put("c", response(3))
+
+    asyncio.run(run())
+    assert list(store._memory) == ["a", "c"]
+    assert store.stats()["memory_hits"] == 1
+
+
+def test_memory_tier_evicts_by_bytes(tmp_path):
+    size = len(json.dumps(response(0)))
+    store = ResponseCache(str(tmp_path), ttl=60, max_memory_bytes=size * 3)
+
+    async def run():
+        for i in range(5):
+            await store.put(f"k{i}", response(i))
+        # Larger than the whole memory budget: kept on disk only
+        await store.put("huge", response(9, chars=size * 4))
+        return await store.get("k0"), await store.get("huge")
+
+    evicted, huge = asyncio.run(run())
+    assert list(store._memory) == ["k3", "k4", "k0"]
+    assert store._memory_bytes == size * 3
+    assert evicted == response(0) and huge == response(9, chars=size * 4)
+    assert store.stats()["disk_hits"] == 2
+
+
+def test_disk_hit_after_restart_is_promoted_to_memory(tmp_path):
+    async def run():
+        first = ResponseCache(str(tmp_path), ttl=60)
+        await first.put("k", response(1))
+        first.close()
+
+        second = ResponseCache(str(tmp_path), ttl=60)
+        return second, await second.get("k"), await second.get("k")
+
+    second, from_disk, from_memory = asyncio.run(run())
+    assert from_disk == from_memory == response(1)
+    assert (second.disk_hits, second.memory_hits) == (1, 1)
+
+
+def test_entries_expire_after_ttl_in_both_tiers(tmp_path, clock):
+    store = ResponseCache(str(tmp_path), ttl=60)
+
+    async def run():
+        await store.put("k", response(1))
+        clock.now += 30
+        fresh = await store.get("k")
+        clock.now += 31
+        # Memory and disk have both expired; the disk row is deleted on read
+        return fresh, await store.get("k")
+
+    fresh, expired = asyncio.run(run())
+    assert fresh == response(1) and expired is None
+    assert "k" not in store._memory
+    assert store._connect().execute("SELECT COUNT(*) FROM responses").fetchone()[0] == 0
+    assert store.stats()["misses"] == 1
+
+
+def test_disk_tier_is_trimmed_to_budget_least_recently_used_first(tmp_path, clock):
+    size = len(json.dumps(response(0)))
+    # max_items=0 keeps the memory tier empty so every read touches the disk
+    store = ResponseCache(str(tmp_path), ttl=3600, max_items=0, max_disk_bytes=size * 10)
+
+    async def run():
+        store.ttl = 1
+        await store.put("expired", response(0))
+        store.ttl = 3600
+        for i in range(98):
+            clock.now += 1
+            await store.put(f"k{i}", response(i))
+        clock.now += 1
+        touched = await store.get("k0")
+        clock.now += 1
+        # The 100th write triggers the trim
+        await store.put("k98", response(98))
+        return touched
+
+    assert asyncio.run(run()) == response(0)
+    rows = store._connect().execute("SELECT key, size FROM responses").fetchall()
+    assert sum(size for _, size in rows) <= store.max_disk_bytes
+    assert {key for key, _ in rows} == {"k0"} | {f"k{i}" for i in range(90, 99)}
+
+
+def test_streamed_call_replays_cached_response(mock_upstream, tmp_path, monkeypatch):
+    monkeypatch.setattr(openrouter, "response_cache", ResponseCache(str(tmp_path), ttl=60))
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        body = (
+            f"data: {json.dumps({'choices': [{'delta': {'content': 'Hello, '}}]})}\n\n"
+            f"data: {json.dumps({'choices': [{'delta': {'content': 'world'}}]})}\n\n"
+            "data: [DONE]\n\n"
+        )
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, content=body.encode())
+
+    mock_upstream(handler)
+
+    async def run():
+        first_deltas, replayed_deltas = [], []
+        first = await openrouter.query_model_stream(MODEL, MESSAGES, api_key="key", on_delta=first_deltas.append)
+        replayed = await openrouter.query_model_stream(MODEL, MESSAGES, api_key="key", on_delta=replayed_deltas.append)
+        # Streamed and non-streamed calls share entries
+        plain = await openrouter.query_model(MODEL, MESSAGES, api_key="key")
+        return first, first_deltas, replayed, replayed_deltas, plain
+
+    first, first_deltas, replayed, replayed_deltas, plain = asyncio.run(run())
+    assert first_deltas == ["Hello, ", "world"]
+    assert replayed_deltas == ["Hello, world"]
+    assert replayed == first == plain
+    assert first["content"] == "Hello, world"
+    assert len(requests) == 1 and requests[0]["stream"] is True
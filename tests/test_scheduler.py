@@ -0,0 +1,189 @@
+import asyncio
+
+import httpx
+import pytest
+
+from backend import main
+from backend.scheduler import CouncilScheduler, QueueFullError, UpstreamLimiter
+
+BODY = {
+    "content": "What is 2+2?",
+    "model_config": {"council_models": ["a/x", "b/y"], "chairman_model": "a/x"},
+}
+
+
+async def events(*items, delay=0.0):
+    for item in items:
+        await asyncio.sleep(delay)
+        yield item
+
+
+async def collect(scheduler, ticket, source):
+    return [event async for event in scheduler.run(ticket, source)]
+
+
+def test_slots_are_handed_out_round_robin_across_keys():
+    scheduler = CouncilScheduler(max_active=1, max_queued=10, max_queued_per_tenant=10)
+    running = scheduler.enqueue("key-a")
+    waiting = [(key, scheduler.enqueue(key)) for key in ["key-a", "key-a", "key-a", "key-b", "key-b", "key-c"]]
+
+    expected = ["key-a", "key-b", "key-c", "key-a", "key-b", "key-a"]
+    by_position = sorted(waiting, key=lambda item: scheduler.position(item[1]))
+    assert [key for key, _ in by_position] == expected
+
+    admitted = []
+    while waiting:
+        scheduler.release(running)
+        [(key, running)] = [item for item in waiting if item[1].admitted]
+        waiting.remove((key, running))
+        admitted.append(key)
+        assert scheduler.active == 1
+
+    assert admitted == expected
+    scheduler.release(running)
+    assert scheduler.stats() == {"active": 0, "queued": 0, "tenants_waiting": 0}
+
+
+def test_queue_bounds_are_enforced_globally_and_per_key():
+    scheduler = CouncilScheduler(max_active=1, max_queued=3, max_queued_per_tenant=2)
+    scheduler.enqueue("key-a")
+    scheduler.enqueue("key-a")
+    scheduler.enqueue("key-a")
+
+    with pytest.raises(QueueFullError, match="this API key"):
+        scheduler.enqueue("key-a")
+
+    scheduler.enqueue("key-b")
+    with pytest.raises(QueueFullError, match="queue is full") as excinfo:
+        scheduler.enqueue("key-c")
+    assert excinfo.value.retry_after >= 1
+    assert scheduler.stats() == {"active": 1, "queued": 3, "tenants_waiting": 2}
+
+
+def test_retry_after_grows_with_queue_length_and_run_time():
+    scheduler = CouncilScheduler(max_active=2, max_queued=10, max_queued_per_tenant=10)
+    assert scheduler.retry_after() == 15  # 30 s default, half a wave
+
+    scheduler._durations.extend([10.0, 20.0])
+    tickets = [scheduler.enqueue(f"key-{i}") for i in range(5)]
+    # Two running, three queued: (3 + 1) waves of 15 s spread over two slots
+    assert scheduler.retry_after() == 30
+
+    for ticket in tickets:
+        scheduler.release(ticket)
+    assert scheduler.stats()["active"] == 0
+
+
+def test_full_queue_answers_503_with_retry_after(monkeypatch):
+    scheduler = CouncilScheduler(max_active=1, max_queued=0, max_queued_per_tenant=1)
+    scheduler.enqueue("someone-else")
+    monkeypatch.setattr(main, "council_scheduler", scheduler)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/api/council/stream", json=BODY, headers={"X-OpenRouter-Api-Key": "key"})
+
+    response = asyncio.run(run())
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(scheduler.retry_after())
+    assert response.json()["detail"] == "Council queue is full"
+
+
+def test_waiting_run_reports_its_position_until_admitted():
+    scheduler = CouncilScheduler(max_active=1, max_queued=10, max_queued_per_tenant=10)
+
+    async def run():
+        first = scheduler.enqueue("key-a")
+        second = scheduler.enqueue("key-b")
+        third = scheduler.enqueue("key-c")
+        return await asyncio.gather(
+            collect(scheduler, first, events({"type": "first"}, delay=0.01)),
+            collect(scheduler, second, events({"type": "second"}, delay=0.01)),
+            collect(scheduler, third, events({"type": "third"}, delay=0.01)),
+        )
+
+    first, second, third = asyncio.run(run())
+    assert first == [{"type": "first"}]
+    assert second == [{"type": "queued", "position": 1}, {"type": "second"}]
+    assert third == [
+        {"type": "queued", "position": 2},
+        {"type": "queued", "position": 1},
+        {"type": "third"},
+    ]
+    assert scheduler.stats() == {"active": 0, "queued": 0, "tenants_waiting": 0}
+
+
+def test_cancelled_runs_release_their_slot_or_queue_place():
+    scheduler = CouncilScheduler(max_active=1, max_queued=10, max_queued_per_tenant=10)
+
+    async def run():
+        running = scheduler.enqueue("key-a")
+        cancelled_waiter = scheduler.enqueue("key-b")
+        next_up = scheduler.enqueue("key-c")
+
+        running_task = asyncio.create_task(collect(scheduler, running, events({"type": "slow"}, delay=10)))
+        waiter_task = asyncio.create_task(collect(scheduler, cancelled_waiter, events({"type": "never"})))
+        next_task = asyncio.create_task(collect(scheduler, next_up, events({"type": "next"})))
+        await asyncio.sleep(0.01)
+        assert scheduler.position(next_up) == 2
+
+        waiter_task.cancel()
+        await asyncio.sleep(0.01)
+        # The cancelled waiter gave up its place without taking a slot
+        assert scheduler.position(next_up) == 1
+        assert scheduler.stats() == {"active": 1, "queued": 1, "tenants_waiting": 1}
+
+        running_task.cancel()
+        result = await next_task
+        for task in (running_task, waiter_task):
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        return result, running, cancelled_waiter
+
+    result, running, cancelled_waiter = asyncio.run(run())
+    assert result == [{"type": "queued", "position": 2}, {"type": "queued", "position": 1}, {"type": "next"}]
+    assert running.released and cancelled_waiter.released and not cancelled_waiter.admitted
+    assert scheduler.stats() == {"active": 0, "queued": 0, "tenants_waiting": 0}
+
+    # Releasing again (e.g. from the run task's done callback) changes nothing
+    scheduler.release(running)
+    assert scheduler.active == 0
+
+
+def test_upstream_limiter_caps_calls_per_model_and_in_total():
+    limiter = UpstreamLimiter(max_total=3, max_per_model=2)
+    active = {"total": 0}
+    peaks = {"total": 0}
+
+    async def call(model):
+        async with limiter.slot(model):
+            active["total"] += 1
+            active[model] = active.get(model, 0) + 1
+            peaks["total"] = max(peaks["total"], active["total"])
+            peaks[model] = max(peaks.get(model, 0), active[model])
+            await asyncio.sleep(0.01)
+            active["total"] -= 1
+            active[model] -= 1
+
+    async def run():
+        await asyncio.gather(*(call(model) for model in ["a/x"] * 6 + ["b/y"] * 6 + ["c/z"] * 2))
+
+    asyncio.run(run())
+    assert peaks == {"total": 3, "a/x": 2, "b/y": 2, "c/z": 2}
+
+
+def test_upstream_limiter_frees_slots_on_error():
+    limiter = UpstreamLimiter(max_total=1, max_per_model=1)
+
+    async def failing():
+        async with limiter.slot("a/x"):
+            raise RuntimeError("upstream exploded")
+
+    async def run():
+        with pytest.raises(RuntimeError):
+            await failing()
+        async with limiter.slot("a/x"):
+            return True
+
+    assert asyncio.run(asyncio.wait_for(run(), timeout=1))
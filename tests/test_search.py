@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+
+from backend import storage
+from backend.search import SearchIndex, build_match_query, rebuild_search_index
+from backend.storage import JSONFileStorage, assistant_message, user_message
+
+OWNER = "owner-fingerprint"
+
+
+@pytest.fixture
+def index(tmp_path):
+    return SearchIndex(str(tmp_path / "search.sqlite3"))
+
+
+def conversation_ids(results):
+    return [r["conversation_id"] for r in results]
+
+
+def test_ranks_denser_matches_first(index):
+    index.index_user_message("once", "A long question about databases and many other unrelated topics", OWNER)
+    index.index_user_message("twice", "databases databases", OWNER)
+
+    results = index.search("databases", OWNER)
+
+    assert conversation_ids(results) == ["twice", "once"]
+    assert results[0]["score"] > results[1]["score"]
+
+
+def test_snippet_marks_matches(index):
+    index.index_user_message("abc", "How do I tune Postgres autovacuum?", OWNER)
+
+    [result] = index.search("autovacuum", OWNER)
+
+    assert "**autovacuum**" in result["snippet"]
+    assert result["kind"] == "user"
+
+
+def test_model_filter(index):
+    index.index_assistant_message(
+        "abc",
+        [{"model": "a/one", "response": "Use an index"}, {"model": "b/two", "response": "Use an index too"}],
+        {"model": "c/chair", "response": "Everyone says use an index"},
+        OWNER,
+    )
+
+    assert conversation_ids(index.search("index", OWNER)) == ["abc"] * 3
+    [result] = index.search("index", OWNER, model="b/two")
+    assert (result["kind"], result["model"]) == ("stage1", "b/two")
+
+
+def test_other_owners_and_unowned_entries_are_invisible(index):
+    index.index_user_message("mine", "shared words", OWNER)
+    index.index_user_message("theirs", "shared words", "someone-else")
+    index.index_user_message("unowned", "shared words")
+
+    assert conversation_ids(index.search("shared", OWNER)) == ["mine"]
+
+
+@pytest.mark.parametrize("query", ['"unbalanced', "NEAR(a b)", "col:value", "a* OR -b", "x AND (y", "^start"])
+def test_query_sanitizer_neutralizes_fts_syntax(index, query):
+    index.index_user_message("abc", "start value near unbalanced words", OWNER)
+
+    # Never an FTS5 syntax error, whatever the user typed
+    index.search(query, OWNER)
+
+
+def test_build_match_query():
+    assert build_match_query('say "hi" to NEAR') == '"say" "hi" "to" "NEAR"*'
+    assert build_match_query("***") is None
+
+
+def test_last_term_matches_as_prefix(index):
+    index.index_user_message("abc", "Kubernetes deployment", OWNER)
+
+    assert conversation_ids(index.search("deployment kube", OWNER)) == ["abc"]
+    assert index.search("kube deployment", OWNER) == []
+
+
+def test_adds_owner_column_to_an_old_index(tmp_path):
+    path = str(tmp_path / "search.sqlite3")
+    db = sqlite3.connect(path)
+    db.executescript(
+        "CREATE TABLE entries (id INTEGER PRIMARY KEY, conversation_id TEXT NOT NULL, "
+        "kind TEXT NOT NULL, model TEXT, created_at TEXT NOT NULL);"
+        "CREATE VIRTUAL TABLE entries_fts USING fts5(body, tokenize = 'porter unicode61');"
+    )
+    db.close()
+
+    index = SearchIndex(path)
+    index.index_user_message("abc", "migrated", OWNER)
+    assert conversation_ids(index.search("migrated", OWNER)) == ["abc"]
+
+
+def test_rebuild_reindexes_stored_conversations_keeping_owners(index, tmp_path, monkeypatch):
+    backend = JSONFileStorage(str(tmp_path / "conversations"))
+    backend.create_conversation("abc")
+    backend.add_message("abc", user_message("original question"))
+    backend.add_message("abc", assistant_message(
+        [{"model": "a/one", "response": "first answer"}], [], {"model": "c/chair", "response": "final answer"},
+    ))
+    backend.create_conversation("never-indexed")
+    backend.add_message("never-indexed", user_message("original text"))
+    monkeypatch.setattr(storage, "_storage", backend)
+    # Stale entries are replaced, not duplicated
+    index.index_user_message("abc", "original question", OWNER)
+    index.index_user_message("abc", "removed since", OWNER)
+
+    assert rebuild_search_index(index) == 2
+
+    assert conversation_ids(index.search("original", OWNER)) == ["abc"]
+    assert index.search("removed", OWNER) == []
+    assert {r["kind"] for r in index.search("answer", OWNER)} == {"stage1", "stage3"}
+    assert index.conversation_owner("never-indexed") is None
@@ -0,0 +1,101 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend import council
+from backend.openrouter import ModelCatalog, model_catalog
+
+MODELS = ["a/x", "b/y", "c/z"]
+STAGE1 = [{"model": model, "response": f"answer from {model}"} for model in MODELS]
+TEXT_RANKING = "Fine.\n\nFINAL RANKING:\n1. Response B\n2. Response A\n3. Response C"
+
+
+def test_failed_json_ranking_falls_back_to_text(mock_upstream, monkeypatch):
+    catalog = ModelCatalog(
+        [{"id": model, "supported_parameters": ["structured_outputs"]} for model in MODELS],
+        etag=None,
+        last_modified=None,
+    )
+    monkeypatch.setattr(model_catalog, "peek", lambda: catalog)
+
+    def handler(request):
+        body = json.loads(request.content)
+        if "response_format" in body and body["model"] == "a/x":
+            return httpx.Response(400, json={"error": "response_format not supported"})
+        if "response_format" in body:
+            ranking = {"ranking": ["Response B", "Response A", "Response C"], "notes": []}
+            return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(ranking)}}]})
+        return httpx.Response(200, json={"choices": [{"message": {"content": TEXT_RANKING}}]})
+
+    mock_upstream(handler)
+
+    results, _ = asyncio.run(council.stage2_collect_rankings(
+        "q", STAGE1, council_models=MODELS, api_key="key", ranking_mode="json",
+    ))
+
+    assert [r["model"] for r in results] == MODELS
+    assert results[0]["ranking"] == TEXT_RANKING
+    assert all(r["parsed_ranking"] == ["Response B", "Response A", "Response C"] for r in results)
+
+
+def install_catalog(monkeypatch, supported_parameters):
+    catalog = ModelCatalog(
+        [{"id": model, "supported_parameters": supported_parameters} for model in MODELS],
+        etag=None,
+        last_modified=None,
+    )
+    monkeypatch.setattr(model_catalog, "peek", lambda: catalog)
+
+
+@pytest.mark.parametrize("reply", [
+    "",
+    '{"ranking": ["Response B", "Resp',
+    "I would rank Response B first, then the others.",
+    '{"ranking": []}',
+])
+def test_unusable_json_reply_falls_back_to_text(mock_upstream, monkeypatch, reply):
+    install_catalog(monkeypatch, ["structured_outputs"])
+    json_requests = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        if "response_format" in body:
+            json_requests.append(body["model"])
+            return httpx.Response(200, json={"choices": [{"message": {"content": reply}}]})
+        return httpx.Response(200, json={"choices": [{"message": {"content": TEXT_RANKING}}]})
+
+    mock_upstream(handler)
+
+    results, _ = asyncio.run(council.stage2_collect_rankings(
+        "q", STAGE1, council_models=MODELS, api_key="key", ranking_mode="json",
+    ))
+
+    assert sorted(json_requests) == MODELS
+    assert all(r["ranking"] == TEXT_RANKING for r in results)
+    assert all(r["parsed_ranking"] == ["Response B", "Response A", "Response C"] for r in results)
+
+
+@pytest.mark.parametrize("supported_parameters, capped", [
+    (["structured_outputs"], True),
+    (["structured_outputs", "reasoning"], False),
+])
+def test_max_tokens_only_caps_models_that_dont_reason(mock_upstream, monkeypatch, supported_parameters, capped):
+    install_catalog(monkeypatch, supported_parameters)
+    bodies = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        bodies.append(body)
+        ranking = {"ranking": ["Response B", "Response A", "Response C"], "notes": []}
+        return httpx.Response(200, json={"choices": [{"message": {"content": json.dumps(ranking)}}]})
+
+    mock_upstream(handler)
+
+    asyncio.run(council.stage2_collect_rankings(
+        "q", STAGE1, council_models=MODELS, api_key="key", ranking_mode="json",
+    ))
+
+    assert len(bodies) == len(MODELS)
+    assert all(("max_tokens" in body) == capped for body in bodies)
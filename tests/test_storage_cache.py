@@ -0,0 +1,92 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from backend import storage
+from backend.storage import CachedStorage, JSONFileStorage, user_message
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class FlakyBackend(JSONFileStorage):
+    """JSON storage whose next `failures` batched appends raise."""
+
+    def __init__(self, data_dir, failures=0):
+        super().__init__(data_dir)
+        self.failures = failures
+        self.append_calls = 0
+
+    def add_messages(self, conversation_id, messages):
+        self.append_calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise OSError("disk full")
+        super().add_messages(conversation_id, messages)
+
+
+def on_disk(data_dir, conversation_id):
+    return JSONFileStorage(str(data_dir)).get_conversation(conversation_id)
+
+
+def test_writes_through_without_flusher(tmp_path):
+    cache = CachedStorage(JSONFileStorage(str(tmp_path)), flush_interval=1.0)
+    cache.create_conversation("abc")
+    cache.add_message("abc", user_message("hello"))
+
+    assert on_disk(tmp_path, "abc")["messages"] == [user_message("hello")]
+
+
+def test_write_behind_coalesces_into_one_append(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_write_behind_running", True)
+    backend = FlakyBackend(str(tmp_path))
+    cache = CachedStorage(backend, flush_interval=1.0)
+    cache.create_conversation("abc")
+    cache.flush()
+
+    for i in range(5):
+        cache.add_message("abc", user_message(f"m{i}"))
+    assert on_disk(tmp_path, "abc")["messages"] == []
+    assert cache.get_conversation("abc")["messages"][-1] == user_message("m4")
+
+    assert cache.flush() == 1
+    assert backend.append_calls == 1
+    assert len(on_disk(tmp_path, "abc")["messages"]) == 5
+
+
+def test_failed_flush_keeps_changes_pending(tmp_path, monkeypatch):
+    monkeypatch.setattr(storage, "_write_behind_running", True)
+    backend = FlakyBackend(str(tmp_path), failures=1)
+    cache = CachedStorage(backend, flush_interval=1.0)
+    cache.create_conversation("abc")
+    cache.flush()
+    cache.add_message("abc", user_message("hello"))
+
+    assert cache.flush() == 0
+    assert cache.flush_errors == 1
+    assert on_disk(tmp_path, "abc")["messages"] == []
+
+    assert cache.flush() == 1
+    assert on_disk(tmp_path, "abc")["messages"] == [user_message("hello")]
+
+
+@pytest.mark.parametrize("backend", ["log", "json", "sqlite"])
+def test_messages_survive_a_crash(tmp_path, backend):
+    env = {**os.environ, "PYTHONPATH": REPO_ROOT, "STORAGE_BACKEND": backend}
+    write = (
+        "import os\n"
+        "from backend import storage\n"
+        "storage.create_conversation('abc')\n"
+        "storage.add_user_message('abc', 'hello')\n"
+        "os._exit(1)  # no atexit handlers, no shutdown flush\n"
+    )
+    crashed = subprocess.run([sys.executable, "-c", write], cwd=tmp_path, env=env)
+    assert crashed.returncode == 1
+
+    read = (
+        "from backend import storage\n"
+        "print(storage.get_conversation('abc')['messages'][0]['content'])\n"
+    )
+    result = subprocess.run([sys.executable, "-c", read], cwd=tmp_path, env=env, capture_output=True, text=True)
+    assert result.stdout.strip() == "hello", result.stderr
@@ -0,0 +1,116 @@
+import base64
+import os
+import time
+
+import pytest
+
+from backend.storage import INDEX_FILENAME, JSONFileStorage, user_message
+from backend.storage_index import ConversationIndex, decode_cursor, encode_cursor
+from backend.storage_log import AppendLogStorage
+
+
+def meta(conversation_id, created_at, title="New Conversation", message_count=0):
+    return {"id": conversation_id, "created_at": created_at, "title": title, "message_count": message_count}
+
+
+def make_index(tmp_path, metas=()):
+    index = ConversationIndex(str(tmp_path / "conversations.idx"), lambda since=None: [])
+    for m in metas:
+        index.put(m)
+    return index
+
+
+def all_pages(index, limit):
+    seen, cursor = [], None
+    while True:
+        page = index.page(limit, cursor)
+        seen.extend(c["id"] for c in page["conversations"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return seen
+
+
+def age(path, seconds=60):
+    past = time.time() - seconds
+    os.utime(path, (past, past))
+
+
+def test_cursor_round_trip():
+    m = meta("abc", "2024-01-02T03:04:05.000006")
+    assert decode_cursor(encode_cursor(m)) == ("2024-01-02T03:04:05.000006", "abc")
+
+
+def test_pages_are_newest_first_and_ties_break_on_id(tmp_path):
+    metas = [meta(f"c{i}", "2024-01-01T00:00:00") for i in range(5)]
+    metas += [meta("older", "2023-12-31T00:00:00"), meta("newer", "2024-01-02T00:00:00")]
+    index = make_index(tmp_path, metas)
+
+    expected = ["newer", "c4", "c3", "c2", "c1", "c0", "older"]
+    for limit in (1, 2, 3, 7, 50):
+        assert all_pages(index, limit) == expected
+    first = index.page(2)
+    assert [c["id"] for c in first["conversations"]] == ["newer", "c4"]
+    assert [c["id"] for c in index.page(2, first["next_cursor"])["conversations"]] == ["c3", "c2"]
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    base64.urlsafe_b64encode(b"not json").decode(),
+    base64.urlsafe_b64encode(b'["only-one"]').decode(),
+    base64.urlsafe_b64encode(b'[1, 2]').decode(),
+    base64.urlsafe_b64encode(b'{"a": 1, "b": 2}').decode(),
+    base64.urlsafe_b64encode(b'"ab"').decode(),
+])
+def test_malformed_cursor_raises_value_error(tmp_path, cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+    with pytest.raises(ValueError):
+        make_index(tmp_path).page(10, cursor)
+
+
+def test_log_is_compacted_and_reloads_to_the_same_entries(tmp_path):
+    index = make_index(tmp_path, [meta("a", "2024-01-01"), meta("b", "2024-01-02")])
+    for count in range(1, 40):
+        index.update("a", message_count=count)
+
+    with open(index.path) as f:
+        lines = f.readlines()
+    # Rewritten along the way rather than growing by one line per update
+    assert len(lines) < 40
+    reloaded = make_index(tmp_path)
+    assert reloaded.all() == index.all()
+    assert reloaded.get("a")["message_count"] == 39
+
+
+@pytest.mark.parametrize("engine", [JSONFileStorage, AppendLogStorage])
+def test_writes_missed_by_the_index_are_reconciled_on_load(tmp_path, engine):
+    backend = engine(str(tmp_path))
+    backend.create_conversation("kept")
+    backend.create_conversation("lost")
+    backend.add_message("kept", user_message("hi"))
+    age(os.path.join(str(tmp_path), INDEX_FILENAME))
+
+    # A crash between the conversation write and the index append
+    crashed = engine(str(tmp_path))
+    crashed.index.put = lambda meta: None
+    crashed.index.update = lambda conversation_id, **changes: True
+    crashed.create_conversation("missing")
+    crashed.add_message("lost", user_message("one"))
+    crashed.update_conversation_title("lost", "Renamed")
+
+    listed = {c["id"]: c for c in engine(str(tmp_path)).list_conversations()}
+    assert set(listed) == {"kept", "lost", "missing"}
+    assert (listed["lost"]["title"], listed["lost"]["message_count"]) == ("Renamed", 1)
+    assert listed["kept"]["message_count"] == 1
+
+
+def test_torn_index_tail_is_repaired(tmp_path):
+    backend = AppendLogStorage(str(tmp_path))
+    backend.create_conversation("a")
+    with open(backend.index.path, "a") as f:
+        f.write('{"id":"torn","created_at":')
+
+    reopened = AppendLogStorage(str(tmp_path))
+    reopened.create_conversation("b")
+
+    assert sorted(c["id"] for c in AppendLogStorage(str(tmp_path)).list_conversations()) == ["a", "b"]
@@ -0,0 +1,173 @@
+"""
+PostgresStorage against a real database.
+
+Skipped unless asyncpg is installed and TEST_DATABASE_URL points at a
+database the tests may write to, e.g.:
+
+    TEST_DATABASE_URL=postgresql://postgres@localhost/llm_council_test pytest tests/test_storage_postgres.py
+
+Every test creates its own conversations and deletes them afterwards.
+"""
+
+import asyncio
+import os
+import uuid
+
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+
+from backend import storage
+from backend.storage import assistant_message, user_message
+from backend.storage_postgres import PostgresStorage
+
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL", "")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+@pytest.fixture(autouse=True)
+def no_search_index(monkeypatch):
+    monkeypatch.setattr(storage, "get_search_index", lambda: None)
+
+
+@pytest.fixture
+def run_db():
+    """Run a test body with a fresh PostgresStorage, then drop what it created."""
+    def run(body):
+        async def wrapper():
+            db = PostgresStorage(TEST_DATABASE_URL, min_size=1, max_size=4)
+            created = []
+
+            async def create(n=1):
+                ids = [str(uuid.uuid4()) for _ in range(n)]
+                for conversation_id in ids:
+                    await db.create_conversation(conversation_id)
+                created.extend(ids)
+                return ids
+
+            try:
+                return await body(db, create)
+            finally:
+                if db._pool is not None:
+                    await db._pool.execute("DELETE FROM conversations WHERE id = ANY($1::uuid[])", created)
+                await db.close()
+
+        return asyncio.run(wrapper())
+
+    return run
+
+
+def test_create_and_get(run_db):
+    async def body(db, create):
+        [conversation_id] = await create()
+        conversation = await db.get_conversation(conversation_id)
+        assert conversation["id"] == conversation_id
+        assert conversation["title"] == "New Conversation"
+        assert conversation["messages"] == []
+        assert await db.get_conversation(str(uuid.uuid4())) is None
+        assert await db.get_conversation("not-a-uuid") is None
+
+    run_db(body)
+
+
+def test_add_messages_in_one_batch(run_db):
+    stage1 = [{"model": "a/one", "response": "Answer"}]
+    stage2 = [{"model": "a/one", "ranking": "FINAL RANKING:\n1. Response A"}]
+    stage3 = {"model": "a/chair", "response": "Final"}
+
+    async def body(db, create):
+        [conversation_id] = await create()
+        await db.add_messages(conversation_id, [user_message("hi"), assistant_message(stage1, stage2, stage3)])
+        await db.add_user_message(conversation_id, "again")
+
+        messages = (await db.get_conversation(conversation_id))["messages"]
+        assert messages == [user_message("hi"), assistant_message(stage1, stage2, stage3), user_message("again")]
+        page = await db.list_conversations_page(limit=100)
+        counts = {c["id"]: c["message_count"] for c in page["conversations"]}
+        assert counts[conversation_id] == 3
+
+        with pytest.raises(ValueError):
+            await db.add_messages(str(uuid.uuid4()), [user_message("lost")])
+
+    run_db(body)
+
+
+def test_counts_messages_written_by_other_clients(run_db):
+    async def body(db, create):
+        [conversation_id] = await create()
+        await db.add_user_message(conversation_id, "from python")
+        # database/db.js inserts rows directly, without touching conversations
+        await db._pool.execute(
+            "INSERT INTO messages (conversation_id, role, content) VALUES ($1, 'user', 'from js')", conversation_id
+        )
+
+        page = await db.list_conversations_page(limit=100)
+        counts = {c["id"]: c["message_count"] for c in page["conversations"]}
+        assert counts[conversation_id] == 2
+
+    run_db(body)
+
+
+def test_schema_replaces_single_column_indexes(run_db):
+    async def body(db, create):
+        pool = await db.pool()
+        # As created by older versions of database/db.js
+        await pool.execute("CREATE INDEX IF NOT EXISTS idx_messages_conversation_id ON messages(conversation_id)")
+        await pool.execute("CREATE INDEX IF NOT EXISTS idx_conversations_created_at ON conversations(created_at DESC)")
+        await db.close()
+
+        await db.pool()
+        names = {row["indexname"] for row in await db._pool.fetch(
+            "SELECT indexname FROM pg_indexes WHERE tablename IN ('messages', 'conversations')"
+        )}
+        assert {"idx_messages_conversation_id_id", "idx_conversations_created_at_id"} <= names
+        assert not names & {"idx_messages_conversation_id", "idx_conversations_created_at"}
+
+    run_db(body)
+
+
+def test_lazy_stages(run_db):
+    stage1 = [{"model": "a/one", "response": "x" * 10000}]
+
+    async def body(db, create):
+        [conversation_id] = await create()
+        await db.add_assistant_message(conversation_id, stage1, [], {"model": "a/chair", "response": "Final"})
+
+        lazy = await db.get_conversation(conversation_id, load_stages=False)
+        [message] = lazy["messages"]
+        assert "stage1" not in message and "message_id" in message
+
+        loaded = await db.load_stages(message)
+        assert loaded["stage1"] == stage1
+        assert "message_id" not in loaded
+
+    run_db(body)
+
+
+def test_keyset_pagination_visits_every_conversation_once(run_db):
+    async def body(db, create):
+        ids = set(await create(7))
+        seen = []
+        cursor = None
+        while True:
+            page = await db.list_conversations_page(limit=3, cursor=cursor)
+            seen.extend(c["id"] for c in page["conversations"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert len(seen) == len(set(seen))
+        assert ids <= set(seen)
+
+    run_db(body)
+
+
+def test_update_title(run_db):
+    async def body(db, create):
+        [conversation_id] = await create()
+        await db.update_conversation_title(conversation_id, "Renamed")
+        assert (await db.get_conversation(conversation_id))["title"] == "Renamed"
+        with pytest.raises(ValueError):
+            await db.update_conversation_title(str(uuid.uuid4()), "Nobody")
+
+    run_db(body)
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from backend import openrouter
+
+MODEL = "test/model"
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def data(delta):
+    return f"data: {json.dumps({'choices': [{'delta': delta}]})}\n\n".encode()
+
+
+class SSEStream(httpx.AsyncByteStream):
+    """Response body delivered in the given chunks; an exception chunk is raised."""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield chunk
+            await asyncio.sleep(0)
+
+
+@pytest.fixture(autouse=True)
+def no_cache(monkeypatch):
+    monkeypatch.setattr(openrouter, "response_cache", None)
+    monkeypatch.setattr(openrouter, "_retry_delay", lambda attempt, error: 0)
+
+
+def test_stream_forwards_deltas_in_order(mock_upstream):
+    hello = data({"content": "Hel"})
+    reasoning = data({"reasoning_details": [{"type": "reasoning.text", "text": "thinking"}]})
+    chunks = [
+        b": OPENROUTER PROCESSING\n\n",
+        reasoning,
+        hello,
+        # One event split across two chunks
+        data({"content": "lo, "})[:20],
+        data({"content": "lo, "})[20:] + data({"content": "world"}),
+        b"data: [DONE]\n\n",
+        data({"content": "after done"}),
+    ]
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, headers={"Content-Type": "text/event-stream"}, stream=SSEStream(chunks))
+
+    mock_upstream(handler)
+    deltas = []
+
+    result = asyncio.run(openrouter.query_model_stream(MODEL, MESSAGES, api_key="key", on_delta=deltas.append))
+
+    assert requests[0]["stream"] is True
+    assert deltas == ["Hel", "lo, ", "world"]
+    assert result == {
+        "content": "Hello, world",
+        "reasoning_details": [{"type": "reasoning.text", "text": "thinking"}],
+    }
+
+
+def test_retry_before_first_token_starts_over(mock_upstream):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            chunks = [
+                data({"reasoning_details": [{"type": "reasoning.text", "text": "first try"}]}),
+                httpx.ReadError("connection reset"),
+            ]
+        else:
+            chunks = [
+                data({"reasoning_details": [{"type": "reasoning.text", "text": "second try"}]}),
+                data({"content": "answer"}),
+                b"data: [DONE]\n\n",
+            ]
+        return httpx.Response(200, stream=SSEStream(chunks))
+
+    mock_upstream(handler)
+    deltas = []
+
+    result = asyncio.run(openrouter.query_model_stream(MODEL, MESSAGES, api_key="key", on_delta=deltas.append))
+
+    assert len(attempts) == 2
+    assert deltas == ["answer"]
+    assert result["reasoning_details"] == [{"type": "reasoning.text", "text": "second try"}]
+
+
+def test_failure_after_first_token_is_not_retried(mock_upstream):
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        return httpx.Response(200, stream=SSEStream([data({"content": "partial"}), httpx.ReadError("reset")]))
+
+    mock_upstream(handler)
+    deltas = []
+
+    result = asyncio.run(openrouter.query_model_stream(MODEL, MESSAGES, api_key="key", on_delta=deltas.append))
+
+    assert result is None
+    assert len(attempts) == 1
+    assert deltas == ["partial"]